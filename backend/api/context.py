@@ -1,4 +1,16 @@
 from ..opcua_server.server import OPCUAServer
+from ..opcua_server.config_bus import ConfigBus
+from .live_stream import LiveStreamHub
+from ..monitoring.health_sampler import HealthSampler
+
+# In-process channel for configuration changes made through the API
+config_bus = ConfigBus()
 
 # Global OPC UA Server instance shared across the API
-opcua_server = OPCUAServer()
+opcua_server = OPCUAServer(config_bus=config_bus)
+
+# WebSocket fan-out of the poller's live-value snapshots
+live_stream = LiveStreamHub(opcua_server.live)
+
+# System metrics sampled once per tick for every health viewer
+health_sampler = HealthSampler()
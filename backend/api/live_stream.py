@@ -0,0 +1,183 @@
+import asyncio
+import json
+import logging
+import time
+
+try:
+    import msgpack
+    HAS_MSGPACK = True
+except ImportError:
+    HAS_MSGPACK = False
+
+_logger = logging.getLogger(__name__)
+
+DEFAULT_STREAM_HZ = 5.0
+MAX_STREAM_HZ = 20.0
+MIN_STREAM_HZ = 0.1
+
+
+class _JsonFrames:
+    binary = False
+
+    def encode(self, row):
+        return json.dumps(row)
+
+    def frame(self, kind, seq, rows, removed):
+        return f'{{"type":"{kind}","seq":{seq},"changed":[{",".join(rows)}],"removed":{json.dumps(removed)}}}'
+
+
+class _MsgpackFrames:
+    binary = True
+
+    def __init__(self):
+        self._packer = msgpack.Packer()
+
+    def encode(self, row):
+        return self._packer.pack(row)
+
+    def frame(self, kind, seq, rows, removed):
+        pack = self._packer.pack
+        return b"".join((
+            self._packer.pack_map_header(4),
+            pack("type"), pack(kind),
+            pack("seq"), pack(seq),
+            pack("changed"), self._packer.pack_array_header(len(rows)), *rows,
+            pack("removed"), pack(removed),
+        ))
+
+
+class _RowCache:
+    """Encodes each row once per format, however many clients send it."""
+
+    def __init__(self, frames):
+        self.frames = frames
+        self._rows = {} # node_id -> (row, encoded)
+
+    def encoded(self, node_id, row):
+        cached = self._rows.get(node_id)
+        if cached is not None and cached[0] is row:
+            return cached[1]
+        data = self.frames.encode(row)
+        self._rows[node_id] = (row, data)
+        return data
+
+    def prune(self, nodes):
+        if len(self._rows) > len(nodes):
+            self._rows = {n: entry for n, entry in self._rows.items() if n in nodes}
+
+
+def _clamp_hz(max_hz):
+    return min(max(float(max_hz), MIN_STREAM_HZ), MAX_STREAM_HZ)
+
+
+class StreamClient:
+    """Per-connection subscription: which nodes, how often, and what was last sent."""
+
+    def __init__(self, fmt="json", nodes=None, max_hz=DEFAULT_STREAM_HZ):
+        self.format = fmt
+        self.changed = asyncio.Event()
+        self.set_filter(nodes, max_hz)
+        self.sent_at = 0.0
+
+    def set_filter(self, nodes=None, max_hz=None):
+        self.nodes = None if nodes is None else list(dict.fromkeys(nodes))
+        if max_hz is not None:
+            self.min_interval = 1.0 / _clamp_hz(max_hz)
+        self._sent = {} # node_id -> row object last sent
+        self._seq = None
+        self._full = True # The next frame replaces the client's table
+        self.changed.set()
+
+    def next_frame(self, snapshot, cache):
+        """Frame with the rows changed since the last one sent, or None."""
+        if snapshot.seq == self._seq:
+            return None
+        rows = snapshot.nodes
+        if self.nodes is None:
+            wanted = rows
+        else:
+            wanted = {n: rows[n] for n in self.nodes if n in rows}
+        sent = self._sent
+        changed = [cache.encoded(n, row) for n, row in wanted.items() if sent.get(n) is not row]
+        removed = [n for n in sent if n not in wanted]
+        kind = "full" if self._full else "delta"
+        self._sent = dict(wanted)
+        self._seq = snapshot.seq
+        self._full = False
+        if kind == "delta" and not changed and not removed:
+            return None
+        return cache.frames.frame(kind, snapshot.seq, changed, removed)
+
+
+class LiveStreamHub:
+    """
+    Pushes the poller's live-value snapshots to WebSocket clients.
+
+    The poller is the only producer: a new snapshot just wakes the clients,
+    each of which sends the rows that changed since its own last frame,
+    at most max_hz times a second. Rows are encoded once per format and the
+    encoded bytes are reused by every client, so an extra browser costs an
+    identity check per subscribed node and a send rather than a read,
+    a database query and a full serialization.
+    """
+
+    def __init__(self, live):
+        self.live = live
+        self.clients = set()
+        self._caches = {"json": _RowCache(_JsonFrames())}
+        if HAS_MSGPACK:
+            self._caches["msgpack"] = _RowCache(_MsgpackFrames())
+        live.add_listener(self._on_snapshot)
+
+    @property
+    def formats(self):
+        return tuple(self._caches)
+
+    def _on_snapshot(self, snapshot):
+        for cache in self._caches.values():
+            cache.prune(snapshot.nodes)
+        for client in self.clients:
+            client.changed.set()
+
+    def _apply_message(self, client, text):
+        try:
+            message = json.loads(text)
+            nodes = message.get("nodes")
+            if nodes is not None and not isinstance(nodes, list):
+                raise ValueError("nodes must be a list or null")
+            client.set_filter(nodes, message.get("max_hz"))
+        except (ValueError, TypeError, AttributeError) as e:
+            _logger.warning(f"Ignoring live stream message {text[:80]!r}: {e}")
+
+    async def serve(self, websocket, client):
+        """Runs one accepted connection until the client goes away."""
+        cache = self._caches[client.format]
+        send = websocket.send_bytes if cache.frames.binary else websocket.send_text
+        self.clients.add(client)
+        receiver = asyncio.ensure_future(websocket.receive_text())
+        try:
+            while True:
+                client.changed.clear()
+                frame = client.next_frame(self.live.snapshot, cache)
+                if frame is not None:
+                    await send(frame)
+                    client.sent_at = time.monotonic()
+
+                waiter = asyncio.ensure_future(client.changed.wait())
+                done, _ = await asyncio.wait((receiver, waiter), return_when=asyncio.FIRST_COMPLETED)
+                if receiver in done:
+                    waiter.cancel()
+                    self._apply_message(client, receiver.result()) # Raises once disconnected
+                    receiver = asyncio.ensure_future(websocket.receive_text())
+                    continue
+
+                # Rate cap: changes arriving meanwhile are merged into one frame
+                delay = client.min_interval - (time.monotonic() - client.sent_at)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+        finally:
+            self.clients.discard(client)
+            receiver.cancel()
+
+    def get_stats(self):
+        return {"clients": len(self.clients), "formats": list(self.formats)}
@@ -1,17 +1,20 @@
 from fastapi import FastAPI, Depends, HTTPException, status
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 import logging
 import asyncio
 from .routes import auth, nodes, server, health, security
 from .context import opcua_server
+from ..database.db import init_db
 
 logging.basicConfig(level=logging.INFO)
 _logger = logging.getLogger(__name__)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Startup: Start the OPC UA Server
+    # Startup: Bring the schema up to date, then start the OPC UA Server
+    init_db()
     _logger.info("Starting OPC UA Server during API startup...")
     task = asyncio.create_task(opcua_server.start())
     yield
@@ -50,3 +53,8 @@ async def root():
 @app.get("/health")
 async def health_check():
     return {"status": "healthy"}
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus text exposition of the acquisition and publishing instruments."""
+    return PlainTextResponse(opcua_server.metrics.render(), media_type="text/plain; version=0.0.4")
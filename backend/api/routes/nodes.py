@@ -1,11 +1,18 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+import logging
+import time
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, WebSocket, WebSocketDisconnect, status
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 from pydantic import BaseModel
-from backend.database.db import get_db
+from backend.database.db import get_db, SessionLocal
 from backend.database.models import Node
-from .auth import get_current_user
-from ..context import opcua_server
+from .auth import get_current_user, user_from_token
+from ..context import opcua_server, config_bus, live_stream
+from ..live_stream import StreamClient, DEFAULT_STREAM_HZ
+from backend.opcua_server.config_bus import NodeCreated, NodeUpdated, NodeDeleted
+from backend.opcua_server.history import MAX_AGGREGATE_POINTS
+
+_logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
@@ -16,12 +23,18 @@ class NodeSourceConfig(BaseModel):
     max: Optional[float] = None
     pin: Optional[int] = None
     mode: Optional[str] = None
+    event_driven: Optional[bool] = None # GPIO input only: push edges instead of polling
+    debounce_ms: Optional[int] = None # GPIO event mode only: ignore edges within this window
     initial_value: Optional[float] = None
     # ADC Config
     channel: Optional[int] = None # 0-3 for ADS1115, 0-7 for MCP3008
     gain: Optional[int] = 1 # ADS1115 only
     i2c_address: Optional[int] = 0x48 # ADS1115 only
+    data_rate: Optional[int] = None # ADS1115 only, samples/s per chip (8-860)
+    continuous: Optional[bool] = None # ADS1115 only, continuous conversion for a single-channel chip
     cs_pin: Optional[int] = 8 # MCP3008 only (default SPI CE0)
+    spi_baudrate: Optional[int] = None # MCP3008/MCP3208 only, SPI clock per chip (default 1 MHz)
+    ref_voltage: Optional[float] = None # MCP3008/MCP3208 only, VREF pin voltage (default 3.3)
 
 class NodeCreate(BaseModel):
     name: str
@@ -42,6 +55,14 @@ class NodeCreate(BaseModel):
     scale_unit: Optional[str] = None
     voltage_min: Optional[str] = "0"
     voltage_max: Optional[str] = "3.3"
+    scale_clamp: Optional[bool] = False
+    scale_table: Optional[List[List[float]]] = None
+    # Publication filter
+    deadband_abs: Optional[float] = None
+    deadband_percent: Optional[float] = None
+    publish_on_change: Optional[bool] = False
+    # Signal conditioning stages, applied in order before scaling
+    conditioning: Optional[List[Dict[str, Any]]] = None
 
 class NodeResponse(NodeCreate):
     id: int
@@ -60,8 +81,8 @@ async def create_node(node: NodeCreate, db: Session = Depends(get_db), current_u
         db.commit()
         db.refresh(db_node)
         
-        # Dynamically add to running server
-        await opcua_server.add_dynamic_node(db_node)
+        # Apply to the running server
+        await config_bus.publish(NodeCreated(db_node))
         
         return db_node
     except Exception as e:
@@ -81,14 +102,18 @@ async def update_node(node_id: int, node: NodeCreate, db: Session = Depends(get_
     if not db_node:
         raise HTTPException(status_code=404, detail="Node not found")
     
+    previous_node_id = db_node.node_id
     for key, value in node.dict().items():
         setattr(db_node, key, value)
     
     db.commit()
     db.refresh(db_node)
     
-    # Dynamically update running server
-    await opcua_server.update_dynamic_node(db_node)
+    # Apply to the running server
+    await config_bus.publish(NodeUpdated(
+        db_node,
+        previous_node_id=previous_node_id if previous_node_id != db_node.node_id else None
+    ))
     
     return db_node
 
@@ -98,73 +123,131 @@ async def delete_node(node_id: int, db: Session = Depends(get_db), current_user
     if not db_node:
         raise HTTPException(status_code=404, detail="Node not found")
     
-    # Dynamically remove from running server
-    await opcua_server.remove_dynamic_node(db_node.node_id)
-    
+    node_id_str = db_node.node_id
     db.delete(db_node)
     db.commit()
+    
+    # Apply to the running server
+    await config_bus.publish(NodeDeleted(node_id_str))
     return {"message": "Node deleted successfully"}
 
+@router.get("/trend/{node_id}")
+async def get_node_trend(node_id: str, points: Optional[int] = None, start: Optional[float] = None,
+                         end: Optional[float] = None, current_user = Depends(get_current_user)):
+    """Recent published values of a node from the in-memory trend buffer.
+
+    Either the newest `points` samples, or samples between `start` and `end`
+    (Unix seconds, both optional) capped at `points`. Missing readings are null.
+    """
+    buf = opcua_server.trends.get(node_id)
+    if buf is None:
+        if node_id not in opcua_server.data_sources:
+            raise HTTPException(status_code=404, detail="Node not active")
+        return {"node_id": node_id, "depth": opcua_server.trends.depth, "count": 0, "timestamps": [], "values": []}
+    if points is not None and points < 1:
+        raise HTTPException(status_code=400, detail="points must be positive")
+
+    if start is None and end is None:
+        ts, values = buf.last(points or buf.count)
+    else:
+        ts, values = buf.between(start, end, limit=points)
+    return {
+        "node_id": node_id,
+        "depth": buf.depth,
+        "count": len(ts),
+        "timestamps": ts.tolist(),
+        "values": [None if v != v else v for v in values.tolist()], # NaN -> null
+    }
+
+@router.get("/history/{node_id}")
+async def get_node_history(node_id: str, start: Optional[float] = None, end: Optional[float] = None,
+                           points: int = 500, current_user = Depends(get_current_user)):
+    """Aggregated history of a node for charting.
+
+    Splits [start, end] (Unix seconds; default the last 24 h) into at most
+    `points` buckets with min/max/avg/count/first/last each, read from the
+    coarsest rollup resolution that still gives that many points.
+    """
+    store = opcua_server.history
+    if store is None:
+        raise HTTPException(status_code=503, detail="History is disabled or the server is not running")
+    end = time.time() if end is None else end
+    start = end - 86400 if start is None else start
+    if not 1 <= points <= MAX_AGGREGATE_POINTS:
+        raise HTTPException(status_code=400, detail=f"points must be 1..{MAX_AGGREGATE_POINTS}")
+    if end <= start:
+        raise HTTPException(status_code=400, detail="end must be after start")
+
+    interval = (end - start) / points
+    resolution, buckets = await store.aggregate(node_id, start, end, interval)
+    for bucket in buckets:
+        if bucket["avg"] != bucket["avg"]:
+            bucket["avg"] = None
+    return {
+        "node_id": node_id,
+        "start": start,
+        "end": end,
+        "interval": interval,
+        "resolution": resolution,
+        "points": buckets,
+    }
+
+def _etag_matches(header, etag):
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in header.split(","))
+
 @router.get("/live/values")
-async def get_node_values(db: Session = Depends(get_db), current_user = Depends(get_current_user)):
-    """Returns current values and error states for all active data sources."""
-    results = []
-    
-    # Get all nodes from DB for scaling config lookup
-    nodes_db = {n.node_id: n for n in db.query(Node).all()}
-    
-    for node_id, source in opcua_server.data_sources.items():
-        # Read current value (this might be slightly delayed by the polling loop but that's fine)
-        raw_val = await source.read()
-        error = getattr(source, "error", None)
-        
-        # Normalize ADC types to 'analog' for frontend compatibility
-        # Check both source.config.type and the actual source class type
-        source_type = source.config.get("type", "")
-        adc_device = source.config.get("adc_device", "")
-        
-        # List of all ADC-related types that should be displayed as 'analog'
-        adc_types = ("ads1115", "mcp3008", "mcp3208", "analog")
-        
-        if source_type in adc_types or adc_device in adc_types:
-            display_type = "analog"
-        else:
-            display_type = source_type
-        
-        # Get scaling config from DB
-        node_db = nodes_db.get(node_id)
-        scaled_val = raw_val
-        scale_unit = None
-        scale_enabled = False
-        
-        if node_db and node_db.scale_enabled and raw_val is not None:
-            try:
-                scale_enabled = True
-                scale_unit = node_db.scale_unit
-                v_min = float(node_db.voltage_min or 0)
-                v_max = float(node_db.voltage_max or 3.3)
-                e_min = float(node_db.scale_min or 0)
-                e_max = float(node_db.scale_max or 100)
-                
-                # Apply linear scaling: scaled = (raw - v_min) / (v_max - v_min) * (e_max - e_min) + e_min
-                if v_max != v_min:
-                    scaled_val = ((raw_val - v_min) / (v_max - v_min)) * (e_max - e_min) + e_min
-                else:
-                    scaled_val = e_min
-            except (ValueError, TypeError):
-                scaled_val = raw_val
-        
-        results.append({
-            "node_id": node_id,
-            "name": source.config.get("name", "Unknown"),
-            "value": scaled_val,
-            "raw_value": raw_val,
-            "error": error,
-            "type": display_type,
-            "pin": source.config.get("pin"),
-            "channel": source.config.get("channel"),
-            "adc_device": adc_device or source_type if display_type == "analog" else None,
-            "scale_enabled": scale_enabled,
-            "scale_unit": scale_unit
-        })
-    return results
+async def get_node_values(request: Request, current_user = Depends(get_current_user)):
+    """Returns current values and error states for all active data sources.
+
+    Served from the poller's latest snapshot, so requests never touch the
+    hardware. The ETag changes only when a value or error does; a request
+    with a matching If-None-Match gets 304 Not Modified.
+    """
+    snapshot = opcua_server.live.snapshot
+    headers = {
+        "ETag": snapshot.etag,
+        "X-Snapshot-Seq": str(snapshot.seq),
+        "Cache-Control": "private, no-cache", # Browsers revalidate with If-None-Match
+    }
+    if _etag_matches(request.headers.get("if-none-match"), snapshot.etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=snapshot.body(), media_type="application/json", headers=headers)
+
+@router.websocket("/live/stream")
+async def stream_node_values(websocket: WebSocket, token: str = "", nodes: Optional[str] = None,
+                             max_hz: float = DEFAULT_STREAM_HZ, format: str = "json"):
+    """Pushes live values as they change.
+
+    Browsers cannot set headers on a WebSocket, so the JWT comes in the
+    `token` query parameter. `nodes` (comma separated) limits the stream to
+    those node ids and `max_hz` caps the frame rate; both can be changed later
+    by sending {"nodes": [...] or null, "max_hz": n}. The first frame is
+    {"type": "full", ...} with every subscribed row, later ones are
+    {"type": "delta", "changed": [rows], "removed": [node ids]}.
+    `format=msgpack` sends the same frames as binary MessagePack.
+    """
+    db = SessionLocal()
+    try:
+        user = user_from_token(token, db)
+    finally:
+        db.close()
+    if user is None:
+        await websocket.close(code=1008) # Policy violation
+        return
+    if format not in live_stream.formats:
+        await websocket.close(code=1003, reason=f"format must be one of {', '.join(live_stream.formats)}")
+        return
+
+    await websocket.accept()
+    subscription = None if not nodes else [n.strip() for n in nodes.split(",") if n.strip()]
+    try:
+        await live_stream.serve(websocket, StreamClient(format, subscription, max_hz))
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        _logger.error(f"Live stream error: {e}")
+        await websocket.close()
@@ -8,7 +8,8 @@ import os
 import asyncio
 import logging
 
-from ..context import opcua_server
+from ..context import opcua_server, config_bus
+from backend.opcua_server.config_bus import SettingsChanged
 
 _logger = logging.getLogger(__name__)
 
@@ -28,6 +29,8 @@ async def get_server_status(current_user = Depends(get_current_user)):
                 sessions = opcua_server.server.iserver.session_manager.get_sessions()
             elif hasattr(opcua_server.server.iserver, "isession_manager"):
                 sessions = opcua_server.server.iserver.isession_manager.get_sessions()
+            else:
+                sessions = list(getattr(opcua_server.server.iserver, "_external_sessions", {}).values())
                 
             for session in sessions:
                 # Basic info from session
@@ -42,7 +45,16 @@ async def get_server_status(current_user = Depends(get_current_user)):
                     connections.append({
                         "username": username_val,
                         "ip": info.client_address or "Unknown",
-                        "connected_since": info.start_time.strftime("%Y-%m-%d %H:%M:%S") if info.start_time else "N/A"
+                        "connected_since": info.start_time.strftime("%Y-%m-%d %H:%M:%S") if info.start_time else "N/A",
+                        "requests": opcua_server.metrics.get_session_rates(session)
+                    })
+                else:
+                    user_obj = getattr(session, "user", None)
+                    connections.append({
+                        "username": getattr(user_obj, "username", None) or getattr(session, "name", "Anonymous"),
+                        "ip": "Unknown",
+                        "connected_since": "N/A",
+                        "requests": opcua_server.metrics.get_session_rates(session)
                     })
         except Exception as e:
             print(f"Error fetching sessions in status API: {e}")
@@ -54,9 +66,48 @@ async def get_server_status(current_user = Depends(get_current_user)):
         "active_connections": len(connections),
         "connections": connections,
         "last_error": getattr(opcua_server, "last_error", None),
-        "instance_id": getattr(opcua_server, "instance_id", "Unknown")
+        "instance_id": getattr(opcua_server, "instance_id", "Unknown"),
+        "requests": opcua_server.metrics.get_summary()
     }
 
+@router.get("/acquisition")
+async def get_acquisition_stats(current_user = Depends(get_current_user)):
+    """Per-node scan interval, achieved rate, deadline lateness and suppressed writes."""
+    return {
+        "running": opcua_server.is_running,
+        **opcua_server.get_acquisition_stats()
+    }
+
+def _require_admin(user):
+    if user.role != "Admin":
+        raise HTTPException(status_code=403, detail="Not authorized")
+
+@router.get("/diagnostics")
+async def get_poll_diagnostics(recent: int = 20, current_user = Depends(get_current_user)):
+    """Jitter, duration and slowest sources of the recent poll cycles."""
+    _require_admin(current_user)
+    return {
+        "running": opcua_server.is_running,
+        **opcua_server.diagnostics.get_report(recent=max(0, min(recent, 256)))
+    }
+
+@router.post("/diagnostics/reset")
+async def reset_poll_diagnostics(current_user = Depends(get_current_user)):
+    _require_admin(current_user)
+    opcua_server.diagnostics.reset()
+    return {"message": "Poll diagnostics cleared"}
+
+@router.post("/diagnostics/profile")
+async def profile_acquisition(seconds: float = 5.0, interval_ms: float = 5.0, current_user = Depends(get_current_user)):
+    """Samples the acquisition task's stacks for a few seconds (folded flame graph stacks)."""
+    _require_admin(current_user)
+    if not opcua_server.is_running:
+        raise HTTPException(status_code=409, detail="Server is not running")
+    try:
+        return await opcua_server.profile_acquisition(seconds, interval_ms / 1000.0)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
 @router.post("/start")
 async def start_server(current_user = Depends(get_current_user)):
     if opcua_server.is_running:
@@ -110,6 +161,10 @@ async def get_settings(db: Session = Depends(get_db), current_user = Depends(get
         "port": "4840",
         "namespace_uri": "http://raspberry.opcua.server",
         "polling_rate": "1000",
+        "trend_depth": "1000",
+        "history_enabled": "true",
+        "history_retention_days": "30",
+        "history_max_mb": "256",
         "alert_cpu": "false",
         "cpu_threshold": "90",
         "alert_cert": "false",
@@ -122,11 +177,18 @@ async def get_settings(db: Session = Depends(get_db), current_user = Depends(get
 
 @router.put("/settings")
 async def update_settings(settings: dict, db: Session = Depends(get_db), current_user = Depends(get_current_user)):
+    changes = {}
     for key, value in settings.items():
         db_setting = db.query(ServerSetting).filter(ServerSetting.key == key).first()
         if db_setting:
+            if db_setting.value != str(value):
+                changes[key] = str(value)
             db_setting.value = str(value)
         else:
             db.add(ServerSetting(key=key, value=str(value)))
+            changes[key] = str(value)
     db.commit()
+    
+    if changes:
+        await config_bus.publish(SettingsChanged(changes))
     return {"message": "Settings updated"}
@@ -1,10 +1,11 @@
 import os
-from sqlalchemy import create_engine
+import logging
+from sqlalchemy import create_engine, inspect, text
 from sqlalchemy.orm import sessionmaker, scoped_session
 from .models import Base
 
-# Database path
-DB_PATH = "sqlite:///backend/database/opcua_server.db"
+# Database path; OPCUA_DATABASE_URL points the server at another database (tests, benchmarks)
+DB_PATH = os.getenv("OPCUA_DATABASE_URL", "sqlite:///backend/database/opcua_server.db")
 
 # Create engine
 engine = create_engine(DB_PATH, connect_args={"check_same_thread": False})
@@ -15,8 +16,27 @@ SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 # Scoped session for thread safety
 db_session = scoped_session(SessionLocal)
 
+_logger = logging.getLogger(__name__)
+
+def _add_missing_columns():
+    """create_all() never alters existing tables, so add columns introduced
+    after a database was first created."""
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {c["name"] for c in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                col_type = column.type.compile(dialect=engine.dialect)
+                conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN "{column.name}" {col_type}'))
+                _logger.info(f"Added column {table.name}.{column.name}")
+
 def init_db():
     Base.metadata.create_all(bind=engine)
+    _add_missing_columns()
 
 def get_db():
     db = SessionLocal()
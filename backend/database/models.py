@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Enum, JSON, Text
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Enum, JSON, Text, Float
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 import enum
@@ -61,6 +61,17 @@ class Node(Base):
     scale_unit = Column(String(20), nullable=True)  # Unit label (bar, °C, psi)
     voltage_min = Column(String, default="0")  # Raw voltage at min
     voltage_max = Column(String, default="3.3")  # Raw voltage at max
+    scale_clamp = Column(Boolean, default=False)  # Limit scaled values to the engineering range
+    scale_table = Column(JSON, nullable=True)  # Optional [[raw, eng], ...] piecewise-linear calibration
+
+    # Publication filter: skip address-space writes for insignificant changes
+    deadband_abs = Column(Float, nullable=True)  # Absolute deadband in published units
+    deadband_percent = Column(Float, nullable=True)  # Percent of the engineering range
+    publish_on_change = Column(Boolean, default=False)  # Only write when the value changes
+
+    # Signal conditioning applied to raw readings before scaling, e.g.
+    # [{"type": "oversample", "samples": 4}, {"type": "median", "window": 5}, {"type": "ema", "alpha": 0.2}]
+    conditioning = Column(JSON, nullable=True)
 
     # Self-referential relationship for folder structure
     children = relationship("Node", backref="parent", remote_side=[id])
@@ -0,0 +1,89 @@
+import asyncio
+import json
+import logging
+import time
+from typing import Any, Dict, Optional
+
+from .system_monitor import SystemMonitor
+
+_logger = logging.getLogger(__name__)
+
+DEFAULT_SAMPLE_INTERVAL = 2.0
+
+class HealthSampler:
+    """
+    One background sampler of system metrics shared by every viewer.
+
+    While anyone is subscribed, a single task samples SystemMonitor on a
+    fixed tick, serializes the result once and hands the same frame to each
+    subscriber's queue. The queues hold one frame, so a slow client skips
+    to the newest frame instead of piling up stale ones. REST requests reuse
+    the latest sample while it is fresh.
+    """
+
+    def __init__(self, monitor: Optional[SystemMonitor] = None, interval: float = DEFAULT_SAMPLE_INTERVAL):
+        self._monitor = monitor
+        self.interval = interval
+        self.latest: Optional[Dict[str, Any]] = None
+        self.frame: Optional[str] = None
+        self.sampled_at = 0.0
+        self.samples = 0
+        self._subscribers = set()
+        self._task = None
+
+    @property
+    def monitor(self) -> SystemMonitor:
+        # Created on first use so importing the API does not touch /proc
+        if self._monitor is None:
+            self._monitor = SystemMonitor()
+        return self._monitor
+
+    def sample(self) -> Dict[str, Any]:
+        self.latest = self.monitor.get_health_metrics()
+        self.frame = json.dumps(self.latest)
+        self.sampled_at = time.monotonic()
+        self.samples += 1
+        return self.latest
+
+    def current(self) -> Dict[str, Any]:
+        """Latest metrics, sampled now only if the last sample is older than one tick."""
+        if self.latest is None or time.monotonic() - self.sampled_at >= self.interval:
+            return self.sample()
+        return self.latest
+
+    def subscribe(self) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=1)
+        if self.frame is not None:
+            queue.put_nowait(self.frame)
+        self._subscribers.add(queue)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self._subscribers.discard(queue)
+        if not self._subscribers and self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def _publish(self, frame: str):
+        for queue in self._subscribers:
+            if queue.full():
+                queue.get_nowait() # Drop the frame this client has not read yet
+            queue.put_nowait(frame)
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        next_tick = loop.time()
+        while self._subscribers:
+            try:
+                # psutil and /sys reads are short but blocking; keep them off the loop
+                await loop.run_in_executor(None, self.sample)
+                self._publish(self.frame)
+            except Exception as e:
+                _logger.error(f"Health sampling failed: {e}")
+            next_tick += self.interval
+            await asyncio.sleep(max(0.0, next_tick - loop.time()))
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {"subscribers": len(self._subscribers), "samples": self.samples, "interval": self.interval}
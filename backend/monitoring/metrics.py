@@ -0,0 +1,152 @@
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional
+
+# Upper bounds in seconds, from sub-millisecond bus reads to multi-second stalls
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+                   0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+def _format_value(value) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_text(labels: Dict[str, str], extra: str = "") -> str:
+    parts = [f'{k}="{_escape(v)}"' for k, v in labels.items()]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Counter:
+    """Monotonic count; inc() is a single float add. Name counters *_total."""
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount=1):
+        self.value += amount
+
+    def samples(self, name, labels):
+        yield f"{name}{_label_text(labels)} {_format_value(self.value)}"
+
+
+class Gauge:
+    """Current value, either set by the owner or read from a callback at scrape time."""
+    __slots__ = ("value", "callback")
+
+    def __init__(self, callback: Optional[Callable[[], float]] = None):
+        self.value = 0.0
+        self.callback = callback
+
+    def set(self, value):
+        self.value = value
+
+    def samples(self, name, labels):
+        value = self.value
+        if self.callback is not None:
+            try:
+                value = self.callback()
+            except Exception:
+                return
+        yield f"{name}{_label_text(labels)} {_format_value(value)}"
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram. observe() is one bisect over the bucket bounds
+    and three adds; cumulative counts are only built when scraped.
+    """
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds: Iterable[float] = LATENCY_BUCKETS):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1) # Last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def samples(self, name, labels):
+        cumulative = 0
+        for bound, n in zip(self.bounds + (float("inf"),), self.counts):
+            cumulative += n
+            le = 'le="' + _format_value(bound) + '"'
+            yield f"{name}_bucket{_label_text(labels, le)} {cumulative}"
+        yield f"{name}_sum{_label_text(labels)} {_format_value(self.sum)}"
+        yield f"{name}_count{_label_text(labels)} {self.count}"
+
+
+class Family:
+    """A metric name with its help text; children are created per label value."""
+
+    def __init__(self, kind: str, name: str, help_text: str, label: Optional[str], factory: Callable):
+        self.kind = kind
+        self.name = name
+        self.help = help_text
+        self.label = label
+        self._factory = factory
+        self._children = {}
+        if label is None:
+            self._children[None] = factory()
+
+    def labels(self, value):
+        child = self._children.get(value)
+        if child is None:
+            child = self._children[value] = self._factory()
+        return child
+
+    def render(self, lines: List[str]):
+        lines.append(f"# HELP {self.name} {self.help}")
+        lines.append(f"# TYPE {self.name} {self.kind}")
+        for value, child in list(self._children.items()):
+            labels = {} if value is None else {self.label: value}
+            lines.extend(child.samples(self.name, labels))
+
+
+class MetricsRegistry:
+    """
+    Holds metric families and renders them in the Prometheus text format.
+
+    counter() and histogram() return the metric itself when unlabelled and
+    the Family (use .labels(value)) when given a label name, so hot paths
+    hold a direct reference and never look anything up by name.
+    """
+
+    def __init__(self):
+        self._families: Dict[str, Family] = {}
+
+    def _add(self, family: Family):
+        if family.name in self._families:
+            raise ValueError(f"metric {family.name} already registered")
+        self._families[family.name] = family
+        return family if family.label is not None else family.labels(None)
+
+    def counter(self, name, help_text, label=None):
+        return self._add(Family("counter", name, help_text, label, Counter))
+
+    def gauge(self, name, help_text, callback=None) -> Gauge:
+        return self._add(Family("gauge", name, help_text, None, lambda: Gauge(callback)))
+
+    def histogram(self, name, help_text, label=None, buckets=LATENCY_BUCKETS):
+        return self._add(Family("histogram", name, help_text, label, lambda: Histogram(buckets)))
+
+    def get(self, name) -> Optional[Family]:
+        return self._families.get(name)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for family in self._families.values():
+            family.render(lines)
+        return "\n".join(lines) + "\n"
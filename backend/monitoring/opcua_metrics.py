@@ -1,9 +1,101 @@
 import time
-from typing import Dict, Any, List
-from collections import deque
+import weakref
+from typing import Dict, Any, List, Callable, Optional
+
+from .metrics import MetricsRegistry
+from .rolling import RateWindows
+
+# OPC UA services counted per session
+SERVICES = ("read", "write", "browse", "publish")
+
+# OPCUAMetrics fed by the patched asyncua handlers, keyed by the address
+# space of the server they belong to. Entries go away with the server.
+_sinks = weakref.WeakKeyDictionary() # asyncua AddressSpace -> OPCUAMetrics
+_patched = False
+
+def _wrap_subscription_publish():
+    """
+    Counts the data change notifications asyncua puts into Publish responses.
+    asyncua has no hook for this, so InternalSubscription is wrapped once
+    per process; the cost is one len() per monitored item batch.
+    """
+    from asyncua.server.internal_subscription import InternalSubscription
+    original = InternalSubscription._pop_triggered_datachanges
+
+    def _pop_triggered_datachanges(self, result):
+        pending = self._triggered_datachanges
+        if pending:
+            sink = _sinks.get(self.monitored_item_srv.aspace)
+            if sink is not None:
+                sink.notifications.inc(sum(map(len, pending.values())))
+        original(self, result)
+
+    InternalSubscription._pop_triggered_datachanges = _pop_triggered_datachanges
+
+def session_service_rates(session) -> Dict[str, RateWindows]:
+    """Per-service request counters of one asyncua session (created on first request)."""
+    rates = getattr(session, "_service_rates", None)
+    if rates is None:
+        rates = session._service_rates = {service: RateWindows() for service in SERVICES}
+    return rates
+
+def _record(session, service, success):
+    if not session.external:
+        return # The poller's own writes go through the internal session
+    session_service_rates(session)[service].add()
+    sink = _sinks.get(session.iserver.aspace)
+    if sink is not None:
+        sink.record_request(service, success)
+
+def _counted(service, handler, is_async):
+    if is_async:
+        async def wrapper(self, *args, **kwargs):
+            try:
+                result = await handler(self, *args, **kwargs)
+            except Exception:
+                _record(self, service, False)
+                raise
+            _record(self, service, True)
+            return result
+    else:
+        def wrapper(self, *args, **kwargs):
+            try:
+                result = handler(self, *args, **kwargs)
+            except Exception:
+                _record(self, service, False)
+                raise
+            _record(self, service, True)
+            return result
+    wrapper.__name__ = handler.__name__
+    wrapper.__doc__ = handler.__doc__
+    return wrapper
+
+def _wrap_session_services():
+    """
+    Counts Read, Write, Browse and Publish requests of external sessions.
+    Like the notification counter, this wraps asyncua's InternalSession
+    handlers once per process.
+    """
+    import inspect
+    from asyncua.server.internal_session import InternalSession
+    for service in SERVICES:
+        handler = getattr(InternalSession, service)
+        setattr(InternalSession, service, _counted(service, handler, inspect.iscoroutinefunction(handler)))
+
+def attach_metrics(iserver, metrics):
+    """Feeds the notifications and client requests of asyncua server iserver into metrics."""
+    global _patched
+    if not _patched:
+        _wrap_subscription_publish()
+        _wrap_session_services()
+        _patched = True
+    _sinks[iserver.aspace] = metrics
+
+def detach_metrics(iserver):
+    _sinks.pop(iserver.aspace, None)
 
 class OPCUAMetrics:
-    def __init__(self):
+    def __init__(self, session_count: Optional[Callable[[], int]] = None):
         self.start_time = time.time()
         self.total_requests = 0
         self.read_requests = 0
@@ -11,8 +103,63 @@ class OPCUAMetrics:
         self.error_count = 0
         self.active_sessions = 0
         
-        # Historical tracking for RPM (Requests Per Minute)
-        self.request_history = deque(maxlen=60) # Last 60 seconds
+        # Sliding-window request counts (1 s, 1 min, 15 min), O(1) to record and query
+        self.requests = RateWindows()
+        self.errors = RateWindows()
+        self.service_rates = {service: RateWindows() for service in SERVICES}
+
+        # Acquisition and publishing instruments, exported at /metrics.
+        # Each is a plain attribute so the poller pays one add or bisect per use.
+        self.session_count = session_count
+        self.registry = MetricsRegistry()
+        r = self.registry
+        self.cycle_seconds = r.histogram(
+            "opcua_poll_cycle_seconds", "Duration of one acquisition cycle (read, condition, scale, publish)")
+        self.cycle_overruns = r.counter(
+            "opcua_poll_cycle_overruns_total", "Cycles that took longer than the shortest period of the nodes they read")
+        self.cycle_errors = r.counter(
+            "opcua_poll_cycle_errors_total", "Cycles abandoned because reading or publishing their batch raised")
+        self.read_seconds = r.histogram(
+            "opcua_source_read_seconds", "Latency of a data source read (or one batched bus scan), by source type",
+            label="source")
+        self.read_errors = r.counter(
+            "opcua_source_read_errors_total", "Reads that raised or left the source in an error state, by source type",
+            label="source")
+        self.write_seconds = r.histogram(
+            "opcua_address_space_write_seconds", "Latency of one batched address-space value write")
+        self.published_values = r.counter(
+            "opcua_published_values_total", "Values written to the address space by the poller")
+        self.suppressed_writes = r.counter(
+            "opcua_suppressed_writes_total", "Values held back by a node's deadband or publish-on-change filter")
+        self.notifications = r.counter(
+            "opcua_publish_notifications_total", "Data change notifications sent to subscribed clients")
+        r.gauge("opcua_publish_notifications_per_second",
+                "Data change notifications per second, averaged since the previous scrape",
+                callback=self._notification_rate)
+        r.gauge("opcua_active_sessions", "Activated OPC UA client sessions", callback=self._sessions)
+        r.gauge("opcua_uptime_seconds", "Seconds since the metrics were created",
+                callback=lambda: int(time.time() - self.start_time))
+        self.service_requests = r.counter(
+            "opcua_service_requests_total", "OPC UA service requests from client sessions", label="service")
+        self.service_errors = r.counter(
+            "opcua_service_errors_total", "OPC UA service requests that failed", label="service")
+        r.gauge("opcua_requests_per_minute", "Client service requests in the last minute", callback=self.get_rpm)
+        self._rate_mark = (time.monotonic(), 0.0)
+
+    def _notification_rate(self) -> float:
+        now, total = time.monotonic(), self.notifications.value
+        then, previous = self._rate_mark
+        self._rate_mark = (now, total)
+        return round((total - previous) / (now - then), 3) if now > then else 0.0
+
+    def _sessions(self) -> int:
+        if self.session_count is not None:
+            self.update_sessions(self.session_count())
+        return self.active_sessions
+
+    def render(self) -> str:
+        """Prometheus text exposition of every instrument."""
+        return self.registry.render()
 
     def record_request(self, req_type="read", success=True):
         self.total_requests += 1
@@ -23,18 +170,24 @@ class OPCUAMetrics:
         
         if not success:
             self.error_count += 1
-            
-        self.request_history.append(time.time())
+            self.errors.add()
+            self.service_errors.labels(req_type).inc()
+
+        self.requests.add()
+        self.service_requests.labels(req_type).inc()
+        rates = self.service_rates.get(req_type)
+        if rates is not None:
+            rates.add()
 
     def update_sessions(self, count: int):
         self.active_sessions = count
 
     def get_rpm(self) -> int:
-        now = time.time()
-        # Filter history for last minute
-        one_min_ago = now - 60
-        count = sum(1 for t in self.request_history if t > one_min_ago)
-        return count
+        return self.requests.count("1m")
+
+    def get_session_rates(self, session) -> Dict[str, Dict[str, int]]:
+        """Request counts of one session per service and window."""
+        return {service: rates.snapshot() for service, rates in session_service_rates(session).items()}
 
     def get_summary(self) -> Dict[str, Any]:
         return {
@@ -44,5 +197,8 @@ class OPCUAMetrics:
             "write_requests": self.write_requests,
             "error_count": self.error_count,
             "active_sessions": self.active_sessions,
-            "rpm": self.get_rpm()
+            "rpm": self.get_rpm(),
+            "requests": self.requests.snapshot(),
+            "errors": self.errors.snapshot(),
+            "services": {service: rates.snapshot() for service, rates in self.service_rates.items()}
         }
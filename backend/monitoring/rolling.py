@@ -0,0 +1,85 @@
+import time
+from typing import Dict
+
+# (name, window seconds, bucket count): 100 ms, 1 s and 10 s resolution
+DEFAULT_WINDOWS = (("1s", 1.0, 10), ("1m", 60.0, 60), ("15m", 900.0, 90))
+
+
+class RollingCounter:
+    """
+    Events in the last `window` seconds, kept in a ring of fixed time buckets.
+
+    The ring is indexed by absolute bucket number (time // width), so add()
+    only touches the current bucket and keeps a running total, and count()
+    returns that total. Moving forward clears the buckets that fell out of
+    the window, at most one pass over the ring however long it was idle.
+    The window covers the current partial bucket plus the buckets - 1 before
+    it, so the answer is exact to within one bucket width.
+    """
+    __slots__ = ("window", "width", "_counts", "_head", "_total", "_clock")
+
+    def __init__(self, window: float, buckets: int = 60, clock=time.monotonic):
+        self.window = window
+        self.width = window / buckets
+        self._counts = [0] * buckets
+        self._clock = clock
+        self._head = int(clock() // self.width) # Absolute number of the newest bucket
+        self._total = 0
+
+    def _advance(self, now):
+        index = int(now // self.width)
+        steps = index - self._head
+        if steps <= 0:
+            return
+        counts = self._counts
+        size = len(counts)
+        if steps >= size:
+            counts[:] = [0] * size
+            self._total = 0
+        else:
+            for i in range(self._head + 1, index + 1):
+                slot = i % size
+                self._total -= counts[slot]
+                counts[slot] = 0
+        self._head = index
+
+    def add(self, amount=1, now=None):
+        self._advance(self._clock() if now is None else now)
+        self._counts[self._head % len(self._counts)] += amount
+        self._total += amount
+
+    def count(self, now=None):
+        self._advance(self._clock() if now is None else now)
+        return self._total
+
+    def rate(self, now=None):
+        """Average events per second over the window."""
+        return self.count(now) / self.window
+
+
+class RateWindows:
+    """One event stream counted over several windows (1 s, 1 min, 15 min by default)."""
+    __slots__ = ("total", "_counters", "_clock")
+
+    def __init__(self, windows=DEFAULT_WINDOWS, clock=time.monotonic):
+        self.total = 0
+        self._clock = clock
+        self._counters = tuple((name, RollingCounter(seconds, buckets, clock)) for name, seconds, buckets in windows)
+
+    def add(self, amount=1):
+        now = self._clock()
+        self.total += amount
+        for _, counter in self._counters:
+            counter.add(amount, now)
+
+    def count(self, name) -> int:
+        for window, counter in self._counters:
+            if window == name:
+                return counter.count()
+        raise KeyError(name)
+
+    def snapshot(self) -> Dict[str, int]:
+        now = self._clock()
+        result = {name: counter.count(now) for name, counter in self._counters}
+        result["total"] = self.total
+        return result
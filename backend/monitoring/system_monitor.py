@@ -1,11 +1,24 @@
 import psutil
+import os
 import time
 import logging
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 
 logging.basicConfig(level=logging.INFO)
 _logger = logging.getLogger(__name__)
 
+MODEL_PATH = "/proc/device-tree/model"
+THERMAL_PATH = "/sys/class/thermal/thermal_zone0/temp"
+
+def read_board_model() -> str:
+    try:
+        if os.path.exists(MODEL_PATH):
+            with open(MODEL_PATH, "r") as f:
+                return f.read().strip('\x00')
+    except OSError:
+        pass
+    return "N/A"
+
 class SystemMonitor:
     def __init__(self):
         self.start_time = time.time()
@@ -13,11 +26,27 @@ class SystemMonitor:
         psutil.cpu_percent(interval=None)
         self.net_io_last = psutil.net_io_counters()
         self.net_io_last_time = time.time()
+        # Facts that cannot change while we run are read once
+        self.model = read_board_model()
+        self.cpu_count = psutil.cpu_count()
+        self.boot_time = psutil.boot_time()
+        self.memory_total = psutil.virtual_memory().total
+        self._has_thermal = os.path.exists(THERMAL_PATH)
+
+    def get_temperature(self) -> Optional[float]:
+        """SoC temperature in °C, or None without a thermal zone."""
+        if not self._has_thermal:
+            return None
+        try:
+            with open(THERMAL_PATH, "r") as f:
+                return round(float(f.read()) / 1000.0, 1)
+        except (OSError, ValueError):
+            return None
 
     def get_cpu_info(self) -> Dict[str, Any]:
         return {
             "percent": psutil.cpu_percent(interval=None),
-            "count": psutil.cpu_count(),
+            "count": self.cpu_count,
             "load_avg": psutil.getloadavg()
         }
 
@@ -64,6 +93,22 @@ class SystemMonitor:
             "memory": self.get_memory_info(),
             "disk": self.get_disk_info(),
             "network": self.get_network_info(),
-            "temp": 50.0, # Placeholder for RPi temperature reading
+            "temp": self.get_temperature(),
             "uptime_seconds": int(time.time() - self.start_time)
         }
+
+    def get_health_metrics(self) -> Dict[str, Any]:
+        """The flat summary served by /api/health (only the dynamic parts are sampled)."""
+        mem = psutil.virtual_memory()
+        disk = psutil.disk_usage('/')
+        return {
+            "cpu_percent": psutil.cpu_percent(interval=None),
+            "cpu_count": self.cpu_count,
+            "memory_percent": mem.percent,
+            "memory_total_gb": round(self.memory_total / (1024**3), 1),
+            "disk_percent": disk.percent,
+            "disk_total_gb": round(disk.total / (1024**3), 1),
+            "temperature": self.get_temperature() or 0.0,
+            "uptime": int(time.time() - self.boot_time),
+            "model": self.model
+        }
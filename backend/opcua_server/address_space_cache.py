@@ -0,0 +1,92 @@
+import asyncio
+import glob
+import logging
+import os
+from pathlib import Path
+
+import asyncua
+from asyncua.server.internal_server import InternalServer
+
+_logger = logging.getLogger(__name__)
+
+# Per asyncua version: the cached nodes are the library's standard address space.
+# Next to the database, wherever the process is started from.
+ASPACE_CACHE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                 "database", f"aspace-{asyncua.__version__}")
+
+
+# Index (or only) file per dbm backend: gdbm, Berkeley ndbm, dumb and ndbm
+_INDEX_SUFFIXES = ("", ".db", ".dir")
+
+
+def _cache_files(path):
+    pattern = glob.escape(str(path))
+    return glob.glob(pattern) + glob.glob(f"{pattern}.*")
+
+
+def _cache_present(path):
+    return any(os.path.isfile(f"{path}{suffix}") for suffix in _INDEX_SUFFIXES)
+
+
+class CachedAddressSpaceServer(InternalServer):
+    """
+    InternalServer that keeps the standard OPC UA address space in a shelf.
+
+    Building the standard nodes from generated code is most of the
+    server's init time. The first start builds them as usual and dumps
+    them to cache_path; later starts (and every restart from the UI) open
+    the shelf instead, and nodes are unpickled only when first accessed.
+    asyncua supports this through Server.init(shelf_file), but only
+    recognises gdbm/ndbm files; this works with whatever dbm module the
+    interpreter has, writes the shelf under a temporary name so a crash
+    never leaves half a cache behind, and falls back to building the nodes
+    if the cache cannot be read. The shelf stays open while the server
+    runs and is closed when it stops, or by close() if it never started.
+    """
+
+    def __init__(self, cache_path=None, user_manager=None):
+        super().__init__(user_manager=user_manager)
+        self.cache_path = Path(cache_path or ASPACE_CACHE_PATH)
+        self.cache_hit = False
+        self._shelf = None
+
+    async def load_standard_address_space(self, shelf_file=None):
+        path = self.cache_path
+        if _cache_present(path):
+            try:
+                self.aspace.load_aspace_shelf(path)
+                # asyncua reads nodes from the shelf on demand and never closes it
+                self._shelf = self.aspace._nodes.source
+                self.cache_hit = True
+                return
+            except Exception as e:
+                _logger.warning(f"Address space cache {path} unreadable, rebuilding: {e}")
+        await super().load_standard_address_space()
+        try:
+            await asyncio.to_thread(self._write_cache)
+        except Exception as e:
+            _logger.warning(f"Could not write address space cache {path}: {e}")
+
+    async def stop(self):
+        try:
+            await super().stop()
+        finally:
+            self.close()
+
+    def close(self):
+        """Releases the cache shelf; safe to call more than once."""
+        shelf, self._shelf = self._shelf, None
+        if shelf is not None:
+            shelf.close()
+
+    def _write_cache(self):
+        path = self.cache_path
+        os.makedirs(path.parent, exist_ok=True)
+        tmp = Path(f"{path}.tmp")
+        for stale in _cache_files(path): # Includes leftovers of an interrupted write
+            os.remove(stale)
+        self.aspace.make_aspace_shelf(tmp)
+        # Index files last: a cache only counts as present once every file is in place
+        for name in sorted(_cache_files(tmp), key=lambda f: f.endswith((".dir", ".db"))):
+            os.replace(name, f"{path}{name[len(str(tmp)):]}")
+        _logger.info(f"Cached the standard address space at {path}")
@@ -0,0 +1,170 @@
+import logging
+from array import array
+from bisect import bisect_left
+
+_logger = logging.getLogger(__name__)
+
+MAX_WINDOW = 1024
+MAX_OVERSAMPLE = 64
+
+
+def _window(stage, default):
+    size = int(stage.get("window", default))
+    if not 1 <= size <= MAX_WINDOW:
+        raise ValueError(f"window must be 1..{MAX_WINDOW}, got {size}")
+    return size
+
+
+class MedianFilter:
+    """Median of the last N samples; rejects single-sample spikes.
+
+    Keeps the window twice, both preallocated: a ring in arrival order and
+    the same values sorted. Each sample finds the oldest value's slot and
+    the new value's slot by bisection and slides the values between them
+    by one place (a memmove through a memoryview), so nothing is allocated
+    per sample. The slide makes a sample O(N) in the window, a short memmove
+    of at most N doubles.
+    """
+
+    def __init__(self, window=5):
+        self.window = window
+        self._ring = array("d", bytes(8 * window))
+        self._sorted = array("d", bytes(8 * window)) # First _count slots in use, ascending
+        self._view = memoryview(self._sorted)
+        self._count = 0
+        self._pos = 0
+
+    def reset(self):
+        self._count = self._pos = 0
+
+    def process(self, x):
+        ring, ordered, view = self._ring, self._sorted, self._view
+        n = self._count
+        j = bisect_left(ordered, x, 0, n)
+        if n == self.window:
+            # The new value takes the oldest one's place; the values in between move over by one
+            i = bisect_left(ordered, ring[self._pos], 0, n)
+            if j > i:
+                j -= 1
+                view[i:j] = view[i + 1:j + 1]
+            elif j < i:
+                view[j + 1:i + 1] = view[j:i]
+        else:
+            view[j + 1:n + 1] = view[j:n]
+            n = self._count = n + 1
+        ordered[j] = x
+        ring[self._pos] = x
+        self._pos = (self._pos + 1) % self.window
+        mid = n // 2
+        return ordered[mid] if n % 2 else (ordered[mid - 1] + ordered[mid]) / 2
+
+
+class EMAFilter:
+    """Exponential moving average: y += alpha * (x - y)."""
+
+    def __init__(self, alpha=0.2):
+        if not 0 < alpha <= 1:
+            raise ValueError(f"alpha must be in (0, 1], got {alpha}")
+        self.alpha = alpha
+        self._y = None
+
+    def reset(self):
+        self._y = None
+
+    def process(self, x):
+        y = self._y
+        self._y = x if y is None else y + self.alpha * (x - y)
+        return self._y
+
+
+class MovingAverageFilter:
+    """Mean of the last N samples from a running sum over a ring buffer."""
+
+    def __init__(self, window=10):
+        self.window = window
+        self._ring = array("d", bytes(8 * window))
+        self._pos = 0
+        self._count = 0
+        self._sum = 0.0
+        self._updates = 0
+
+    def reset(self):
+        self._pos = self._count = self._updates = 0
+        self._sum = 0.0
+
+    def process(self, x):
+        ring, pos = self._ring, self._pos
+        if self._count == self.window:
+            self._sum -= ring[pos]
+        else:
+            self._count += 1
+        ring[pos] = x
+        self._sum += x
+        self._pos = (pos + 1) % self.window
+        self._updates += 1
+        if self._updates >= 1000 * self.window:
+            # Drop floating point error accumulated by the running sum
+            self._sum = sum(ring[:self._count]) if self._count < self.window else sum(ring)
+            self._updates = 0
+        return self._sum / self._count
+
+
+_STAGES = {
+    "median": lambda stage: MedianFilter(_window(stage, 5)),
+    "ema": lambda stage: EMAFilter(float(stage.get("alpha", 0.2))),
+    "moving_average": lambda stage: MovingAverageFilter(_window(stage, 10)),
+}
+
+
+class ConditioningPipeline:
+    """
+    Per-node chain of filters applied to raw readings before scaling.
+
+    Configured from a list of stages, e.g.
+    [{"type": "oversample", "samples": 4}, {"type": "median", "window": 5},
+     {"type": "ema", "alpha": 0.2}]. Oversampling averages several back-to-back
+    conversions in the ADC driver, so it is exposed as the oversample count
+    rather than run here; the other stages run in list order. Filter state
+    lives in buffers sized once at construction. Missing readings (None)
+    pass through without touching the state, and non-numeric values
+    (GPIO booleans) are never filtered.
+    """
+
+    def __init__(self, stages=None):
+        self.config = list(stages or [])
+        self.oversample = 1
+        self.filters = []
+        for stage in self.config:
+            kind = stage.get("type")
+            if kind == "oversample":
+                self.oversample = int(stage.get("samples", 4))
+                if not 1 <= self.oversample <= MAX_OVERSAMPLE:
+                    raise ValueError(f"oversample samples must be 1..{MAX_OVERSAMPLE}")
+            elif kind in _STAGES:
+                self.filters.append(_STAGES[kind](stage))
+            else:
+                raise ValueError(f"unknown conditioning stage {kind!r}")
+
+    @classmethod
+    def from_node(cls, node_db):
+        """Builds the pipeline for a Node row; None when it has no conditioning."""
+        stages = getattr(node_db, "conditioning", None)
+        if not stages:
+            return None
+        try:
+            return cls(stages)
+        except (ValueError, TypeError, AttributeError) as e:
+            _logger.warning(f"Invalid conditioning config for {node_db.node_id}: {e}, publishing unfiltered values")
+            return None
+
+    def reset(self):
+        for stage in self.filters:
+            stage.reset()
+
+    def process(self, value):
+        if value is None or isinstance(value, bool) or not isinstance(value, (int, float)):
+            return value
+        value = float(value)
+        for stage in self.filters:
+            value = stage.process(value)
+        return value
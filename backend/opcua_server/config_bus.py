@@ -0,0 +1,55 @@
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
+
+_logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class NodeCreated:
+    node: Any  # Node row as committed
+
+
+@dataclass(frozen=True)
+class NodeUpdated:
+    node: Any  # Node row after the update
+    previous_node_id: Optional[str] = None  # Set when the OPC UA node id itself changed
+
+
+@dataclass(frozen=True)
+class NodeDeleted:
+    node_id: str
+
+
+@dataclass(frozen=True)
+class SettingsChanged:
+    changes: Dict[str, str] = field(default_factory=dict)
+
+
+class ConfigBus:
+    """
+    In-process publish/subscribe channel for configuration changes.
+
+    The API publishes a typed event after committing a change; subscribers
+    (the OPC UA server) apply it incrementally. Handlers are awaited in
+    subscription order so a request returns once the change is live, and a
+    failing handler is logged without affecting the others.
+    """
+
+    def __init__(self):
+        self._subscribers = []  # (handler, event types or None for all)
+
+    def subscribe(self, handler, *event_types):
+        self._subscribers.append((handler, event_types or None))
+
+    def unsubscribe(self, handler):
+        self._subscribers = [(h, t) for h, t in self._subscribers if h != handler]
+
+    async def publish(self, event):
+        for handler, event_types in list(self._subscribers):
+            if event_types is not None and not isinstance(event, event_types):
+                continue
+            try:
+                await handler(event)
+            except Exception as e:
+                _logger.error(f"Config handler {getattr(handler, '__qualname__', handler)} failed for {event}: {e}")
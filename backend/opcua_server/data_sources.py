@@ -4,47 +4,117 @@ import math
 import time
 import asyncio
 import logging
+import queue
+import threading
+
+from .hardware import registry, load_ads1115_driver, load_mcp3xxx_driver, DEFAULT_I2C_BUS
 
 logging.basicConfig(level=logging.INFO)
 _logger = logging.getLogger(__name__)
 
-try:
-    import RPi.GPIO as GPIO
-    HAS_GPIO = True
-except (ImportError, RuntimeError):
-    HAS_GPIO = False
-    _logger.warning("RPi.GPIO not found. GPIO sources will be mocked.")
-
-if HAS_GPIO:
-    try:
-        GPIO.setwarnings(False)
-        GPIO.setmode(GPIO.BCM)
-    except Exception as e:
-        _logger.error(f"Failed to initialize GPIO: {e}")
-
-
-# ADS1115 Imports
-try:
-    import board
-    import busio
-    import adafruit_ads1x15.ads1115 as ADS
-    from adafruit_ads1x15.analog_in import AnalogIn
-    HAS_ADS1115_LIB = True
-except (ImportError, RuntimeError, NotImplementedError):
-    HAS_ADS1115_LIB = False
-    _logger.warning("ADS1115 libraries not found or compatible. ADS sources will be mocked.")
-
-# MCP3008 / MCP3208 Imports (MCP3208 uses same library, just 12-bit resolution)
-try:
-    import board
-    import busio
-    import digitalio
-    import adafruit_mcp3xxx.mcp3008 as MCP3xxx
-    from adafruit_mcp3xxx.analog_in import AnalogIn as MCPAnalogIn
-    HAS_MCP3xxx_LIB = True
-except (ImportError, RuntimeError, NotImplementedError):
-    HAS_MCP3xxx_LIB = False
-    _logger.warning("MCP3xxx libraries not found or compatible. MCP3008/MCP3208 sources will be mocked.")
+# RPi.GPIO is imported, and switched to BCM numbering, when the first GPIO
+# source is created; both stay None until then
+GPIO = None
+HAS_GPIO = None
+_gpio_lock = threading.Lock()
+
+def load_gpio():
+    """Imports and initializes RPi.GPIO (or the fake_hardware stand-in) once. Returns whether it is available."""
+    global GPIO, HAS_GPIO
+    with _gpio_lock:
+        if HAS_GPIO is not None:
+            return HAS_GPIO
+        from . import fake_hardware
+        if fake_hardware.enabled():
+            GPIO = fake_hardware.GPIO
+        else:
+            try:
+                import RPi.GPIO as GPIO
+            except (ImportError, RuntimeError):
+                HAS_GPIO = False
+                _logger.warning("RPi.GPIO not found. GPIO sources will be mocked.")
+                return HAS_GPIO
+        try:
+            GPIO.setwarnings(False)
+            GPIO.setmode(GPIO.BCM)
+        except Exception as e:
+            _logger.error(f"Failed to initialize GPIO: {e}")
+        HAS_GPIO = True
+        return HAS_GPIO
+
+# Bus executor layer: blocking driver calls run on one worker thread per
+# physical bus so the asyncio loop (OPC UA sessions + API) never waits on
+# an I2C/SPI conversion. Async callers only await futures.
+
+BUS_QUEUE_SIZE = 64
+
+class BusQueueFull(RuntimeError):
+    """Raised when a bus already has BUS_QUEUE_SIZE transactions pending."""
+
+def _resolve(future, result, error):
+    # Runs on the event loop thread
+    if future.cancelled():
+        return
+    if error is not None:
+        future.set_exception(error)
+    else:
+        future.set_result(result)
+
+class BusWorker:
+    """Owns one physical bus: a single thread draining a bounded job queue."""
+    def __init__(self, bus_key, max_pending=BUS_QUEUE_SIZE):
+        self.bus_key = bus_key
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._thread = threading.Thread(target=self._run, name=f"bus-{bus_key}", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            if job is None:
+                break
+            loop, future, fn, args = job
+            result, error = None, None
+            try:
+                result = fn(*args)
+            except BaseException as e:
+                error = e
+            try:
+                loop.call_soon_threadsafe(_resolve, future, result, error)
+            except RuntimeError:
+                pass # Loop closed while the job was in flight
+
+    async def run(self, fn, *args):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        try:
+            self._queue.put_nowait((loop, future, fn, args))
+        except queue.Full:
+            raise BusQueueFull(f"Bus {self.bus_key} has {self._queue.maxsize} pending transactions")
+        return await future
+
+    def stop(self):
+        self._queue.put(None)
+        self._thread.join(timeout=1)
+
+_bus_workers = {} # bus_key -> BusWorker
+_bus_workers_lock = threading.Lock()
+
+def get_bus_worker(bus_key):
+    worker = _bus_workers.get(bus_key)
+    if worker is None:
+        with _bus_workers_lock:
+            worker = _bus_workers.get(bus_key)
+            if worker is None:
+                worker = _bus_workers[bus_key] = BusWorker(bus_key)
+    return worker
+
+def shutdown_bus_workers():
+    with _bus_workers_lock:
+        workers = list(_bus_workers.values())
+        _bus_workers.clear()
+    for worker in workers:
+        worker.stop()
 
 class DataSource(abc.ABC):
     def __init__(self, config):
@@ -52,6 +122,28 @@ class DataSource(abc.ABC):
         self.name = config.get("name")
         self.error = None
 
+    @property
+    def bus_key(self):
+        """Identifies the physical bus this source shares with others.
+        Reads on the same bus are serialized; None means no shared hardware."""
+        return None
+
+    def close(self):
+        """Releases shared hardware held by this source."""
+        pass
+
+    def set_oversample(self, samples):
+        """Averages this many conversions per reading, where the hardware allows it."""
+        scanner = getattr(self, "scanner", None)
+        if scanner is not None:
+            scanner.set_oversample(self.channel, samples)
+        elif samples > 1 and not hasattr(self, "scanner"):
+            _logger.warning(f"Source {self.name} cannot oversample; ignoring oversample={samples}")
+
+    async def run_on_bus(self, fn, *args):
+        """Runs a blocking driver call on this source's bus worker thread."""
+        return await get_bus_worker(self.bus_key or "default").run(fn, *args)
+
     @abc.abstractmethod
     async def read(self):
         pass
@@ -60,6 +152,26 @@ class DataSource(abc.ABC):
     async def write(self, value):
         pass
 
+def _read_scanned_channels(sources):
+    # Runs on the bus worker thread: one job covers every scanned channel of a bus group
+    values = []
+    for source in sources:
+        try:
+            values.append(source.scanner.read_channel(source.channel))
+        except Exception as e:
+            source.error = str(e)
+            values.append(None)
+    return values
+
+async def read_scanned(sources):
+    """
+    Reads ADC sources backed by a chip scanner (all on one bus) in a single
+    bus worker job instead of one job per channel. Returns values in order.
+    """
+    if not sources:
+        return []
+    return await sources[0].run_on_bus(_read_scanned_channels, sources)
+
 class SimulationSource(DataSource):
     def __init__(self, config):
         super().__init__(config)
@@ -89,19 +201,40 @@ class SimulationSource(DataSource):
     async def write(self, value):
         _logger.info(f"Simulation source {self.name} is read-only. Write ignored.")
 
+# Smoothing factor for the edge frequency estimate
+EDGE_FREQ_ALPHA = 0.2
+
+# Pins with edge detection installed -> owning GPIOSource. Lets a rebuilt
+# source take over a pin before the one it replaces is closed.
+_edge_owners = {}
+
 class GPIOSource(DataSource):
     def __init__(self, config):
         super().__init__(config)
         self.pin = config.get("pin")
         self.mode = config.get("mode", "input") # input or output
+        # Edge mode: RPi.GPIO callbacks push changes instead of the poller sampling the pin.
+        # Only set once edge detection is installed; otherwise the pin is polled as before.
+        self.event_driven = False
+        self.debounce_ms = int(config.get("debounce_ms") or 0)
+        self.level = None
+        self.rising_edges = 0
+        self.falling_edges = 0
+        self.frequency_hz = 0.0 # EMA of rising-edge rate
+        self._last_rising = None
+        self._last_edge = None
+        self._listener = None # (loop, callback) receiving level changes on the event loop
+        self._edge_lock = threading.Lock()
         
-        if HAS_GPIO:
+        if load_gpio():
             try:
                 if self.mode == "input":
                     # robust: use Pull Down so unconnected pins read 0 (False) instead of floating
                     GPIO.setup(self.pin, GPIO.IN, pull_up_down=GPIO.PUD_DOWN)
                 else:
                     GPIO.setup(self.pin, GPIO.OUT)
+                if self.mode == "input" and config.get("event_driven"):
+                    self._start_edge_detection()
                 
                 _logger.info(f"Successfully setup GPIO pin {self.pin} as {self.mode}")
             except Exception as e:
@@ -109,6 +242,72 @@ class GPIOSource(DataSource):
                 _logger.error(f"Error setting up GPIO pin {self.pin}: {e}")
         else:
             self.error = "RPi.GPIO not available (running in mock mode)"
+
+    @property
+    def bus_key(self):
+        return "gpio"
+
+    def _start_edge_detection(self):
+        if self.pin in _edge_owners:
+            GPIO.remove_event_detect(self.pin)
+        kwargs = {"bouncetime": self.debounce_ms} if self.debounce_ms > 0 else {}
+        GPIO.add_event_detect(self.pin, GPIO.BOTH, callback=self._on_edge, **kwargs)
+        _edge_owners[self.pin] = self
+        self.level = GPIO.input(self.pin)
+        self.event_driven = True
+
+    def close(self):
+        if _edge_owners.get(self.pin) is self:
+            del _edge_owners[self.pin]
+            try:
+                GPIO.remove_event_detect(self.pin)
+            except Exception as e:
+                _logger.error(f"Error removing edge detection on GPIO pin {self.pin}: {e}")
+
+    def set_listener(self, callback, loop=None):
+        """Delivers callback(level) on the event loop whenever the pin level changes."""
+        self._listener = (loop or asyncio.get_running_loop(), callback)
+
+    def _on_edge(self, channel):
+        # Runs on the RPi.GPIO callback thread
+        level = GPIO.input(self.pin)
+        now = time.monotonic()
+        with self._edge_lock:
+            self._last_edge = now
+            if level:
+                self.rising_edges += 1
+                if self._last_rising is not None and now > self._last_rising:
+                    rate = 1.0 / (now - self._last_rising)
+                    self.frequency_hz = rate if not self.frequency_hz else \
+                        EDGE_FREQ_ALPHA * rate + (1 - EDGE_FREQ_ALPHA) * self.frequency_hz
+                self._last_rising = now
+            else:
+                self.falling_edges += 1
+            changed = level != self.level
+            self.level = level
+        listener = self._listener
+        if changed and listener is not None:
+            loop, callback = listener
+            try:
+                loop.call_soon_threadsafe(callback, level)
+            except RuntimeError:
+                pass # Loop already closed
+
+    def get_edge_stats(self):
+        with self._edge_lock:
+            frequency = self.frequency_hz
+            # Stop reporting a rate once two expected periods pass without an edge
+            if frequency and time.monotonic() - self._last_rising > 2.0 / frequency:
+                frequency = 0.0
+            return {
+                "pin": self.pin,
+                "level": self.level,
+                "rising_edges": self.rising_edges,
+                "falling_edges": self.falling_edges,
+                "frequency_hz": round(frequency, 3),
+                "debounce_ms": self.debounce_ms,
+            }
+
     async def read(self):
         if self.error and not HAS_GPIO: # If mock mode but we have an error string
              # We should probably still return something for the OPC UA node
@@ -116,8 +315,10 @@ class GPIOSource(DataSource):
              pass
 
         if HAS_GPIO:
+            if self.event_driven and not self.error:
+                return self.level # Kept current by the edge callback
             try:
-                return GPIO.input(self.pin)
+                return await self.run_on_bus(GPIO.input, self.pin)
             except Exception as e:
                 self.error = str(e)
                 return None # None will indicate "Red" in the UI
@@ -129,7 +330,7 @@ class GPIOSource(DataSource):
         if self.mode == "output":
             if HAS_GPIO:
                 try:
-                    GPIO.output(self.pin, 1 if value else 0)
+                    await self.run_on_bus(GPIO.output, self.pin, 1 if value else 0)
                     self.error = None
                 except Exception as e:
                     self.error = str(e)
@@ -156,14 +357,20 @@ class ADS1115Source(DataSource):
         self.channel = config.get("channel", 0)
         self.gain = config.get("gain", 1)
         self.i2c_addr = config.get("i2c_address", 0x48)
+        self.i2c_bus = int(config.get("i2c_bus", DEFAULT_I2C_BUS)) # Other buses need adafruit-extended-bus
+        self.data_rate = config.get("data_rate") # Per chip: 8..860 SPS, None keeps the current rate
+        self.continuous = config.get("continuous") # Per chip: only honoured with one channel in use
         self.mock_val = 0.0
+        self._device_key = None
+        self.scanner = None
         
-        if HAS_ADS1115_LIB:
+        if load_ads1115_driver():
             try:
-                # Initialize I2C bus
-                self.i2c = busio.I2C(board.SCL, board.SDA)
-                self.ads = ADS.ADS1115(self.i2c, address=self.i2c_addr, gain=self.gain)
-                self.chan = AnalogIn(self.ads, getattr(ADS, f"P{self.channel}"))
+                # Shared chip scanner from the hardware registry
+                self._device_key, self.scanner = registry.ads1115(self.i2c_addr, bus=self.i2c_bus, gain=self.gain)
+                self.scanner.add_channel(self.channel)
+                if self.data_rate is not None or self.continuous is not None:
+                    self.scanner.configure(data_rate=self.data_rate, continuous=self.continuous)
                 _logger.info(f"Initialized ADS1115 Channel {self.channel} at {hex(self.i2c_addr)}")
             except Exception as e:
                 self.error = str(e)
@@ -171,10 +378,21 @@ class ADS1115Source(DataSource):
         else:
             self.error = "ADS1115 Library Missing (Mock Mode)"
 
+    @property
+    def bus_key(self):
+        return f"i2c:{self.i2c_bus}"
+
+    def close(self):
+        if self._device_key:
+            self.scanner.remove_channel(self.channel)
+            registry.release(self._device_key)
+            self._device_key = None
+
     async def read(self):
-        if HAS_ADS1115_LIB and not self.error:
+        if self.scanner is not None and not self.error:
             try:
-                return self.chan.voltage
+                # The first channel read in a cycle scans the whole chip
+                return await self.run_on_bus(self.scanner.read_channel, self.channel)
             except Exception as e:
                 self.error = str(e)
                 return None  # Indicates read failure
@@ -186,30 +404,47 @@ class ADS1115Source(DataSource):
         _logger.warning("Cannot write to ADC (Read Only)")
 
 class MCP3008Source(DataSource):
+    """Data source for one channel of an MCP3008 10-bit SPI ADC (8 channels)."""
+    MODEL = "mcp3008"
+
     def __init__(self, config):
         super().__init__(config)
         self.channel = config.get("channel", 0)
         self.cs_pin = config.get("cs_pin", 8) # CE0 defaults to GPIO 8
         self.mock_val = 0.0
+        self._device_key = None
+        self.scanner = None
         
-        if HAS_MCP3xxx_LIB:
+        if load_mcp3xxx_driver():
             try:
-                # Initialize SPI bus
-                self.spi = busio.SPI(clock=board.SCK, MISO=board.MISO, MOSI=board.MOSI)
-                self.cs = digitalio.DigitalInOut(getattr(board, f"D{self.cs_pin}"))
-                self.mcp = MCP3xxx.MCP3008(self.spi, self.cs)
-                self.chan = MCPAnalogIn(self.mcp, getattr(MCP3xxx, f"P{self.channel}"))
-                _logger.info(f"Initialized MCP3008 Channel {self.channel} with CS pin {self.cs_pin}")
+                # Shared chip scanner from the hardware registry
+                self._device_key, self.scanner = registry.mcp3xxx(
+                    self.cs_pin, model=self.MODEL,
+                    baudrate=config.get("spi_baudrate") or 1000000,
+                    ref_voltage=config.get("ref_voltage") or 3.3)
+                self.scanner.add_channel(self.channel)
+                _logger.info(f"Initialized {self.MODEL.upper()} Channel {self.channel} with CS pin {self.cs_pin}")
             except Exception as e:
                 self.error = str(e)
-                _logger.error(f"Failed to initialize MCP3008: {e}")
+                _logger.error(f"Failed to initialize {self.MODEL.upper()}: {e}")
         else:
             self.error = "MCP3xxx Library Missing (Mock Mode)"
 
+    @property
+    def bus_key(self):
+        return f"spi:0:cs{self.cs_pin}"
+
+    def close(self):
+        if self._device_key:
+            self.scanner.remove_channel(self.channel)
+            registry.release(self._device_key)
+            self._device_key = None
+
     async def read(self):
-        if HAS_MCP3xxx_LIB and not self.error:
+        if self.scanner is not None and not self.error:
             try:
-                return self.chan.voltage
+                # The first channel read in a cycle bursts all channels of the chip
+                return await self.run_on_bus(self.scanner.read_channel, self.channel)
             except Exception as e:
                 self.error = str(e)
                 return None  # Indicates read failure
@@ -220,70 +455,57 @@ class MCP3008Source(DataSource):
     async def write(self, value):
          _logger.warning("Cannot write to ADC (Read Only)")
 
-class MCP3208Source(DataSource):
-    """Data source for MCP3208 12-bit SPI ADC (8 channels).
-    Note: Uses same library as MCP3008 - the hardware handles 12-bit resolution.
-    """
-    def __init__(self, config):
-        super().__init__(config)
-        self.channel = config.get("channel", 0)
-        self.cs_pin = config.get("cs_pin", 8) # CE0 defaults to GPIO 8
-        self.mock_val = 0.0
-        
-        if HAS_MCP3xxx_LIB:
-            try:
-                # Initialize SPI bus
-                # MCP3208 uses same class as MCP3008 - the chip itself handles 12-bit
-                self.spi = busio.SPI(clock=board.SCK, MISO=board.MISO, MOSI=board.MOSI)
-                self.cs = digitalio.DigitalInOut(getattr(board, f"D{self.cs_pin}"))
-                self.mcp = MCP3xxx.MCP3008(self.spi, self.cs)
-                self.chan = MCPAnalogIn(self.mcp, getattr(MCP3xxx, f"P{self.channel}"))
-                _logger.info(f"Initialized MCP3208 Channel {self.channel} with CS pin {self.cs_pin}")
-            except Exception as e:
-                self.error = str(e)
-                _logger.error(f"Failed to initialize MCP3208: {e}")
-        else:
-            self.error = "MCP3xxx Library Missing (Mock Mode)"
+class MCP3208Source(MCP3008Source):
+    """Data source for one channel of an MCP3208 12-bit SPI ADC (8 channels)."""
+    MODEL = "mcp3208"
 
-    async def read(self):
-        if HAS_MCP3xxx_LIB and not self.error:
-            try:
-                return self.chan.voltage
-            except Exception as e:
-                self.error = str(e)
-                return None  # Indicates read failure
-        else:
-            # No connection: Return None to indicate error state
-            return None
 
-    async def write(self, value):
-         _logger.warning("Cannot write to ADC (Read Only)")
+def _create_analog(config):
+    # Dispatcher for generic 'analog' type from frontend
+    adc_device = config.get("adc_device", "ads1115")
+    if adc_device == "mcp3008":
+        return MCP3008Source(config)
+    elif adc_device == "mcp3208":
+        return MCP3208Source(config)
+    else:  # Default to ADS1115
+        return ADS1115Source(config)
 
+# Entry point group for third-party source types. Each entry point names a
+# DataSource subclass (or any callable taking the source config), e.g. in
+# a plugin's pyproject.toml:
+#   [project.entry-points."opcua_server.data_sources"]
+#   modbus = "opcua_modbus:ModbusSource"
+ENTRY_POINT_GROUP = "opcua_server.data_sources"
 
-class SourceFactory:
-    @staticmethod
-    def create(config):
-        stype = config.get("type")
-        if stype == "simulation":
-            return SimulationSource(config)
-        elif stype == "gpio":
-            return GPIOSource(config)
-        elif stype == "manual":
-            return ManualSource(config)
-        elif stype == "ads1115":
-            return ADS1115Source(config)
-        elif stype == "mcp3008":
-            return MCP3008Source(config)
-        elif stype == "mcp3208":
-            return MCP3208Source(config)
-        elif stype == "analog":
-            # Dispatcher for generic 'analog' type from frontend
-            adc_device = config.get("adc_device", "ads1115")
-            if adc_device == "mcp3008":
-                return MCP3008Source(config)
-            elif adc_device == "mcp3208":
-                return MCP3208Source(config)
-            else:  # Default to ADS1115
-                return ADS1115Source(config)
-        else:
-            raise ValueError(f"Unknown source type: {stype}")
+# Source type -> factory. Hardware drivers are imported by the factories
+# when the first node of their type is created, plugins when first named.
+_source_types = {
+    "simulation": SimulationSource,
+    "gpio": GPIOSource,
+    "manual": ManualSource,
+    "ads1115": ADS1115Source,
+    "mcp3008": MCP3008Source,
+    "mcp3208": MCP3208Source,
+    "analog": _create_analog,
+}
+
+def register_source_type(name, factory):
+    """Makes source type name create its sources with factory(config)."""
+    _source_types[name] = factory
+
+def _load_plugin(stype):
+    from importlib.metadata import entry_points
+    for entry_point in entry_points(group=ENTRY_POINT_GROUP, name=stype):
+        factory = entry_point.load()
+        _logger.info(f"Loaded source type {stype} from {entry_point.value}")
+        register_source_type(stype, factory)
+        return factory
+    return None
+
+def create_source(config):
+    """Creates the data source for a node's source config, whose "type" selects the driver."""
+    stype = config.get("type")
+    factory = _source_types.get(stype) or _load_plugin(stype)
+    if factory is None:
+        raise ValueError(f"Unknown source type: {stype}")
+    return factory(config)
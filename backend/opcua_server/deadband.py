@@ -0,0 +1,88 @@
+import logging
+
+_logger = logging.getLogger(__name__)
+
+
+def _to_float(value, default=None):
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return default
+
+
+class DeadbandFilter:
+    """
+    Decides whether a new sample is worth an address-space write.
+
+    The absolute band and the percent band (of the node's engineering range)
+    are combined by taking the wider of the two, as in OPC UA's
+    PercentDeadband. A value is published when it moves more than the band
+    away from the last *published* value, so slow drifts are still reported
+    once they accumulate. publish_on_change suppresses exact repeats.
+    Transitions to and from None (read failure) are always published.
+    """
+    __slots__ = ("band", "on_change", "last", "has_last", "published", "suppressed")
+
+    def __init__(self, deadband_abs=None, deadband_percent=None, publish_on_change=False, eu_range=None):
+        band = abs(_to_float(deadband_abs, 0.0))
+        percent = abs(_to_float(deadband_percent, 0.0))
+        if percent and eu_range:
+            band = max(band, percent / 100.0 * abs(eu_range))
+        self.band = band
+        self.on_change = bool(publish_on_change)
+        self.last = None
+        self.has_last = False
+        self.published = 0
+        self.suppressed = 0
+
+    @property
+    def active(self):
+        return self.on_change or self.band > 0
+
+    @classmethod
+    def from_node(cls, node_db):
+        """Builds the filter from a Node row; the percent band uses the scaled
+        range when scaling is on, else the source's min/max, else the voltage range."""
+        source_cfg = node_db.source_config or {}
+        if node_db.scale_enabled:
+            lo, hi = _to_float(node_db.scale_min, 0.0), _to_float(node_db.scale_max, 100.0)
+        elif source_cfg.get("min") is not None and source_cfg.get("max") is not None:
+            lo, hi = _to_float(source_cfg.get("min"), 0.0), _to_float(source_cfg.get("max"), 0.0)
+        else:
+            lo, hi = _to_float(node_db.voltage_min, 0.0), _to_float(node_db.voltage_max, 3.3)
+        return cls(
+            deadband_abs=getattr(node_db, "deadband_abs", None),
+            deadband_percent=getattr(node_db, "deadband_percent", None),
+            publish_on_change=getattr(node_db, "publish_on_change", False),
+            eu_range=hi - lo,
+        )
+
+    def accept(self, value):
+        """Returns True if value should be written, updating the counters."""
+        if self.has_last and self.active:
+            last = self.last
+            if value is None or last is None:
+                publish = value is not last
+            elif self.band > 0 and not isinstance(value, bool):
+                try:
+                    publish = abs(value - last) > self.band
+                except TypeError:
+                    publish = value != last
+            else:
+                publish = value != last
+            if not publish:
+                self.suppressed += 1
+                return False
+
+        self.last = value
+        self.has_last = True
+        self.published += 1
+        return True
+
+    def get_stats(self):
+        return {
+            "deadband": self.band,
+            "publish_on_change": self.on_change,
+            "published_writes": self.published,
+            "suppressed_writes": self.suppressed,
+        }
@@ -0,0 +1,199 @@
+import heapq
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+
+_logger = logging.getLogger(__name__)
+
+DEFAULT_CYCLE_HISTORY = 256
+DEFAULT_TOP_SOURCES = 5
+MAX_PROFILE_SECONDS = 30.0
+MIN_PROFILE_INTERVAL = 0.001
+# GIL switch interval while profiling, so samples are not biased towards idle
+PROFILE_SWITCH_INTERVAL = 0.0002
+
+
+def _percentiles(values):
+    if not values:
+        return {"avg_ms": 0.0, "p50_ms": 0.0, "p95_ms": 0.0, "max_ms": 0.0}
+    ordered = sorted(values)
+    n = len(ordered)
+    return {
+        "avg_ms": round(sum(ordered) / n * 1000, 3),
+        "p50_ms": round(ordered[n // 2] * 1000, 3),
+        "p95_ms": round(ordered[min(n - 1, int(n * 0.95))] * 1000, 3),
+        "max_ms": round(ordered[-1] * 1000, 3),
+    }
+
+
+class CycleRecord:
+    """Timing of one acquisition cycle."""
+    __slots__ = ("started", "jitter", "duration", "nodes", "overrun", "slowest")
+
+    def __init__(self, started, jitter, duration, nodes, overrun, slowest):
+        self.started = started
+        self.jitter = jitter
+        self.duration = duration
+        self.nodes = nodes
+        self.overrun = overrun
+        self.slowest = slowest # [(source, seconds)], slowest first
+
+    def to_dict(self):
+        return {
+            "started": self.started,
+            "jitter_ms": round(self.jitter * 1000, 3),
+            "duration_ms": round(self.duration * 1000, 3),
+            "nodes": self.nodes,
+            "overrun": self.overrun,
+            "slowest": [{"source": s, "ms": round(t * 1000, 3)} for s, t in self.slowest],
+        }
+
+
+class PollDiagnostics:
+    """
+    Always-on record of the last N poll cycles.
+
+    Each cycle keeps its start jitter (how late the earliest due node was
+    dispatched), its total duration and its top-N slowest reads. The top-N
+    is a small min-heap updated as reads finish, so a read costs one
+    comparison unless it is among the slowest so far; the cycle buffer is a
+    bounded deque. Percentiles and per-source aggregates are only computed
+    when a report is requested.
+    """
+
+    def __init__(self, capacity=DEFAULT_CYCLE_HISTORY, top_n=DEFAULT_TOP_SOURCES):
+        self.top_n = top_n
+        self._cycles = deque(maxlen=capacity)
+        self._top = []
+        self.total_cycles = 0
+        self.total_overruns = 0
+
+    def reset(self):
+        self._cycles.clear()
+        self._top = []
+        self.total_cycles = 0
+        self.total_overruns = 0
+
+    def start_cycle(self):
+        self._top = []
+
+    def record_read(self, source, seconds):
+        top = self._top
+        if len(top) < self.top_n:
+            heapq.heappush(top, (seconds, source))
+        elif seconds > top[0][0]:
+            heapq.heapreplace(top, (seconds, source))
+
+    def end_cycle(self, jitter, duration, nodes, overrun):
+        slowest = [(source, seconds) for seconds, source in sorted(self._top, reverse=True)]
+        self._cycles.append(CycleRecord(time.time(), jitter, duration, nodes, overrun, slowest))
+        self.total_cycles += 1
+        if overrun:
+            self.total_overruns += 1
+
+    def get_report(self, recent=20):
+        cycles = list(self._cycles)
+        sources = {}
+        for cycle in cycles:
+            for source, seconds in cycle.slowest:
+                entry = sources.setdefault(source, [0, 0.0, 0.0])
+                entry[0] += 1
+                entry[1] += seconds
+                entry[2] = max(entry[2], seconds)
+        slowest = sorted(sources.items(), key=lambda item: item[1][2], reverse=True)
+        return {
+            "cycles": self.total_cycles,
+            "overruns": self.total_overruns,
+            "window": len(cycles),
+            "overruns_in_window": sum(1 for c in cycles if c.overrun),
+            "duration": _percentiles([c.duration for c in cycles]),
+            "jitter": _percentiles([c.jitter for c in cycles]),
+            "slowest_sources": [
+                {"source": source, "times_in_top": n, "avg_ms": round(total / n * 1000, 3), "max_ms": round(peak * 1000, 3)}
+                for source, (n, total, peak) in slowest[:20]
+            ],
+            "recent": [c.to_dict() for c in cycles[-recent:]] if recent > 0 else [],
+        }
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+
+def _is_idle(frame):
+    """True if a thread is parked waiting (selector, lock or queue) rather than working."""
+    name = os.path.basename(frame.f_code.co_filename)
+    return name in ("selectors.py", "threading.py", "queue.py") or frame.f_code.co_name in ("select", "poll")
+
+
+class StackSampler:
+    """
+    Opt-in sampling profiler for the acquisition path.
+
+    A helper thread snapshots the event loop thread's stack every interval.
+    Samples taken while the poll task is running are folded from poll_nodes
+    down ("a;b;c" with a count, the flame graph input format). Bus worker
+    threads are sampled as well when busy, since the hardware reads run
+    there. Nothing is installed in the interpreter. The GIL switch interval
+    is shortened while sampling; otherwise the sampler only gets the GIL
+    when the loop blocks in select() and every sample would look idle.
+    The loop pays for those extra GIL hand-offs only while a profile runs.
+    """
+
+    def __init__(self, loop_thread_id, marker="poll_nodes", worker_prefix="bus-"):
+        self.loop_thread_id = loop_thread_id
+        self.marker = marker
+        self.worker_prefix = worker_prefix
+
+    def _fold(self, frame, stop_at=None):
+        labels = []
+        while frame is not None:
+            labels.append(_frame_label(frame))
+            if stop_at is not None and frame.f_code.co_name == stop_at:
+                return ";".join(reversed(labels))
+            frame = frame.f_back
+        return None if stop_at is not None else ";".join(reversed(labels))
+
+    def run(self, duration, interval):
+        """Samples for duration seconds (blocking; call from a worker thread)."""
+        stacks = Counter()
+        counts = {"samples": 0, "acquisition": 0, "idle": 0, "other": 0, "bus_worker": 0}
+        own = threading.get_ident()
+        switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(min(switch_interval, PROFILE_SWITCH_INTERVAL))
+        try:
+            self._sample(duration, interval, stacks, counts, own)
+        finally:
+            sys.setswitchinterval(switch_interval)
+        return {
+            **counts,
+            "stacks": [{"stack": stack, "count": n} for stack, n in stacks.most_common(50)],
+        }
+
+    def _sample(self, duration, interval, stacks, counts, own):
+        deadline = time.monotonic() + duration
+        while time.monotonic() < deadline:
+            workers = {t.ident: t.name for t in threading.enumerate() if t.name.startswith(self.worker_prefix)}
+            frames = sys._current_frames()
+            counts["samples"] += 1
+            loop_frame = frames.get(self.loop_thread_id)
+            if loop_frame is not None:
+                folded = self._fold(loop_frame, stop_at=self.marker)
+                if folded is not None:
+                    counts["acquisition"] += 1
+                    stacks[folded] += 1
+                elif _is_idle(loop_frame):
+                    counts["idle"] += 1
+                else:
+                    counts["other"] += 1
+            for ident, name in workers.items():
+                frame = frames.get(ident)
+                if ident != own and frame is not None and not _is_idle(frame):
+                    counts["bus_worker"] += 1
+                    stacks[f"{name};{self._fold(frame)}"] += 1
+            del frames, loop_frame
+            time.sleep(interval)
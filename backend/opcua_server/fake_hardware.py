@@ -0,0 +1,476 @@
+"""
+Simulated I2C, SPI and GPIO backends for development machines and CI.
+
+Set OPCUA_FAKE_HARDWARE=1 (built-in defaults) or point it at a JSON file
+and hardware.py / data_sources.py bind these stand-ins instead of Blinka,
+adafruit_ads1x15 and RPi.GPIO. The data sources, chip scanners, bus
+workers and hardware registry are the real ones; only the bottom layer
+(bus transactions and pin levels) is simulated:
+
+  - ADS1115 chips answer on the I2C bus, with single-shot conversions
+    taking 1/data_rate and values quantized to 16 bits at the chip gain
+  - MCP3008/MCP3208 chips decode the real SPI command frames and spend
+    the 24-clock wire time at the configured baudrate
+  - GPIO inputs follow a waveform and fire edge callbacks from a thread,
+    as RPi.GPIO does; outputs keep the written level
+
+Every transaction can add a fixed latency plus random jitter and fail with
+an injected fault. Configuration:
+
+    {
+      "seed": 1,
+      "buses": {"i2c": {"latency_ms": 0.3, "jitter_ms": 0.1}, "spi": {"latency_ms": 0.015}},
+      "devices": {
+        "ads1115@0x48": {"channels": {"0": {"type": "sine", "min": 0.5, "max": 2.5, "period": 10}},
+                         "error_rate": 0.01, "faults": [[30, 35]]},
+        "mcp3008@cs8": {"offline": true},
+        "gpio17": {"waveform": {"type": "square", "period": 0.5}}
+      }
+    }
+
+Device names match the chip scanner names (ads1115@<address>,
+<model>@cs<pin>) and gpio<pin>. Device settings override the bus
+settings. Fault windows are [start, end] seconds since the configuration
+was loaded. Waveform types: constant, sine, ramp, square, noise and
+script ({"points": [[t, value], ...], "loop": true, "interpolate": false}).
+"""
+import errno
+import json
+import logging
+import math
+import os
+import random
+import threading
+import time
+from types import SimpleNamespace
+
+_logger = logging.getLogger(__name__)
+
+ENV_VAR = "OPCUA_FAKE_HARDWARE"
+
+DEFAULT_BUSES = {
+    "i2c": {"latency_ms": 0.25, "jitter_ms": 0.05}, # One register access at 400 kHz plus the ioctl
+    "spi": {"latency_ms": 0.015, "jitter_ms": 0.005}, # Per-transfer driver overhead; wire time is added
+    "gpio": {"latency_ms": 0.005, "jitter_ms": 0.0},
+}
+EDGE_POLL_INTERVAL = 0.001
+
+# ADS1115 full-scale range per gain (mirrors adafruit_ads1x15)
+ADS1115_FSR = {2 / 3: 6.144, 1: 4.096, 2: 2.048, 4: 1.024, 8: 0.512, 16: 0.256}
+ADS1115_DEFAULT_RATE = 128
+ADS1115_MODE_SINGLE = 0x0100
+
+
+def enabled():
+    return os.getenv(ENV_VAR, "").strip().lower() not in ("", "0", "false", "no")
+
+
+# Waveforms: callables of seconds since the configuration was loaded
+
+def make_waveform(spec, default_min=0.0, default_max=3.3, phase=0.0):
+    """Builds value(t) from a waveform spec (a dict, or a bare number for a constant)."""
+    if spec is None:
+        spec = {"type": "sine"}
+    elif isinstance(spec, (int, float)):
+        spec = {"type": "constant", "value": spec}
+    kind = spec.get("type", "sine")
+    low = float(spec.get("min", default_min))
+    high = float(spec.get("max", default_max))
+    period = float(spec.get("period", 10.0))
+    phase = float(spec.get("phase", phase))
+
+    if kind == "constant":
+        value = float(spec.get("value", low))
+        return lambda t: value
+    if kind == "sine":
+        mid, amp = (high + low) / 2, (high - low) / 2
+        return lambda t: mid + amp * math.sin(2 * math.pi * (t / period + phase))
+    if kind == "ramp":
+        return lambda t: low + (high - low) * (((t / period) + phase) % 1.0)
+    if kind == "square":
+        duty = float(spec.get("duty", 0.5))
+        return lambda t: high if ((t / period) + phase) % 1.0 < duty else low
+    if kind == "noise":
+        rng = random.Random(spec.get("seed"))
+        return lambda t: rng.uniform(low, high)
+    if kind == "script":
+        points = sorted((float(t), float(v)) for t, v in spec["points"])
+        loop = spec.get("loop", True)
+        interpolate = spec.get("interpolate", False)
+        span = points[-1][0] or 1.0
+
+        def script(t):
+            if loop:
+                t %= span
+            previous = points[0]
+            for point in points:
+                if point[0] > t:
+                    if interpolate and point[0] > previous[0]:
+                        share = (t - previous[0]) / (point[0] - previous[0])
+                        return previous[1] + (point[1] - previous[1]) * share
+                    return previous[1]
+                previous = point
+            return previous[1]
+        return script
+    raise ValueError(f"Unknown waveform type: {kind}")
+
+
+def _wait(seconds):
+    if seconds <= 0:
+        return
+    if seconds < 0.0001:
+        # sleep() cannot resolve a few microseconds; spin like a short ioctl would
+        end = time.perf_counter() + seconds
+        while time.perf_counter() < end:
+            pass
+    else:
+        time.sleep(seconds)
+
+
+class FakeDevice:
+    """Timing, faults and counters of one simulated chip or pin."""
+
+    def __init__(self, bench, name, bus, settings):
+        self.bench = bench
+        self.name = name
+        merged = dict(DEFAULT_BUSES.get(bus, {}))
+        merged.update(bench.config.get("buses", {}).get(bus, {}))
+        merged.update(settings)
+        self.settings = merged
+        self.latency = float(merged.get("latency_ms", 0.0)) / 1000
+        self.jitter = float(merged.get("jitter_ms", 0.0)) / 1000
+        self.error_rate = float(merged.get("error_rate", 0.0))
+        self.offline = bool(merged.get("offline", False))
+        self.faults = [(float(start), float(end)) for start, end in merged.get("faults", [])]
+        self.fault_errno = errno.EREMOTEIO if bus == "i2c" else errno.EIO
+        self.transactions = 0
+        self.errors = 0
+
+    def transaction(self, extra=0.0):
+        """Spends one transaction's time on the calling (bus worker) thread; raises injected faults."""
+        bench = self.bench
+        with bench.lock:
+            self.transactions += 1
+            jitter = bench.rng.uniform(0.0, self.jitter) if self.jitter else 0.0
+            failed = self.offline or (self.error_rate and bench.rng.random() < self.error_rate)
+        _wait(self.latency + jitter + extra)
+        now = bench.elapsed()
+        if failed or any(start <= now < end for start, end in self.faults):
+            with bench.lock:
+                self.errors += 1
+            raise OSError(self.fault_errno, f"{os.strerror(self.fault_errno)} ({self.name}, injected)")
+
+    def get_stats(self):
+        return {"device": self.name, "transactions": self.transactions, "errors": self.errors}
+
+
+class FakeBench:
+    """The simulated hardware: configuration, devices and the shared random source."""
+
+    def __init__(self, config=None):
+        self.lock = threading.Lock()
+        self.configure(config or {})
+
+    def configure(self, config):
+        with self.lock:
+            self.config = config
+            self.rng = random.Random(config.get("seed"))
+            self.started = time.monotonic()
+            self.devices = {}
+            self.waveforms = {}
+
+    def elapsed(self):
+        return time.monotonic() - self.started
+
+    def device(self, name, bus):
+        with self.lock:
+            device = self.devices.get(name)
+        if device is None:
+            device = FakeDevice(self, name, bus, self.config.get("devices", {}).get(name, {}))
+            with self.lock:
+                device = self.devices.setdefault(name, device)
+        return device
+
+    def waveform(self, name, key=None, default_min=0.0, default_max=3.3, phase=0.0):
+        """value(t) of a device channel (or of a pin when key is None), built once per configuration."""
+        waveform = self.waveforms.get((name, key))
+        if waveform is None:
+            settings = self.config.get("devices", {}).get(name, {})
+            spec = settings.get("channels", {}).get(str(key)) if key is not None else settings.get("waveform")
+            waveform = self.waveforms[(name, key)] = make_waveform(spec, default_min, default_max, phase)
+        return waveform
+
+    def value(self, name, key=None, default_min=0.0, default_max=3.3, phase=0.0):
+        return self.waveform(name, key, default_min, default_max, phase)(self.elapsed())
+
+    def get_stats(self):
+        with self.lock:
+            return [device.get_stats() for device in self.devices.values()]
+
+
+def _load_config():
+    value = os.getenv(ENV_VAR, "").strip()
+    if value.lower() in ("", "0", "false", "no", "1", "true", "yes"):
+        return {}
+    try:
+        with open(value) as f:
+            return json.load(f)
+    except Exception as e:
+        _logger.error(f"Cannot load fake hardware config {value}, using defaults: {e}")
+        return {}
+
+
+bench = FakeBench(_load_config() if enabled() else {})
+
+
+# board / digitalio
+
+class Pin:
+    def __init__(self, name):
+        self.id = name
+
+    def __repr__(self):
+        return f"board.{self.id}"
+
+
+class _Board:
+    """board module stand-in: any D<n> pin plus the bus pins."""
+
+    def __getattr__(self, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        return Pin(name)
+
+
+_spi_selected = {} # Chip select pin number -> True while driven low
+
+
+class DigitalInOut:
+    def __init__(self, pin):
+        self.pin = int(str(pin.id).lstrip("D"))
+        self._value = True
+
+    def switch_to_output(self, value=True):
+        self.value = value
+
+    @property
+    def value(self):
+        return self._value
+
+    @value.setter
+    def value(self, value):
+        self._value = bool(value)
+        if self._value:
+            _spi_selected.pop(self.pin, None)
+        else:
+            _spi_selected[self.pin] = True
+
+    def deinit(self):
+        _spi_selected.pop(self.pin, None)
+
+
+# busio
+
+class _Bus:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.closed = False
+
+    def try_lock(self):
+        return self._lock.acquire(blocking=False)
+
+    def unlock(self):
+        self._lock.release()
+
+    def deinit(self):
+        self.closed = True
+
+
+class I2C(_Bus):
+    def __init__(self, scl=None, sda=None, frequency=100000):
+        super().__init__()
+
+
+class SPI(_Bus):
+    def __init__(self, clock=None, MISO=None, MOSI=None):
+        super().__init__()
+        self.baudrate = 1000000
+
+    def configure(self, baudrate=1000000, **kwargs):
+        self.baudrate = baudrate
+
+    def write_readinto(self, out_buf, in_buf):
+        selected = list(_spi_selected)
+        if len(selected) != 1:
+            raise OSError(errno.EIO, f"SPI transfer with {len(selected)} chips selected")
+        FakeMCP3xxx.get(selected[0]).transfer(out_buf, in_buf, len(out_buf) * 8 / self.baudrate)
+
+
+class FakeMCP3xxx:
+    """MCP3008/MCP3208 behind a chip select, answering real command frames."""
+    _chips = {}
+    _lock = threading.Lock()
+
+    def __init__(self, cs_pin):
+        self.cs_pin = cs_pin
+        self.ref_voltage = 3.3
+
+    @classmethod
+    def get(cls, cs_pin):
+        with cls._lock:
+            chip = cls._chips.get(cs_pin)
+            if chip is None:
+                chip = cls._chips[cs_pin] = cls(cs_pin)
+            return chip
+
+    def transfer(self, out_buf, in_buf, wire_time):
+        if out_buf[0] & 0x04: # Start bit in byte 0: MCP3208 framing
+            model, bits = "mcp3208", 12
+            channel = ((out_buf[0] & 0x01) << 2) | (out_buf[1] >> 6)
+        else:
+            model, bits = "mcp3008", 10
+            channel = (out_buf[1] >> 4) & 0x07
+        name = f"{model}@cs{self.cs_pin}"
+        bench.device(name, "spi").transaction(wire_time)
+        voltage = bench.value(name, channel, 0.0, self.ref_voltage, phase=channel / 8)
+        full = (1 << bits) - 1
+        code = round(voltage / self.ref_voltage * full)
+        code = max(0, min(full, code))
+        in_buf[0] = 0
+        in_buf[1] = code >> 8
+        in_buf[2] = code & 0xFF
+
+
+# adafruit_ads1x15
+
+class ADS1115:
+    def __init__(self, i2c, gain=1, data_rate=None, mode=ADS1115_MODE_SINGLE, address=0x48):
+        self.name = f"ads1115@{hex(address)}"
+        if self.device.offline:
+            raise ValueError(f"No I2C device at address: {hex(address)}")
+        self.i2c = i2c
+        self.address = address
+        self.gain = gain
+        self.data_rate = data_rate or ADS1115_DEFAULT_RATE
+        self.mode = mode
+
+    @property
+    def device(self):
+        return bench.device(self.name, "i2c") # Looked up per use so bench.configure() applies at once
+
+    def read_voltage(self, channel):
+        # Single-shot: write config, wait for the conversion, read back
+        device = self.device
+        if self.mode == ADS1115_MODE_SINGLE:
+            device.transaction(1.0 / self.data_rate)
+        device.transaction()
+        lsb = ADS1115_FSR.get(self.gain, 4.096) / 32768
+        code = max(-32768, min(32767, round(bench.value(self.name, channel, phase=channel / 4) / lsb)))
+        return code * lsb
+
+
+class AnalogIn:
+    def __init__(self, ads, positive_pin, negative_pin=None):
+        self._ads = ads
+        self._pin = positive_pin
+
+    @property
+    def voltage(self):
+        return self._ads.read_voltage(self._pin)
+
+
+# RPi.GPIO
+
+class FakeGPIO:
+    """RPi.GPIO stand-in. Input levels follow the pin's waveform (0/1)."""
+    BCM, BOARD = 11, 10
+    IN, OUT = 1, 0
+    PUD_OFF, PUD_DOWN, PUD_UP = 20, 21, 22
+    RISING, FALLING, BOTH = 31, 32, 33
+    LOW, HIGH = 0, 1
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pins = {} # pin -> [direction, output level]
+        self._detect = {} # pin -> [callback, bouncetime s, last level, last callback time]
+        self._thread = None
+
+    def setwarnings(self, flag):
+        pass
+
+    def setmode(self, mode):
+        pass
+
+    def setup(self, pin, direction, pull_up_down=None, initial=0):
+        with self._lock:
+            self._pins[pin] = [direction, initial]
+
+    def _level(self, pin):
+        direction, level = self._pins[pin]
+        if direction == self.OUT:
+            return level
+        return 1 if bench.value(f"gpio{pin}", None, 0, 1, phase=pin / 32) >= 0.5 else 0
+
+    def input(self, pin):
+        bench.device(f"gpio{pin}", "gpio").transaction()
+        with self._lock:
+            if pin not in self._pins:
+                raise RuntimeError("You must setup() the GPIO channel first")
+            return self._level(pin)
+
+    def output(self, pin, value):
+        bench.device(f"gpio{pin}", "gpio").transaction()
+        with self._lock:
+            entry = self._pins.get(pin)
+            if entry is None or entry[0] != self.OUT:
+                raise RuntimeError("The GPIO channel has not been set up as an OUTPUT")
+            entry[1] = 1 if value else 0
+
+    def add_event_detect(self, pin, edge, callback=None, bouncetime=None):
+        with self._lock:
+            if pin in self._detect:
+                raise RuntimeError("Conflicting edge detection already enabled for this GPIO channel")
+            self._detect[pin] = [callback, (bouncetime or 0) / 1000, self._level(pin), 0.0, edge]
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._watch_edges, name="fake-gpio-edges", daemon=True)
+                self._thread.start()
+
+    def remove_event_detect(self, pin):
+        with self._lock:
+            self._detect.pop(pin, None)
+
+    def _watch_edges(self):
+        # RPi.GPIO runs edge callbacks on its own thread too
+        while True:
+            fired = []
+            now = time.monotonic()
+            with self._lock:
+                for pin, entry in self._detect.items():
+                    level = self._level(pin)
+                    if level == entry[2]:
+                        continue
+                    entry[2] = level
+                    if now - entry[3] < entry[1]:
+                        continue # Bounce
+                    edge = entry[4]
+                    if edge == self.BOTH or (edge == self.RISING) == bool(level):
+                        entry[3] = now
+                        fired.append((entry[0], pin))
+            for callback, pin in fired:
+                try:
+                    callback(pin)
+                except Exception as e:
+                    _logger.error(f"Fake GPIO edge callback for pin {pin} failed: {e}")
+            time.sleep(EDGE_POLL_INTERVAL)
+
+    def cleanup(self):
+        with self._lock:
+            self._pins.clear()
+            self._detect.clear()
+
+
+board = _Board()
+busio = SimpleNamespace(I2C=I2C, SPI=SPI)
+digitalio = SimpleNamespace(DigitalInOut=DigitalInOut)
+ads1115 = SimpleNamespace(ADS1115=ADS1115, P0=0, P1=1, P2=2, P3=3)
+GPIO = FakeGPIO()
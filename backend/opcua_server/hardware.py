@@ -0,0 +1,452 @@
+import logging
+import threading
+import time
+
+_logger = logging.getLogger(__name__)
+
+# Bus and ADC driver libraries, imported when the first node needs them
+# (load_ads1115_driver / load_mcp3xxx_driver). Importing board runs
+# Blinka's platform detection, which processes that never open a bus (the
+# API, the scripts) should not pay for.
+board = busio = digitalio = None
+ADS = AnalogIn = None
+
+_drivers = {} # driver name -> whether its libraries imported
+_drivers_lock = threading.RLock()
+
+
+def _load_driver(name, importer, missing_message):
+    with _drivers_lock:
+        if name not in _drivers:
+            try:
+                importer()
+                _drivers[name] = True
+            except (ImportError, RuntimeError, NotImplementedError):
+                _drivers[name] = False
+                _logger.warning(missing_message)
+        return _drivers[name]
+
+
+def _import_blinka():
+    global board, busio, digitalio
+    from . import fake_hardware
+    if fake_hardware.enabled():
+        # Simulated buses (OPCUA_FAKE_HARDWARE): the real scanners and registry run on top
+        board, busio, digitalio = fake_hardware.board, fake_hardware.busio, fake_hardware.digitalio
+        _logger.warning("OPCUA_FAKE_HARDWARE is set: I2C, SPI and GPIO are simulated.")
+        return
+    import board
+    import busio
+    import digitalio
+
+
+def _import_ads1115():
+    global ADS, AnalogIn
+    from . import fake_hardware
+    if fake_hardware.enabled():
+        ADS, AnalogIn = fake_hardware.ads1115, fake_hardware.AnalogIn
+        return
+    import adafruit_ads1x15.ads1115 as ADS
+    from adafruit_ads1x15.analog_in import AnalogIn
+
+
+def _load_blinka():
+    return _load_driver("blinka", _import_blinka,
+                        "Blinka bus libraries not found or compatible. ADC sources will be mocked.")
+
+
+def load_mcp3xxx_driver():
+    """Imports the bus layer on first use; MCP3008/MCP3208 are driven with raw SPI frames."""
+    return _load_blinka()
+
+
+def load_ads1115_driver():
+    """Imports the bus layer and adafruit_ads1x15 on first use. Returns whether they are available."""
+    return _load_blinka() and _load_driver(
+        "ads1115", _import_ads1115, "ADS1115 libraries not found or compatible. ADS sources will be mocked.")
+
+
+# Mode register values (mirrors adafruit_ads1x15.ads1x15.Mode)
+ADS1115_MODE_CONTINUOUS = 0x0000
+ADS1115_MODE_SINGLE = 0x0100
+
+# A converted value that no node has consumed is reused for this long
+DEFAULT_SCAN_MAX_AGE = 1.0
+
+
+class ChannelScanner:
+    """
+    Chip-level sequencer shared by all nodes on one multi-channel ADC.
+
+    Nodes register the channels they use. The first read of a cycle converts
+    every registered channel back-to-back in one pass. Later reads of other
+    channels in the same cycle are served from that pass. A channel is
+    converted again once its last value has been consumed, or once the value
+    is older than max_age, so each conversion is used at most once and
+    fast and slow channels can share a chip.
+
+    Subclasses implement _convert(channels). Blocking: call scan() and
+    read_channel() only from the bus worker thread. Channels are added and
+    removed from the event loop, so the channel tables are guarded by a
+    lock that is never held during a conversion.
+    """
+
+    def __init__(self, name, bus_lock, max_age=DEFAULT_SCAN_MAX_AGE):
+        self.name = name
+        self.bus_lock = bus_lock
+        self.max_age = max_age
+        self._channels = {} # channel -> number of nodes using it
+        self._values = {} # channel -> (voltage, timestamp)
+        self._fresh = set() # channels converted but not yet consumed
+        self._oversample = {} # channel -> conversions averaged per value
+        self._lock = threading.Lock() # Guards the four tables above
+        self.scans = 0
+        self.conversions = 0
+
+    def add_channel(self, channel):
+        with self._lock:
+            self._channels[channel] = self._channels.get(channel, 0) + 1
+        self._channels_changed()
+
+    def remove_channel(self, channel):
+        with self._lock:
+            count = self._channels.get(channel, 0) - 1
+            if count > 0:
+                self._channels[channel] = count
+            else:
+                self._channels.pop(channel, None)
+                self._values.pop(channel, None)
+                self._oversample.pop(channel, None)
+                self._fresh.discard(channel)
+        self._channels_changed()
+
+    def set_oversample(self, channel, samples):
+        """Averages this many back-to-back conversions per value of channel."""
+        with self._lock:
+            if samples > 1:
+                self._oversample[channel] = samples
+            else:
+                self._oversample.pop(channel, None)
+
+    def _channels_changed(self):
+        pass
+
+    def _convert(self, channels):
+        """Converts channels in one bus transaction; returns voltages in order."""
+        raise NotImplementedError
+
+    def scan(self):
+        """Converts every channel whose value is consumed or stale."""
+        now = time.monotonic()
+        due = []
+        with self._lock:
+            for channel in sorted(self._channels):
+                cached = self._values.get(channel)
+                if channel in self._fresh and cached and now - cached[1] <= self.max_age:
+                    continue
+                due.append(channel)
+            oversample = dict(self._oversample)
+        if due:
+            if oversample:
+                # Repeat oversampled channels in the same bus pass, then average
+                batch = [channel for channel in due for _ in range(oversample.get(channel, 1))]
+                converted = self._convert(batch)
+                voltages, i = [], 0
+                for channel in due:
+                    n = oversample.get(channel, 1)
+                    voltages.append(sum(converted[i:i + n]) / n)
+                    i += n
+            else:
+                batch = due
+                voltages = self._convert(due)
+            stamp = time.monotonic()
+            with self._lock:
+                for channel, voltage in zip(due, voltages):
+                    if channel in self._channels: # Not removed while converting
+                        self._values[channel] = (voltage, stamp)
+                        self._fresh.add(channel)
+            self.conversions += len(batch)
+        self.scans += 1
+
+    def read_channel(self, channel):
+        """Voltage of channel, or None if the channel was removed meanwhile."""
+        with self._lock:
+            cached = self._values.get(channel)
+            stale = channel not in self._fresh or cached is None or time.monotonic() - cached[1] > self.max_age
+        if stale:
+            self.scan()
+        with self._lock:
+            cached = self._values.get(channel)
+            self._fresh.discard(channel)
+        return None if cached is None else cached[0]
+
+    def get_stats(self):
+        with self._lock:
+            channels = sorted(self._channels)
+        return {
+            "chip": self.name,
+            "channels": channels,
+            "scans": self.scans,
+            "conversions": self.conversions,
+        }
+
+
+class ADS1115Scanner(ChannelScanner):
+    """
+    Scanner for one ADS1115 (4 single-ended channels over I2C).
+
+    Data rate and gain are per chip. With a single registered channel,
+    continuous mode skips the per-sample configuration write and
+    conversion wait, and each read just fetches the conversion register
+    (so oversampling in continuous mode only helps at high data rates).
+    """
+
+    def __init__(self, device, address, bus_lock, max_age=DEFAULT_SCAN_MAX_AGE):
+        super().__init__(f"ads1115@{hex(address)}", bus_lock, max_age)
+        self.device = device
+        self.address = address
+        self.continuous = False
+        self._inputs = {} # channel -> AnalogIn; kept after removal, a scan may still be using it
+
+    def add_channel(self, channel):
+        if channel not in self._inputs:
+            self._inputs[channel] = AnalogIn(self.device, getattr(ADS, f"P{channel}"))
+        super().add_channel(channel)
+
+    def configure(self, data_rate=None, continuous=None):
+        with self.bus_lock:
+            if data_rate and data_rate != self.device.data_rate:
+                self.device.data_rate = data_rate
+                _logger.info(f"ADS1115 {hex(self.address)} data rate set to {data_rate} SPS")
+            if continuous is not None:
+                self.continuous = bool(continuous)
+        self._channels_changed()
+
+    def _channels_changed(self):
+        want = ADS1115_MODE_CONTINUOUS if self.continuous and len(self._channels) == 1 else ADS1115_MODE_SINGLE
+        if self.continuous and len(self._channels) > 1:
+            _logger.warning(f"ADS1115 {hex(self.address)} has {len(self._channels)} channels; continuous mode needs exactly one, using single-shot")
+        if self.device.mode != want:
+            with self.bus_lock:
+                self.device.mode = want
+
+    def _convert(self, channels):
+        with self.bus_lock:
+            return [self._inputs[channel].voltage for channel in channels]
+
+    def get_stats(self):
+        stats = super().get_stats()
+        stats.update({
+            "data_rate": self.device.data_rate,
+            "gain": self.device.gain,
+            "continuous": self.device.mode == ADS1115_MODE_CONTINUOUS,
+        })
+        return stats
+
+
+MCP3XXX_BITS = {"mcp3008": 10, "mcp3208": 12}
+MCP3XXX_BAUDRATE = 1000000
+
+
+def mcp3xxx_command(model, channel):
+    """Single-ended conversion request frame (3 bytes) for one channel."""
+    if model == "mcp3208":
+        # 5 leading zeros, start, SGL, D2 | D1, D0 in the top bits of byte 1
+        return bytes((0x06 | (channel >> 2), (channel & 0x03) << 6, 0))
+    # 7 leading zeros, start | SGL, D2..D0 in the top nibble of byte 1
+    return bytes((0x01, 0x80 | (channel << 4), 0))
+
+
+def mcp3xxx_result(model, frame):
+    """Extracts the conversion result from the 3 bytes clocked back."""
+    if model == "mcp3208":
+        return ((frame[1] & 0x0F) << 8) | frame[2]
+    return ((frame[1] & 0x03) << 8) | frame[2]
+
+
+class MCP3xxxScanner(ChannelScanner):
+    """
+    Scanner for one MCP3008 (10-bit) or MCP3208 (12-bit) on its chip select.
+
+    All due channels are converted in one SPI session: the bus is locked and
+    configured once, then chip select is pulsed per conversion (the chip
+    needs CS high between conversions) with prebuilt command frames.
+    """
+
+    def __init__(self, spi, cs, model, bus_lock, baudrate=MCP3XXX_BAUDRATE, ref_voltage=3.3,
+                 max_age=DEFAULT_SCAN_MAX_AGE, cs_pin=None):
+        super().__init__(f"{model}@cs{cs_pin}", bus_lock, max_age)
+        self.spi = spi
+        self.cs = cs
+        self.model = model
+        self.bits = MCP3XXX_BITS[model]
+        self.baudrate = baudrate
+        self.ref_voltage = ref_voltage
+        self._lsb = ref_voltage / ((1 << self.bits) - 1)
+        self._commands = [mcp3xxx_command(model, channel) for channel in range(8)]
+        self._frame = bytearray(3)
+
+    def _convert(self, channels):
+        spi, cs, frame, lsb = self.spi, self.cs, self._frame, self._lsb
+        raw = []
+        with self.bus_lock:
+            while not spi.try_lock():
+                pass
+            try:
+                spi.configure(baudrate=self.baudrate)
+                for channel in channels:
+                    cs.value = False
+                    spi.write_readinto(self._commands[channel], frame)
+                    cs.value = True
+                    raw.append(mcp3xxx_result(self.model, frame))
+            finally:
+                spi.unlock()
+        return [value * lsb for value in raw]
+
+    def get_stats(self):
+        stats = super().get_stats()
+        stats.update({"bits": self.bits, "baudrate": self.baudrate})
+        return stats
+
+
+# board.SCL/SDA is I2C-1 on the Pi header
+DEFAULT_I2C_BUS = 1
+
+
+def _open_i2c(bus):
+    """Opens /dev/i2c-<bus>. Each bus number must be a distinct physical bus,
+    since the registry pools handles and locks per number."""
+    from . import fake_hardware
+    if bus == DEFAULT_I2C_BUS or fake_hardware.enabled():
+        return busio.I2C(board.SCL, board.SDA)
+    try:
+        from adafruit_extended_bus import ExtendedI2C
+    except ImportError:
+        raise ValueError(f"I2C bus {bus} needs the adafruit-extended-bus package; "
+                         f"without it only bus {DEFAULT_I2C_BUS} (board SCL/SDA) is available")
+    return ExtendedI2C(bus)
+
+
+def _deinit(resource):
+    deinit = getattr(resource, "deinit", None)
+    if deinit:
+        deinit()
+
+
+class HardwareRegistry:
+    """
+    Reference-counted pool of bus handles and ADC device objects.
+
+    One bus object exists per physical bus and one device object per
+    (bus, I2C address) or (bus, chip select). Every node on that hardware
+    shares them, and they are closed when the last node releases them.
+    Each physical bus also has a threading.Lock that drivers hold for the
+    duration of a transaction. SPI chip-select groups run on separate bus
+    workers but share the SPI bus object, so the lock keeps them from
+    interleaving.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._entries = {} # key -> [resource, refcount, closer]
+        self._bus_locks = {} # physical bus key -> threading.Lock
+
+    def _acquire(self, key, factory, closer=_deinit):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = [factory(), 0, closer]
+                self._entries[key] = entry
+                _logger.info(f"Opened hardware resource {key}")
+            entry[1] += 1
+            return entry[0]
+
+    def release(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return
+            entry[1] -= 1
+            if entry[1] > 0:
+                return
+            del self._entries[key]
+            resource, _, closer = entry
+            try:
+                if closer:
+                    closer(resource)
+                _logger.info(f"Closed hardware resource {key}")
+            except Exception as e:
+                _logger.error(f"Error closing hardware resource {key}: {e}")
+
+    def bus_lock(self, bus_key):
+        with self._lock:
+            lock = self._bus_locks.get(bus_key)
+            if lock is None:
+                lock = self._bus_locks[bus_key] = threading.Lock()
+            return lock
+
+    def get_stats(self):
+        with self._lock:
+            return [{"resource": ":".join(str(p) for p in key), "refs": entry[1]}
+                    for key, entry in self._entries.items()]
+
+    # Buses
+
+    def i2c(self, bus=DEFAULT_I2C_BUS):
+        return self._acquire(("i2c", bus), lambda: _open_i2c(bus))
+
+    def spi(self, bus=0):
+        return self._acquire(("spi", bus), lambda: busio.SPI(clock=board.SCK, MISO=board.MISO, MOSI=board.MOSI))
+
+    # Devices: each returns (key, device); pass the key to release()
+
+    def ads1115(self, address=0x48, bus=DEFAULT_I2C_BUS, gain=1):
+        """Returns (key, ADS1115Scanner) for the chip at address."""
+        key = ("ads1115", bus, address)
+
+        def open_device():
+            i2c = self.i2c(bus)
+            try:
+                device = ADS.ADS1115(i2c, address=address, gain=gain)
+                return ADS1115Scanner(device, address, self.bus_lock(f"i2c:{bus}"))
+            except Exception:
+                self.release(("i2c", bus))
+                raise
+
+        scanner = self._acquire(key, open_device, lambda _: self.release(("i2c", bus)))
+        if scanner.device.gain != gain:
+            _logger.warning(f"ADS1115 at {hex(address)} already runs at gain {scanner.device.gain}; requested gain {gain} ignored")
+        return key, scanner
+
+    def get_scanner_stats(self):
+        with self._lock:
+            return [entry[0].get_stats() for key, entry in self._entries.items()
+                    if isinstance(entry[0], ChannelScanner)]
+
+    def mcp3xxx(self, cs_pin=8, bus=0, model="mcp3008", baudrate=MCP3XXX_BAUDRATE, ref_voltage=3.3):
+        """Returns (key, MCP3xxxScanner) for the chip on cs_pin."""
+        key = ("mcp3xxx", bus, cs_pin)
+
+        def open_device():
+            spi = self.spi(bus)
+            try:
+                cs = digitalio.DigitalInOut(getattr(board, f"D{cs_pin}"))
+                cs.switch_to_output(value=True)
+                return MCP3xxxScanner(spi, cs, model, self.bus_lock(f"spi:{bus}"),
+                                      baudrate=baudrate, ref_voltage=ref_voltage, cs_pin=cs_pin)
+            except Exception:
+                self.release(("spi", bus))
+                raise
+
+        def close_device(scanner):
+            scanner.cs.deinit()
+            self.release(("spi", bus))
+
+        scanner = self._acquire(key, open_device, close_device)
+        if scanner.model != model:
+            _logger.warning(f"Chip select D{cs_pin} is already opened as {scanner.model}, not {model}")
+        return key, scanner
+
+
+# Process-wide registry shared by all data sources
+registry = HardwareRegistry()
@@ -1,4 +1,5 @@
 import logging
+from datetime import datetime, timezone
 from asyncua import ua, Node
 from asyncua.common.node import Node
 
@@ -15,22 +16,50 @@ class InternalWriteHandler:
         if self.callback:
             await self.callback(self.node_id, value.Value.Value)
 
+def _identity(value):
+    return value
+
+# Python casts applied before wrapping a value in a Variant of the node's type
+_CASTERS = {
+    ua.VariantType.Boolean: bool,
+    ua.VariantType.Float: float,
+    ua.VariantType.Double: float,
+    ua.VariantType.Int16: int,
+    ua.VariantType.Int32: int,
+    ua.VariantType.Int64: int,
+}
+
+# Status published for nodes whose source returned no value this cycle
+_NO_VALUE_STATUS = ua.StatusCode(ua.StatusCodes.BadNoCommunication)
+
 class NodeManager:
     def __init__(self, server, namespace_index):
         self.server = server
         self.idx = namespace_index
         self.nodes = {} # node_id -> node object
+        self.node_types = {} # node_id -> ua.VariantType
+        self._casters = {} # node_id -> cast function, resolved once at add time
 
     async def create_folder(self, parent_node, name):
         folder = await parent_node.add_folder(self.idx, name)
         return folder
 
-    async def add_node(self, parent_node, config, write_callback=None):
+    def _requested_node_id(self, node_id_str):
+        try:
+            # If the node_id_str looks like a full NodeId (e.g. "ns=2;s=MyNode"), parse it
+            if ";" in str(node_id_str) and "=" in str(node_id_str):
+                return ua.NodeId.from_string(node_id_str)
+        except Exception as e:
+            _logger.warning(f"Failed to parse NodeID string '{node_id_str}', falling back to default: {e}")
+        # Otherwise, treat it as a string identifier in our current namespace
+        return ua.NodeId(node_id_str, self.idx)
+
+    def _add_item(self, parent_nodeid, config):
+        """AddNodesItem for one variable, with the attributes add_variable() plus
+        set_writable() and the history bits used to set one by one."""
         name = config.get("name")
-        node_id_str = config.get("node_id")
         data_type_str = config.get("data_type", "Float")
-        access_level_str = config.get("access_level", "CurrentRead")
-        
+
         # Convert initial value based on data type
         raw_initial_value = config.get("initial_value", 0.0)
         if data_type_str == "Boolean":
@@ -45,76 +74,152 @@ class NodeManager:
 
         # Map data types
         ua_type = getattr(ua.VariantType, data_type_str, ua.VariantType.Float)
-        
+
         # Map access levels
-        if access_level_str == "CurrentReadWrite":
-            access_level = {ua.AccessLevel.CurrentRead, ua.AccessLevel.CurrentWrite}
-        else:
-            access_level = {ua.AccessLevel.CurrentRead}
+        access_level = ua.AccessLevel.CurrentRead.mask
+        writable = config.get("access_level", "CurrentRead") == "CurrentReadWrite"
+        if writable:
+            access_level |= ua.AccessLevel.CurrentWrite.mask
+        if config.get("historizing"):
+            # Served by the server's history store
+            access_level |= ua.AccessLevel.HistoryRead.mask
 
-        # Create the variable
-        try:
-            # If the node_id_str looks like a full NodeId (e.g. "ns=2;s=MyNode"), parse it
-            if ";" in str(node_id_str) and "=" in str(node_id_str):
-                requested_node_id = ua.NodeId.from_string(node_id_str)
-            else:
-                # Otherwise, treat it as a string identifier in our current namespace
-                requested_node_id = ua.NodeId(node_id_str, self.idx)
-        except Exception as e:
-            _logger.warning(f"Failed to parse NodeID string '{node_id_str}', falling back to default: {e}")
-            requested_node_id = ua.NodeId(node_id_str, self.idx)
-        
-        node = await parent_node.add_variable(requested_node_id, name, initial_value, varianttype=ua_type)
-        is_writable = ua.AccessLevel.CurrentWrite in access_level
-        await node.set_writable(is_writable)
-        
-        if is_writable and write_callback:
-            # Setup write handler for this specific node
-            # handler = InternalWriteHandler(node_id_str, write_callback)
-            # The previous set_attribute_value call was broken and redundant as initial value is set in add_variable
-            pass
-            # asyncua 1.x uses write handlers like this:
-            await node.set_modelling_rule(True) # Ensure it's treated as a real object if needed
-            
-        self.nodes[node_id_str] = node
-        self.nodes[node_id_str] = node
-        # Store the expected variant type for this node to perform casting during updates
-        if not hasattr(self, 'node_types'):
-            self.node_types = {}
-        self.node_types[node_id_str] = ua_type
-        
-        _logger.info(f"Added node: {name} ({node_id_str}) with type {data_type_str}")
-        
-        return node
+        qname = ua.QualifiedName(name, self.idx)
+        attrs = ua.VariableAttributes()
+        attrs.Description = ua.LocalizedText(name)
+        attrs.DisplayName = ua.LocalizedText(name)
+        attrs.Value = ua.Variant(initial_value, ua_type)
+        attrs.DataType = ua.NodeId(getattr(ua.ObjectIds, ua_type.name))
+        attrs.ValueRank = ua.ValueRank.Scalar
+        attrs.ArrayDimensions = None
+        attrs.WriteMask = 0
+        attrs.UserWriteMask = 0
+        attrs.Historizing = bool(config.get("historizing"))
+        attrs.AccessLevel = access_level
+        attrs.UserAccessLevel = access_level
 
-    async def set_node_value(self, node_id_str, value):
-        if node_id_str in self.nodes:
-            node = self.nodes[node_id_str]
-            target_type = self.node_types.get(node_id_str)
-            
+        item = ua.AddNodesItem()
+        item.RequestedNewNodeId = self._requested_node_id(config.get("node_id"))
+        item.ParentNodeId = parent_nodeid
+        item.BrowseName = qname
+        item.NodeClass = ua.NodeClass.Variable
+        item.ReferenceTypeId = ua.NodeId(ua.ObjectIds.HasComponent)
+        item.TypeDefinition = ua.NodeId(ua.ObjectIds.BaseDataVariableType)
+        item.NodeAttributes = attrs
+        return item, ua_type, writable
+
+    async def add_nodes(self, parent_node, configs, write_callbacks=None):
+        """
+        Creates many variables under parent_node with one AddNodes service
+        call. Returns one entry per config: the Node, or the exception that
+        prevented creating it.
+        Modelling rules are added with one AddReferences call and initial
+        values are then written once so they carry timestamps.
+        """
+        write_callbacks = write_callbacks or [None] * len(configs)
+        results = [None] * len(configs)
+        pending = [] # (index, item, ua_type, writable)
+        for i, config in enumerate(configs):
             try:
-                # Cast value to the correct type/variant
-                if target_type == ua.VariantType.Boolean:
-                    val = bool(value)
-                elif target_type == ua.VariantType.Float:
-                    val = float(value)
-                elif target_type == ua.VariantType.Double:
-                    val = float(value)
-                elif target_type == ua.VariantType.Int32:
-                    val = int(value)
-                elif target_type == ua.VariantType.Int64:
-                    val = int(value)
-                else:
-                    val = value
-                
-                # Explicitly wrap in Variant to enforce the type
-                variant = ua.Variant(val, target_type)
-                await node.write_value(variant)
+                pending.append((i, *self._add_item(parent_node.nodeid, config)))
             except Exception as e:
-                 _logger.error(f"Failed to write value {value} to {node_id_str}: {e}")
+                results[i] = e
+        if not pending:
+            return results
 
-        else:
-            _logger.warning(f"Node {node_id_str} not found in manager.")
+        session = parent_node.session
+        added = await session.add_nodes([item for _, item, _, _ in pending])
+
+        rules, initial = [], []
+        now = datetime.now(timezone.utc)
+        for (i, item, ua_type, writable), result in zip(pending, added):
+            if not result.StatusCode.is_good():
+                results[i] = ua.UaStatusCodeError(result.StatusCode.value)
+                continue
+            nodeid = result.AddedNodeId
+            initial.append(ua.WriteValue(NodeId=nodeid, AttributeId=ua.AttributeIds.Value, Value=ua.DataValue(
+                item.NodeAttributes.Value, SourceTimestamp=now, ServerTimestamp=now)))
+
+            node_id_str = configs[i].get("node_id")
+            node = Node(session, nodeid)
+            self.nodes[node_id_str] = node
+            # Store the expected variant type for this node to perform casting during updates
+            self.node_types[node_id_str] = ua_type
+            self._casters[node_id_str] = _CASTERS.get(ua_type, _identity)
+            results[i] = node
+            if writable and write_callbacks[i]:
+                # Ensure it's treated as a real object if needed (as set_modelling_rule(True) did)
+                rules.append(ua.AddReferencesItem(
+                    SourceNodeId=nodeid,
+                    ReferenceTypeId=ua.NodeId(ua.ObjectIds.HasModellingRule),
+                    IsForward=True,
+                    TargetNodeId=ua.NodeId(ua.ObjectIds.ModellingRule_Mandatory),
+                    TargetNodeClass=ua.NodeClass.Object))
+        if rules:
+            for status in await session.add_references(rules):
+                if not status.is_good():
+                    _logger.warning(f"Failed to add reference while adding nodes: {status}")
+        if initial:
+            await session.write(ua.WriteParameters(NodesToWrite=initial))
+        return results
+
+    async def add_node(self, parent_node, config, write_callback=None):
+        result = (await self.add_nodes(parent_node, [config], [write_callback]))[0]
+        if isinstance(result, Exception):
+            raise result
+        _logger.info(f"Added node: {config.get('name')} ({config.get('node_id')}) with type {config.get('data_type', 'Float')}")
+        return result
+
+    def remove_node(self, node_id_str):
+        """Drops a node from internal tracking (the address space is handled by the caller)."""
+        self.nodes.pop(node_id_str, None)
+        self.node_types.pop(node_id_str, None)
+        self._casters.pop(node_id_str, None)
+
+    async def set_node_values(self, values):
+        """
+        Writes one cycle's worth of values ({node_id: value}) into the address
+        space with a single batched Write service call. All values share one
+        timestamp, and subscriptions see the whole cycle as one update.
+        A value of None is published as BadNoCommunication.
+        Returns the number of nodes written successfully.
+        """
+        now = datetime.now(timezone.utc)
+        nodes_to_write = []
+        written_ids = []
+        for node_id_str, value in values.items():
+            node = self.nodes.get(node_id_str)
+            if node is None:
+                _logger.warning(f"Node {node_id_str} not found in manager.")
+                continue
+            target_type = self.node_types[node_id_str]
+            if value is None:
+                dv = ua.DataValue(StatusCode=_NO_VALUE_STATUS, SourceTimestamp=now, ServerTimestamp=now)
+            else:
+                try:
+                    variant = ua.Variant(self._casters[node_id_str](value), target_type)
+                except (ValueError, TypeError) as e:
+                    _logger.error(f"Failed to write value {value} to {node_id_str}: {e}")
+                    continue
+                dv = ua.DataValue(variant, SourceTimestamp=now, ServerTimestamp=now)
+            nodes_to_write.append(ua.WriteValue(NodeId=node.nodeid, AttributeId=ua.AttributeIds.Value, Value=dv))
+            written_ids.append(node_id_str)
+
+        if not nodes_to_write:
+            return 0
+
+        params = ua.WriteParameters(NodesToWrite=nodes_to_write)
+        results = await self.server.iserver.isession.write(params)
+        ok = 0
+        for node_id_str, status in zip(written_ids, results):
+            if status.is_good():
+                ok += 1
+            else:
+                _logger.error(f"Failed to write value to {node_id_str}: {status}")
+        return ok
+
+    async def set_node_value(self, node_id_str, value):
+        await self.set_node_values({node_id_str: value})
 
     async def get_node_value(self, node_id_str):
         if node_id_str in self.nodes:
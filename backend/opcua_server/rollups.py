@@ -0,0 +1,162 @@
+import math
+
+import numpy as np
+
+# Rollup resolutions in seconds, finest first
+ROLLUP_TIERS = (60, 3600, 86400)
+TIER_NAMES = {60: "1m", 3600: "1h", 86400: "1d"}
+
+# Bucket row layout shared by the engine, the store and queries
+START, MIN, MAX, SUM, COUNT, FIRST, LAST = range(7)
+
+
+def _fold(bucket, row):
+    """Merges row (a finer or later bucket) into bucket in place."""
+    if row[MIN] < bucket[MIN]:
+        bucket[MIN] = row[MIN]
+    if row[MAX] > bucket[MAX]:
+        bucket[MAX] = row[MAX]
+    bucket[SUM] += row[SUM]
+    bucket[COUNT] += row[COUNT]
+    bucket[LAST] = row[LAST]
+
+
+class RollupEngine:
+    """
+    Incremental min/max/sum/count/first/last aggregates at 1 min, 1 h and 1 day.
+
+    Each node has one open bucket per tier. A sample only touches the open
+    1 min bucket; when a sample lands in a later minute, the finished minute
+    is emitted and folded into the open hour, a finished hour into the open
+    day, and so on. So the per-sample cost is a few comparisons and nothing is
+    ever rescanned. Closed rows are collected until drain() hands them to the
+    store. Missing readings (NaN) are not aggregated.
+    """
+
+    def __init__(self, tiers=ROLLUP_TIERS):
+        self.tiers = tiers
+        self._open = [{} for _ in tiers] # per tier: node_id -> bucket row
+        self._closed = [] # (tier seconds, node_id, row)
+
+    def add(self, node_id, ts, value):
+        if value != value:
+            return
+        minutes = self._open[0]
+        bucket = minutes.get(node_id)
+        if bucket is not None and ts < bucket[START] + self.tiers[0]:
+            # Same minute (late samples are folded into the open bucket too)
+            if value < bucket[MIN]:
+                bucket[MIN] = value
+            if value > bucket[MAX]:
+                bucket[MAX] = value
+            bucket[SUM] += value
+            bucket[COUNT] += 1
+            bucket[LAST] = value
+            return
+        if bucket is not None:
+            self._close(0, node_id, bucket)
+        minutes[node_id] = [ts - ts % self.tiers[0], value, value, value, 1, value, value]
+
+    def _close(self, level, node_id, row):
+        self._closed.append((self.tiers[level], node_id, row))
+        if level + 1 == len(self.tiers):
+            return
+        width = self.tiers[level + 1]
+        start = row[START] - row[START] % width
+        parents = self._open[level + 1]
+        parent = parents.get(node_id)
+        if parent is not None and parent[START] == start:
+            _fold(parent, row)
+            return
+        if parent is not None:
+            self._close(level + 1, node_id, parent)
+        parents[node_id] = [start] + row[1:]
+
+    def drain(self):
+        """Returns and forgets the rows closed since the last drain."""
+        closed, self._closed = self._closed, []
+        return closed
+
+    def closed_rows(self, node_id, tier):
+        """Rows of node_id in tier that closed since the last drain."""
+        return [row for row_tier, row_node, row in self._closed if row_tier == tier and row_node == node_id]
+
+    def close_all(self):
+        """Closes every open bucket (on shutdown); rows merge on the next write."""
+        for level in range(len(self.tiers)):
+            opened = self._open[level]
+            for node_id in list(opened):
+                # Folds into the next tier, which is closed on the next pass
+                self._close(level, node_id, opened.pop(node_id))
+        return self.drain()
+
+    def open_rows(self, node_id, tier):
+        """
+        Not-yet-closed data of node_id as rows of tier, oldest first. Finer open
+        buckets hold later data than coarser ones, so they are folded in last.
+        """
+        level = self.tiers.index(tier)
+        rows = {}
+        for finer in range(level, -1, -1):
+            bucket = self._open[finer].get(node_id)
+            if bucket is None:
+                continue
+            start = bucket[START] - bucket[START] % tier
+            row = rows.get(start)
+            if row is None:
+                rows[start] = [start] + bucket[1:]
+            else:
+                _fold(row, bucket)
+        return [rows[start] for start in sorted(rows)]
+
+
+def pick_tier(interval, tiers=ROLLUP_TIERS):
+    """Coarsest rollup whose bucket fits in interval seconds; None means raw samples."""
+    chosen = None
+    for tier in tiers:
+        if tier <= interval:
+            chosen = tier
+    return chosen
+
+
+def rows_from_samples(ts, values):
+    """Turns raw samples into one-sample bucket rows (an (n, 7) array), skipping NaN."""
+    keep = ~np.isnan(values)
+    ts, values = ts[keep], values[keep]
+    rows = np.empty((len(ts), 7))
+    rows[:, START] = ts
+    rows[:, MIN] = rows[:, MAX] = rows[:, SUM] = rows[:, FIRST] = rows[:, LAST] = values
+    rows[:, COUNT] = 1
+    return rows
+
+
+def merge_rows(rows, start, interval, buckets=None):
+    """
+    Combines bucket rows (sorted by START) into output buckets of interval
+    seconds aligned at start, at most `buckets` of them. A row is assigned by
+    its own start, so a rollup bucket straddling two outputs counts toward
+    the first. Returns a list of point dicts.
+    """
+    if len(rows) == 0:
+        return []
+    idx = np.floor((rows[:, START] - start) / interval).astype(np.int64)
+    np.clip(idx, 0, None if buckets is None else buckets - 1, out=idx)
+    groups, first = np.unique(idx, return_index=True)
+    last = np.append(first[1:], len(rows)) - 1
+    mins = np.minimum.reduceat(rows[:, MIN], first)
+    maxs = np.maximum.reduceat(rows[:, MAX], first)
+    sums = np.add.reduceat(rows[:, SUM], first)
+    counts = np.add.reduceat(rows[:, COUNT], first)
+    points = []
+    for g, lo, hi, mn, mx, total, n in zip(groups.tolist(), first.tolist(), last.tolist(),
+                                           mins.tolist(), maxs.tolist(), sums.tolist(), counts.tolist()):
+        points.append({
+            "t": start + g * interval,
+            "min": mn,
+            "max": mx,
+            "avg": total / n if n else math.nan,
+            "count": int(n),
+            "first": float(rows[lo, FIRST]),
+            "last": float(rows[hi, LAST]),
+        })
+    return points
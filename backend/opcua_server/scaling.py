@@ -0,0 +1,171 @@
+import logging
+import numpy as np
+
+_logger = logging.getLogger(__name__)
+
+_INITIAL_CAPACITY = 64
+
+
+def _parse(value, default):
+    return float(value if value not in (None, "") else default)
+
+
+class ScalingEngine:
+    """
+    Converts raw readings to engineering units for many nodes at once.
+
+    Each node's calibration is compiled once (on add/update) into a slot of
+    parallel NumPy arrays: gain, offset and clamp limits, so a whole cycle of
+    raw readings is scaled with one vectorized multiply-add and clip.
+    Nodes with a multi-point calibration table are interpolated
+    piecewise-linearly instead, extrapolating along the end segments unless
+    clamping is enabled. Nodes without scaling pass their raw value through
+    untouched (ints and bools keep their type).
+    """
+
+    def __init__(self, capacity=_INITIAL_CAPACITY):
+        self._slots = {}  # node_id -> slot index
+        self._free = []
+        self._units = {}  # node_id -> unit label
+        self._tables = {}  # slot -> (xs, ys) arrays
+        self._allocate(capacity)
+
+    def _allocate(self, capacity):
+        self._gain = np.ones(capacity)
+        self._offset = np.zeros(capacity)
+        self._lo = np.full(capacity, -np.inf)
+        self._hi = np.full(capacity, np.inf)
+        self._enabled = np.zeros(capacity, dtype=bool)
+        self._has_table = np.zeros(capacity, dtype=bool)
+        self._free = list(range(capacity - 1, -1, -1))
+
+    def _grow(self):
+        old = len(self._gain)
+        new = old * 2
+        self._gain = np.concatenate([self._gain, np.ones(old)])
+        self._offset = np.concatenate([self._offset, np.zeros(old)])
+        self._lo = np.concatenate([self._lo, np.full(old, -np.inf)])
+        self._hi = np.concatenate([self._hi, np.full(old, np.inf)])
+        self._enabled = np.concatenate([self._enabled, np.zeros(old, dtype=bool)])
+        self._has_table = np.concatenate([self._has_table, np.zeros(old, dtype=bool)])
+        self._free.extend(range(new - 1, old - 1, -1))
+
+    def __contains__(self, node_id):
+        return node_id in self._slots
+
+    def clear(self):
+        self._slots = {}
+        self._units = {}
+        self._tables = {}
+        self._allocate(len(self._gain))
+
+    def remove(self, node_id):
+        slot = self._slots.pop(node_id, None)
+        self._units.pop(node_id, None)
+        if slot is None:
+            return
+        self._tables.pop(slot, None)
+        self._enabled[slot] = False
+        self._has_table[slot] = False
+        self._free.append(slot)
+
+    def set_node(self, node_id, node_db):
+        """Compiles the scaling fields of a Node row into the node's slot."""
+        slot = self._slots.get(node_id)
+        if slot is None:
+            if not self._free:
+                self._grow()
+            slot = self._free.pop()
+            self._slots[node_id] = slot
+        self._tables.pop(slot, None)
+        self._has_table[slot] = False
+        self._units[node_id] = node_db.scale_unit
+        self._gain[slot], self._offset[slot] = 1.0, 0.0
+        self._lo[slot], self._hi[slot] = -np.inf, np.inf
+        self._enabled[slot] = False
+
+        if not node_db.scale_enabled:
+            return
+        try:
+            clamp = bool(getattr(node_db, "scale_clamp", False))
+            table = getattr(node_db, "scale_table", None)
+            if table and len(table) >= 2:
+                points = sorted((float(x), float(y)) for x, y in table)
+                xs = np.array([p[0] for p in points])
+                ys = np.array([p[1] for p in points])
+                if len(np.unique(xs)) != len(xs):
+                    raise ValueError("calibration table has duplicate raw values")
+                self._tables[slot] = (xs, ys)
+                self._has_table[slot] = True
+                lo, hi = ys.min(), ys.max()
+            else:
+                v_min = _parse(node_db.voltage_min, 0)
+                v_max = _parse(node_db.voltage_max, 3.3)
+                e_min = _parse(node_db.scale_min, 0)
+                e_max = _parse(node_db.scale_max, 100)
+                # scaled = (raw - v_min) / (v_max - v_min) * (e_max - e_min) + e_min
+                if v_max != v_min:
+                    gain = (e_max - e_min) / (v_max - v_min)
+                else:
+                    gain = 0.0
+                self._gain[slot] = gain
+                self._offset[slot] = e_min - v_min * gain
+                lo, hi = min(e_min, e_max), max(e_min, e_max)
+            if clamp:
+                self._lo[slot], self._hi[slot] = lo, hi
+            self._enabled[slot] = True
+        except (ValueError, TypeError) as e:
+            _logger.warning(f"Invalid scaling config for {node_id}: {e}, publishing raw values")
+            self._tables.pop(slot, None)
+            self._has_table[slot] = False
+
+    def is_enabled(self, node_id):
+        slot = self._slots.get(node_id)
+        return slot is not None and bool(self._enabled[slot])
+
+    def get_unit(self, node_id):
+        return self._units.get(node_id)
+
+    def apply(self, node_ids, raw_values):
+        """Scales one cycle of readings; returns a list aligned with node_ids."""
+        result = list(raw_values)
+        if not result:
+            return result
+        get_slot = self._slots.get
+        slots = np.array([get_slot(n, -1) for n in node_ids], dtype=np.intp)
+        enabled = slots >= 0
+        enabled[enabled] = self._enabled[slots[enabled]]
+        if not enabled.any():
+            return result
+
+        try:
+            raw = np.array(result, dtype=float)  # None -> nan
+        except (TypeError, ValueError):
+            raw = np.array([v if isinstance(v, (int, float)) else np.nan for v in result], dtype=float)
+        use = enabled & ~np.isnan(raw)
+        # Disabled positions borrow slot 0; their output is discarded below
+        s = np.where(enabled, slots, 0)
+        out = raw * self._gain[s] + self._offset[s]
+
+        for i in np.flatnonzero(use & self._has_table[s]).tolist():
+            out[i] = self._interp(raw[i], *self._tables[s[i]])
+
+        np.clip(out, self._lo[s], self._hi[s], out=out)
+        if use.all():
+            return out.tolist()
+        out_list = out.tolist()
+        for i in np.flatnonzero(use).tolist():
+            result[i] = out_list[i]
+        return result
+
+    @staticmethod
+    def _interp(x, xs, ys):
+        if x < xs[0]:
+            return ys[0] + (x - xs[0]) * (ys[1] - ys[0]) / (xs[1] - xs[0])
+        if x > xs[-1]:
+            return ys[-1] + (x - xs[-1]) * (ys[-1] - ys[-2]) / (xs[-1] - xs[-2])
+        return np.interp(x, xs, ys)
+
+    def scale(self, node_id, raw_value):
+        """Scales a single reading (same rules as apply)."""
+        return self.apply((node_id,), (raw_value,))[0]
@@ -0,0 +1,189 @@
+import heapq
+import logging
+import math
+import time
+
+_logger = logging.getLogger(__name__)
+
+DEFAULT_INTERVAL_MS = 1000
+MIN_INTERVAL_MS = 10
+# Deadlines this close to the earliest due one are dispatched in the same
+# pop_due(), so nodes on one bus share a batch despite float rounding
+COALESCE_TOLERANCE = 0.001
+
+# Weight of the newest sample in the rate/lateness moving averages
+_EMA_ALPHA = 0.2
+
+
+class NodeTiming:
+    """Per-node schedule state and achieved-timing statistics."""
+    __slots__ = (
+        "node_id", "interval_ms", "period", "next_due", "token", "last_dispatch",
+        "samples", "missed", "interval_ema", "lateness_ema",
+        "last_lateness", "max_lateness",
+    )
+
+    def __init__(self, node_id, period, next_due, token, interval_ms=None):
+        self.node_id = node_id
+        self.interval_ms = interval_ms # The node's own interval; None follows the default
+        self.period = period
+        self.next_due = next_due
+        self.token = token
+        self.last_dispatch = None
+        self.samples = 0
+        self.missed = 0
+        self.interval_ema = None
+        self.lateness_ema = 0.0
+        self.last_lateness = 0.0
+        self.max_lateness = 0.0
+
+    def to_dict(self):
+        achieved = 1.0 / self.interval_ema if self.interval_ema else 0.0
+        return {
+            "interval_ms": round(self.period * 1000, 3),
+            "target_hz": round(1.0 / self.period, 3),
+            "achieved_hz": round(achieved, 3),
+            "samples": self.samples,
+            "missed_deadlines": self.missed,
+            "lateness_ms": round(self.last_lateness * 1000, 3),
+            "avg_lateness_ms": round(self.lateness_ema * 1000, 3),
+            "max_lateness_ms": round(self.max_lateness * 1000, 3),
+        }
+
+
+class AcquisitionScheduler:
+    """
+    Deadline-driven scheduler keyed by each node's next due time.
+
+    Nodes live in a min-heap of (due, token, node_id). Deadlines advance by
+    whole periods from the previous deadline rather than from the time the
+    read finished, so read time does not accumulate as drift. When a node
+    falls more than a period behind, the missed deadlines are skipped and
+    counted instead of being replayed back-to-back.
+
+    A node is read once as soon as it is added and from then on at whole
+    multiples of its period on the clock, so every node with the same
+    interval comes due in the same pop_due() and can share a bus batch.
+    """
+
+    def __init__(self, default_interval_ms=DEFAULT_INTERVAL_MS, clock=time.monotonic):
+        self.default_interval_ms = default_interval_ms
+        self.clock = clock
+        self._heap = []
+        self._timings = {}  # node_id -> NodeTiming
+        self._token = 0
+        self.last_min_period = None # Shortest period among the nodes of the last pop_due()
+        self.last_jitter = 0.0 # How late the earliest node of the last pop_due() was dispatched
+
+    def __contains__(self, node_id):
+        return node_id in self._timings
+
+    def __len__(self):
+        return len(self._timings)
+
+    def clear(self):
+        self._heap = []
+        self._timings = {}
+
+    @staticmethod
+    def _own_interval(interval_ms):
+        try:
+            return int(interval_ms) or None
+        except (ValueError, TypeError):
+            return None
+
+    def _period_for(self, interval_ms):
+        return max(interval_ms or self.default_interval_ms, MIN_INTERVAL_MS) / 1000.0
+
+    def add(self, node_id, interval_ms=None):
+        """Schedules a node (or reschedules it with a new interval), due immediately.
+        Without an interval of its own the node follows default_interval_ms."""
+        self._token += 1
+        interval_ms = self._own_interval(interval_ms)
+        timing = NodeTiming(node_id, self._period_for(interval_ms), self.clock(), self._token, interval_ms)
+        self._timings[node_id] = timing
+        heapq.heappush(self._heap, (timing.next_due, timing.token, node_id))
+        return timing
+
+    def set_default_interval(self, interval_ms):
+        """Changes the default interval and reschedules the nodes that follow it."""
+        if interval_ms == self.default_interval_ms:
+            return
+        self.default_interval_ms = interval_ms
+        for node_id in [n for n, timing in self._timings.items() if timing.interval_ms is None]:
+            self.add(node_id)
+
+    def remove(self, node_id):
+        # Heap entries are invalidated lazily through the token check in pop_due()
+        self._timings.pop(node_id, None)
+
+    def time_until_next(self, now=None):
+        """Seconds until the earliest deadline, or None if nothing is scheduled."""
+        now = self.clock() if now is None else now
+        while self._heap:
+            due, token, node_id = self._heap[0]
+            timing = self._timings.get(node_id)
+            if timing is None or timing.token != token:
+                heapq.heappop(self._heap)
+                continue
+            return max(0.0, due - now)
+        return None
+
+    def pop_due(self, now=None):
+        """Returns node ids whose deadline has passed and schedules their next deadline."""
+        now = self.clock() if now is None else now
+        due_nodes = []
+        heap = self._heap
+        min_period = None
+        horizon = now + COALESCE_TOLERANCE
+        while heap and heap[0][0] <= horizon:
+            due, token, node_id = heapq.heappop(heap)
+            timing = self._timings.get(node_id)
+            if timing is None or timing.token != token:
+                continue
+            if min_period is None:
+                self.last_jitter = max(0.0, now - due) # Heap order: the first node is the latest one
+            if min_period is None or timing.period < min_period:
+                min_period = timing.period
+            self._record_dispatch(timing, due, now)
+            heapq.heappush(heap, (timing.next_due, token, node_id))
+            due_nodes.append(node_id)
+        self.last_min_period = min_period
+        return due_nodes
+
+    def _record_dispatch(self, timing, due, now):
+        lateness = max(0.0, now - due)
+        first = timing.samples == 0
+        timing.samples += 1
+        timing.last_lateness = lateness
+        timing.lateness_ema += _EMA_ALPHA * (lateness - timing.lateness_ema)
+        if lateness > timing.max_lateness:
+            timing.max_lateness = lateness
+
+        if timing.last_dispatch is not None:
+            interval = now - timing.last_dispatch
+            if timing.interval_ema is None:
+                timing.interval_ema = interval
+            else:
+                timing.interval_ema += _EMA_ALPHA * (interval - timing.interval_ema)
+        timing.last_dispatch = now
+
+        if first:
+            # Join the period grid shared by every node with this interval
+            next_due = (math.floor(now / timing.period) + 1) * timing.period
+            if next_due <= now:
+                next_due += timing.period
+        else:
+            next_due = due + timing.period
+        if next_due <= now:
+            # Overran by one or more whole periods: skip ahead on the original grid
+            skipped = math.floor((now - due) / timing.period)
+            timing.missed += skipped
+            next_due = due + (skipped + 1) * timing.period
+        timing.next_due = next_due
+
+    def get_stats(self, node_id=None):
+        if node_id is not None:
+            timing = self._timings.get(node_id)
+            return timing.to_dict() if timing else None
+        return {nid: t.to_dict() for nid, t in self._timings.items()}
@@ -1,20 +1,51 @@
 import asyncio
 import logging
+import threading
+import time
 from asyncua import Server, ua
 from asyncua.common.methods import uamethod
 
 from .security import SecurityManager
 from .node_manager import NodeManager
 from .user_manager import DBUserManager
-from .data_sources import SourceFactory
+from .data_sources import create_source, read_scanned
+from .hardware import registry as hardware_registry
+from .scheduler import AcquisitionScheduler
+from .deadband import DeadbandFilter
+from .scaling import ScalingEngine
+from .conditioning import ConditioningPipeline
+from .trend import TrendStore
+from .snapshot import LiveValues
+from .diagnostics import PollDiagnostics, StackSampler, MAX_PROFILE_SECONDS, MIN_PROFILE_INTERVAL
+from .address_space_cache import CachedAddressSpaceServer
+from .history import SQLiteHistoryStore, ProcessedHistoryManager, DEFAULT_RETENTION_DAYS, DEFAULT_MAX_MB
+from .config_bus import ConfigBus, NodeCreated, NodeUpdated, NodeDeleted, SettingsChanged
 from ..database.db import SessionLocal
+from ..monitoring.opcua_metrics import OPCUAMetrics, attach_metrics, detach_metrics
 from ..database.models import Node
 
 logging.basicConfig(level=logging.INFO)
 _logger = logging.getLogger(__name__)
 
+# Longest the acquisition loop sleeps between deadline checks
+MAX_IDLE_SLEEP = 0.5
+
+# Node fields that require the OPC UA variable and data source to be rebuilt;
+# anything else (scaling, deadband, interval) is applied in place.
+STRUCTURAL_NODE_FIELDS = ("name", "data_type", "access_level", "source_type", "source_config", "initial_value")
+
+# Settings that are only read during setup()
+RESTART_SETTINGS = ("server_name", "port", "namespace_uri", "allow_anonymous", "history_enabled")
+
+# Interfaces whose addresses clients on the plant network cannot reach
+# (container bridges, VPN tunnels, hypervisor networks), unless they carry the default route
+VIRTUAL_INTERFACE_PREFIXES = ("lo", "docker", "br-", "veth", "virbr", "vmnet", "vboxnet", "tun", "tap", "wg", "zt")
+
+# Kernel routing table, read for the default route instead of probing the network
+PROC_NET_ROUTE = "/proc/net/route"
+
 class OPCUAServer:
-    def __init__(self, endpoint="opc.tcp://0.0.0.0:4840/", name="RPi OPC UA Server"):
+    def __init__(self, endpoint="opc.tcp://0.0.0.0:4840/", name="RPi OPC UA Server", config_bus=None):
         self.server = None # Will be initialized in setup()
         self.endpoint = endpoint
         self.name = name
@@ -24,78 +55,105 @@ class OPCUAServer:
         self.node_manager = None
         self.user_manager = None
         self.data_sources = {} # node_id -> DataSource instance
+        self.scheduler = AcquisitionScheduler()
+        self.publish_filters = {} # node_id -> DeadbandFilter
+        self.scaling = ScalingEngine()
+        self.conditioners = {} # node_id -> ConditioningPipeline
+        self.trends = TrendStore() # node_id -> recent (timestamp, value) ring
+        self.history = None # SQLiteHistoryStore serving HistoryRead, when enabled
+        self.node_signatures = {} # node_id -> structural fields the node was built from
+        self.pending_events = {} # node_id -> latest raw value pushed by an event-driven source
+        self._event_flush = None
+        self.config_bus = config_bus or ConfigBus()
+        self.config_bus.subscribe(self.handle_config_event)
         self.polling_task = None
         self.root_folder = None
         self.last_error = None
         import uuid
         self.instance_id = str(uuid.uuid4())[:8]
+        self.live = LiveValues(self.instance_id) # Latest per-cycle snapshot served to the UI
+        self.metrics = OPCUAMetrics(session_count=self._session_count) # Exported at /metrics
+        self.diagnostics = PollDiagnostics() # Recent cycle timings for field diagnosis
+        self._profiling = False
+        self.startup_timings = {} # Per-phase seconds of the last setup()
         _logger.info(f"OPCUAServer initialized with ID: {self.instance_id}")
 
     async def setup(self):
         # Clear previous state for clean restart
+        for source in self.data_sources.values():
+            source.close()
         self.data_sources = {}
+        self.scheduler.clear()
+        self.publish_filters = {}
+        self.conditioners = {}
+        self.trends.clear()
+        self.live.clear()
+        self.scaling.clear()
+        self.node_signatures = {}
         self.node_manager = None
         self.root_folder = None
         
-        # Create a fresh server object to avoid "remaining nodes" error on restart
-        self.server = Server()
+        # Create a fresh server object to avoid "remaining nodes" error on restart;
+        # the standard address space comes from the on-disk cache after the first start
+        if self.server is not None:
+            self.server.iserver.close() # A previous setup that never started keeps its shelf open
+        self.server = Server(iserver=CachedAddressSpaceServer())
         
-        # Load global settings from Database
+        timings = {} # phase -> seconds, reported once setup completes
+        mark = time.perf_counter()
+
+        def phase(name):
+            nonlocal mark
+            now = time.perf_counter()
+            timings[name] = round(now - mark, 4)
+            mark = now
+
+        # Load global settings and enabled nodes from Database in one session
         db = SessionLocal()
         try:
             from ..database.models import ServerSetting
             settings = {s.key: s.value for s in db.query(ServerSetting).all()}
-            
-            self.name = settings.get("server_name", self.name)
-            port = settings.get("port", "4840")
-            app_uri = settings.get("namespace_uri", "urn:raspberry:opcua:server")
+            nodes_db = db.query(Node).filter(Node.enabled == True).all()
         finally:
             db.close()
 
+        self.name = settings.get("server_name", self.name)
+        port = settings.get("port", "4840")
+        app_uri = settings.get("namespace_uri", "urn:raspberry:opcua:server")
+        self._apply_polling_rate(settings.get("polling_rate"))
+        self._apply_trend_depth(settings.get("trend_depth"))
+        history_enabled = settings.get("history_enabled", "true").lower() == "true"
+        history_retention = settings.get("history_retention_days")
+        history_max_mb = settings.get("history_max_mb")
+        allow_anon = settings.get("allow_anonymous", "false").lower() == "true" # Default to False
+        phase("database")
+
         # Prepare Endpoint URL
         _logger.info("Configuring OPC UA Endpoint...")
-        listen_ip = "0.0.0.0"
-        
-        # Determine the best IP to report to clients
-        import socket
-        report_ip = "127.0.0.1"
-        try:
-            # Try to get the local IP that can reach outside world
-            s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-            s.settimeout(0.1) # Fast timeout
-            try:
-                s.connect(("8.8.8.8", 80))
-                report_ip = s.getsockname()[0]
-                _logger.info(f"Detected external IP: {report_ip}")
-            except Exception as e:
-                _logger.warning(f"Could not auto-detect IP, falling back to 127.0.0.1: {e}")
-            finally:
-                s.close()
-        except Exception as e:
-            _logger.error(f"Socket error during IP detection: {e}")
+
+        # Report the first configured interface address to clients; no network probes
+        addresses = self._local_addresses()
+        report_ip = addresses[0] if addresses else "127.0.0.1"
+        if addresses:
+            _logger.info(f"Detected local IP: {report_ip}")
+        else:
+            _logger.warning("Could not auto-detect IP, falling back to 127.0.0.1")
 
         # If user explicitly set an endpoint in DB, we might want to respect that logic,
         # but usually constructing it dynamically is safer for Pi environments.
         self.endpoint = f"opc.tcp://{report_ip}:{port}/"
         _logger.info(f"Setting Endpoint URL to: {self.endpoint}")
-        
-        # We need to explicitly tell the server to report this specific endpoint
-        # while still binding to everything.
+
         # Prepare security SANs
         import socket
-        try:
-            s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-            s.connect(("8.8.8.8", 80))
-            local_ip = s.getsockname()[0]
-            s.close()
-            ips = [local_ip, "127.0.0.1", socket.gethostname()]
-        except:
-            ips = ["127.0.0.1", "localhost"]
+        ips = addresses + ["127.0.0.1", socket.gethostname()] if addresses else ["127.0.0.1", "localhost"]
+        phase("addresses")
 
         # 1. Generate and Load Certificates BEFORE anything else
         self.security_manager.generate_self_signed_cert(app_uri=app_uri, ip_addresses=ips)
         await self.server.load_certificate(self.security_manager.server_cert_path)
         await self.server.load_private_key(self.security_manager.server_key_path)
+        phase("certificates")
 
         # 2. Initialize server object
         try:
@@ -103,10 +161,29 @@ class OPCUAServer:
             self.server.set_endpoint(self.endpoint)
             self.server.set_server_name(self.name)
             await self.server.set_application_uri(app_uri)
+            attach_metrics(self.server.iserver, self.metrics)
             _logger.info("Server initialized successfully with discovery endpoint.")
         except Exception as e:
              _logger.error(f"Failed to init server: {e}")
              raise e
+        phase("server_init")
+
+        # Disk-backed history for HistoryRead; the previous store was stopped with the old server
+        self.history = None
+        if history_enabled:
+            store = SQLiteHistoryStore(
+                retention_days=self._setting_number(history_retention, DEFAULT_RETENTION_DAYS),
+                max_mb=self._setting_number(history_max_mb, DEFAULT_MAX_MB))
+            try:
+                await store.init()
+                # Adds processed (aggregate) HistoryRead on top of raw reads
+                manager = ProcessedHistoryManager(self.server.iserver)
+                manager.set_storage(store)
+                self.server.iserver.history_manager = manager
+                self.history = store
+            except Exception as e:
+                _logger.error(f"History store unavailable, HistoryRead disabled: {e}")
+        phase("history")
 
         # Set security policies (Hardened: NoSecurity removed)
         self.server.set_security_policy([
@@ -114,23 +191,14 @@ class OPCUAServer:
             ua.SecurityPolicyType.Basic256Sha256_Sign
         ])
 
-        # Configure Identity Tokens based on allow_anonymous
-        db = SessionLocal()
-        try:
-            from ..database.models import ServerSetting
-            allow_anon_setting = db.query(ServerSetting).filter(ServerSetting.key == "allow_anonymous").first()
-            allow_anon = allow_anon_setting.value.lower() == "true" if allow_anon_setting else False # Default to False
-            
-            # Explicitly set allowed identity tokens
-            if not allow_anon:
-                # Only allow Username tokens
-                self.server.set_identity_tokens([ua.UserNameIdentityToken])
-                _logger.info("Security: Anonymous login policy REMOVED from server.")
-            else:
-                self.server.set_identity_tokens([ua.AnonymousIdentityToken, ua.UserNameIdentityToken])
-                _logger.info("Security: Anonymous login policy enabled.")
-        finally:
-            db.close()
+        # Explicitly set allowed identity tokens based on allow_anonymous
+        if not allow_anon:
+            # Only allow Username tokens
+            self.server.set_identity_tokens([ua.UserNameIdentityToken])
+            _logger.info("Security: Anonymous login policy REMOVED from server.")
+        else:
+            self.server.set_identity_tokens([ua.AnonymousIdentityToken, ua.UserNameIdentityToken])
+            _logger.info("Security: Anonymous login policy enabled.")
 
         # Configure User Manager for Authentication
         try:
@@ -140,84 +208,165 @@ class OPCUAServer:
             except AttributeError:
                 # Fallback for some versions of asyncua
                 self.server.internal_server.set_user_manager(self.user_manager)
-            
-            # Check current settings to log state
-            db = SessionLocal()
-            try:
-                from ..database.models import ServerSetting
-                allow_anon = db.query(ServerSetting).filter(ServerSetting.key == "allow_anonymous").first()
-                dedicated_user = db.query(ServerSetting).filter(ServerSetting.key == "opcua_username").first()
-                
-                anon_val = allow_anon.value if allow_anon else "True (Default)"
-                dedic_val = "Set" if (dedicated_user and dedicated_user.value) else "Not Set"
-                
-                _logger.info(f"OPC UA Auth State: Anonymous={anon_val}, Dedicated Credentials={dedic_val}")
-            finally:
-                db.close()
+
+            # Log the current settings state
+            anon_val = settings.get("allow_anonymous", "True (Default)")
+            dedic_val = "Set" if settings.get("opcua_username") else "Not Set"
+            _logger.info(f"OPC UA Auth State: Anonymous={anon_val}, Dedicated Credentials={dedic_val}")
 
             _logger.info("Database User Manager configured successfully.")
         except Exception as e:
             _logger.error(f"Failed to configure User Manager: {e}")
             _logger.warning("Server will continue with default (anonymous) access only.")
+        phase("security")
 
         # Create namespace
         uri = "http://raspberry.opcua.server"
         self.namespace = await self.server.register_namespace(uri)
-        
+
         # Initialise node manager
         self.node_manager = NodeManager(self.server, self.namespace)
-        
-        # Load configuration from Database
-        db = SessionLocal()
+
+        # Build the address space from the nodes loaded above
+        self.root_folder = await self.server.nodes.objects.add_folder(self.namespace, "Sensors")
+        await self.add_dynamic_nodes(nodes_db)
+        phase("address_space")
+
+        timings["total"] = round(sum(timings.values()), 4)
+        self.startup_timings = timings
+        cache = "cached" if self.server.iserver.cache_hit else "built"
+        _logger.info(f"Setup finished in {timings['total']:.3f}s for {len(nodes_db)} nodes ({cache} address space): "
+                     + ", ".join(f"{name}={seconds:.3f}s" for name, seconds in timings.items() if name != "total"))
+
+    @staticmethod
+    def _default_route_interfaces():
+        """Names of the interfaces holding a default route, lowest metric first ([] off Linux)."""
+        routes = []
         try:
-            nodes_db = db.query(Node).filter(Node.enabled == True).all()
-            self.root_folder = await self.server.nodes.objects.add_folder(self.namespace, "Sensors")
-            
-            for node_db in nodes_db:
-                await self.add_dynamic_node(node_db)
-        finally:
-            db.close()
+            with open(PROC_NET_ROUTE) as f:
+                next(f, None) # Header
+                for line in f:
+                    fields = line.split()
+                    # Iface Destination Gateway Flags RefCnt Use Metric Mask ...; flag 0x1 is RTF_UP
+                    if len(fields) >= 8 and fields[1] == "00000000" and fields[7] == "00000000" \
+                            and int(fields[3], 16) & 0x1:
+                        routes.append((int(fields[6]), fields[0]))
+        except (OSError, ValueError) as e:
+            _logger.debug(f"No default route from {PROC_NET_ROUTE}: {e}")
+        return [name for _, name in sorted(routes)]
+
+    @staticmethod
+    def _local_addresses():
+        """
+        IPv4 addresses of the interfaces that are up, from interface enumeration.
+        The default-route interface comes first; loopback and virtual interfaces
+        (VIRTUAL_INTERFACE_PREFIXES) are left out unless they carry the default route.
+        """
+        import psutil
+        import socket
+        try:
+            stats = psutil.net_if_stats()
+            interfaces = psutil.net_if_addrs()
+        except Exception as e:
+            _logger.error(f"Interface enumeration failed: {e}")
+            return []
+        preferred = [name for name in OPCUAServer._default_route_interfaces() if name in interfaces]
+        others = sorted(name for name in interfaces
+                        if name not in preferred and not name.startswith(VIRTUAL_INTERFACE_PREFIXES))
+        addresses = []
+        for name in preferred + others:
+            if name in stats and not stats[name].isup:
+                continue
+            for entry in interfaces[name]:
+                if entry.family == socket.AF_INET and not entry.address.startswith("127."):
+                    addresses.append(entry.address)
+        return addresses
 
     async def add_dynamic_node(self, node_db):
         """Adds a node dynamically to the running server"""
-        node_id = node_db.node_id
-        
-        # Setup data source first so we can use it in write callback
-        source_cfg = node_db.source_config or {}
-        source_cfg["name"] = node_db.name
-        source_cfg["type"] = node_db.source_type
-        
-        try:
-            source = SourceFactory.create(source_cfg)
+        await self.add_dynamic_nodes([node_db])
+
+    async def add_dynamic_nodes(self, nodes_db):
+        """Adds nodes to the running server, creating all variables with one AddNodes call."""
+        entries = [] # (node_db, source, address space config)
+        for node_db in nodes_db:
+            node_id = node_db.node_id
+
+            # Setup data source first so we can use it in write callback
+            source_cfg = dict(node_db.source_config or {})
+            source_cfg["name"] = node_db.name
+            source_cfg["type"] = node_db.source_type
+            try:
+                source = create_source(source_cfg)
+            except Exception as e:
+                _logger.error(f"Failed to add dynamic node {node_id}: {e}")
+                continue
             self.data_sources[node_id] = source
-            
-            # Add node to OPC UA address space
-            config = {
+            entries.append((node_db, source, {
                 "name": node_db.name,
-                "node_id": node_db.node_id,
+                "node_id": node_id,
                 "data_type": node_db.data_type,
                 "access_level": node_db.access_level,
-                "initial_value": node_db.initial_value
-            }
-            
-            # Define write callback that propagates to the data source
-            async def handle_write(node_id_val, value):
-                if node_id_val in self.data_sources:
-                    await self.data_sources[node_id_val].write(value)
-            
-            await self.node_manager.add_node(self.root_folder, config, write_callback=handle_write)
-            _logger.info(f"Dynamically added node: {node_id}")
+                "initial_value": node_db.initial_value,
+                "historizing": self.history is not None
+            }))
+        if not entries:
+            return
+
+        # Define write callback that propagates to the data source
+        async def handle_write(node_id_val, value):
+            if node_id_val in self.data_sources:
+                await self.data_sources[node_id_val].write(value)
+
+        try:
+            results = await self.node_manager.add_nodes(
+                self.root_folder, [config for _, _, config in entries], [handle_write] * len(entries))
         except Exception as e:
-            _logger.error(f"Failed to add dynamic node {node_id}: {e}")
-            # Clean up if partially added?
-            if node_id in self.data_sources:
-                del self.data_sources[node_id]
+            results = [e] * len(entries)
+
+        for (node_db, source, config), result in zip(entries, results):
+            node_id = node_db.node_id
+            try:
+                if isinstance(result, Exception):
+                    raise result
+                if self.history is not None:
+                    self.history.register(node_id, self.node_manager.node_types[node_id], result.nodeid)
+                self.node_signatures[node_id] = self._node_signature(node_db)
+                self._apply_node_tuning(node_db)
+                if getattr(source, "event_driven", False):
+                    # Edges are pushed from the GPIO callback thread; publish the current level now
+                    source.set_listener(lambda value, node_id=node_id: self.queue_event(node_id, value))
+                    if source.level is not None:
+                        self.queue_event(node_id, source.level)
+                if len(entries) == 1:
+                    _logger.info(f"Dynamically added node: {node_id}")
+            except Exception as e:
+                _logger.error(f"Failed to add dynamic node {node_id}: {e}")
+                # Clean up if partially added
+                source = self.data_sources.pop(node_id, None)
+                if source is not None:
+                    source.close()
+        if len(entries) > 1:
+            _logger.info(f"Dynamically added {len(entries)} nodes")
+
+    async def remove_dynamic_node(self, node_id, close_source=True):
+        """Removes a node dynamically from the running server.
+        Returns the detached data source when close_source is False."""
+        self.scheduler.remove(node_id)
+        self.publish_filters.pop(node_id, None)
+        self.conditioners.pop(node_id, None)
+        if close_source:
+            self.trends.remove(node_id) # A rebuilt node keeps its recent history
+        self.live.remove(node_id)
+        self.scaling.remove(node_id)
+        self.node_signatures.pop(node_id, None)
 
-    async def remove_dynamic_node(self, node_id):
-        """Removes a node dynamically from the running server"""
         # Remove from data sources
-        if node_id in self.data_sources:
-            del self.data_sources[node_id]
+        source = self.data_sources.pop(node_id, None)
+        if source is not None:
+            if close_source:
+                source.close()
+                source = None
             _logger.info(f"Removed data source for node {node_id}")
         
         # Remove from OPC UA address space
@@ -226,75 +375,312 @@ class OPCUAServer:
                 ua_node = self.node_manager.nodes[node_id]
                 # Use asyncua's delete_nodes to properly remove from address space
                 await self.server.delete_nodes([ua_node], recursive=True)
-                del self.node_manager.nodes[node_id]
+                self.node_manager.remove_node(node_id)
                 _logger.info(f"Removed node {node_id} from OPC UA address space.")
             except Exception as e:
                 _logger.error(f"Error removing node {node_id} from address space: {e}")
                 # Still remove from internal tracking even if OPC UA removal failed
-                if node_id in self.node_manager.nodes:
-                    del self.node_manager.nodes[node_id]
-                
-    async def update_dynamic_node(self, node_db):
-        """Updates a node dynamically"""
-        # Simplest approach: remove and add again
-        await self.remove_dynamic_node(node_db.node_id)
-        # Verify it's gone?
-        await self.add_dynamic_node(node_db)
+                self.node_manager.remove_node(node_id)
+        return source
 
-    async def poll_nodes(self):
-        # Cache scaling config to avoid DB queries on every poll cycle
-        scaling_cache = {}
-        cache_refresh_counter = 0
+    async def update_dynamic_node(self, node_db, previous_node_id=None):
+        """Updates a node dynamically, rebuilding it only if structural fields changed"""
+        node_id = node_db.node_id
+        old_id = previous_node_id or node_id
+        if not node_db.enabled:
+            await self.remove_dynamic_node(old_id)
+            return
+        if old_id == node_id and self.node_signatures.get(node_id) == self._node_signature(node_db):
+            self._apply_node_tuning(node_db)
+            _logger.info(f"Applied updated settings to node {node_id} in place")
+            return
+        # Structural change: remove and add again. The old source keeps its
+        # hardware handles until the new one has acquired them, so shared buses
+        # and chips are reused rather than reopened.
+        old_source = await self.remove_dynamic_node(old_id, close_source=False)
+        try:
+            await self.add_dynamic_node(node_db)
+        finally:
+            if old_source is not None:
+                old_source.close()
+            if old_id != node_id:
+                self.trends.remove(old_id)
+
+    @staticmethod
+    def _node_signature(node_db):
+        return tuple(repr(getattr(node_db, f, None)) for f in STRUCTURAL_NODE_FIELDS)
+
+    def _apply_node_tuning(self, node_db):
+        """(Re)applies the per-node settings that do not touch the address space."""
+        node_id = node_db.node_id
+        self.publish_filters[node_id] = DeadbandFilter.from_node(node_db)
+        self._apply_conditioning(node_db)
+        self.scaling.set_node(node_id, node_db)
+        source = self.data_sources.get(node_id)
+        if source is not None:
+            self.live.set_node(node_id, source, self.scaling)
+        if getattr(source, "event_driven", False):
+            self.scheduler.remove(node_id) # Pushed by edge callbacks, never polled
+        else:
+            self.scheduler.add(node_id, node_db.update_interval_ms)
+
+    def _apply_conditioning(self, node_db):
+        node_id = node_db.node_id
+        current = self.conditioners.get(node_id)
+        if current is not None and current.config == (node_db.conditioning or []):
+            return # Unchanged: keep the filter state
+        pipeline = ConditioningPipeline.from_node(node_db)
+        if pipeline is None:
+            self.conditioners.pop(node_id, None)
+        else:
+            self.conditioners[node_id] = pipeline
+        source = self.data_sources.get(node_id)
+        if source is not None:
+            source.set_oversample(pipeline.oversample if pipeline else 1)
+
+    @staticmethod
+    def _setting_number(value, default):
+        try:
+            return float(value)
+        except (ValueError, TypeError):
+            return default
+
+    def _apply_polling_rate(self, value):
+        try:
+            self.scheduler.set_default_interval(int(value))
+        except (ValueError, TypeError):
+            pass
+
+    def _apply_trend_depth(self, value):
+        if value is None:
+            return
+        try:
+            self.trends.set_depth(value)
+        except (ValueError, TypeError) as e:
+            _logger.warning(f"Ignoring trend_depth setting: {e}")
+
+    async def handle_config_event(self, event):
+        """Applies a change published on the config bus to the running server."""
+        if isinstance(event, SettingsChanged):
+            if "polling_rate" in event.changes:
+                self._apply_polling_rate(event.changes["polling_rate"])
+            if "trend_depth" in event.changes:
+                self._apply_trend_depth(event.changes["trend_depth"])
+            if self.history is not None:
+                if "history_retention_days" in event.changes:
+                    self.history.retention_days = self._setting_number(
+                        event.changes["history_retention_days"], self.history.retention_days)
+                if "history_max_mb" in event.changes:
+                    self.history.max_bytes = int(self._setting_number(
+                        event.changes["history_max_mb"], DEFAULT_MAX_MB) * 1024 * 1024)
+            pending = [k for k in event.changes if k in RESTART_SETTINGS]
+            if pending:
+                _logger.info(f"Settings {pending} take effect on the next server restart")
+            return
+
+        # Node changes need a live address space
+        if not self.is_running or self.node_manager is None:
+            return
+        if isinstance(event, NodeCreated):
+            if event.node.enabled:
+                await self.add_dynamic_node(event.node)
+        elif isinstance(event, NodeUpdated):
+            await self.update_dynamic_node(event.node, previous_node_id=event.previous_node_id)
+        elif isinstance(event, NodeDeleted):
+            await self.remove_dynamic_node(event.node_id)
+
+    async def _read_bus(self, entries):
+        """Reads sources that share one bus back-to-back."""
+        results = []
+        read_seconds, read_errors = self.metrics.read_seconds, self.metrics.read_errors
+        record_read = self.diagnostics.record_read
+        clock = time.perf_counter
+        # Healthy ADC channels go to the bus worker as one job
+        scanned = [(node_id, source) for node_id, source in entries
+                   if getattr(source, "scanner", None) is not None and not source.error]
+        if len(scanned) > 1:
+            kind = scanned[0][1].config.get("type", "unknown")
+            started = clock()
+            try:
+                values = await read_scanned([source for _, source in scanned])
+                elapsed = clock() - started
+                read_seconds.labels(kind).observe(elapsed)
+                record_read(f"{kind} scan of {len(scanned)} channels ({scanned[0][0]}...)", elapsed)
+                results.extend(zip((node_id for node_id, _ in scanned), values))
+                failed = sum(1 for _, source in scanned if source.error)
+                if failed:
+                    read_errors.labels(kind).inc(failed)
+                done = {node_id for node_id, _ in scanned}
+                entries = [entry for entry in entries if entry[0] not in done]
+            except Exception as e:
+                _logger.error(f"Error reading {len(scanned)} ADC channels: {e}")
+        for node_id, source in entries:
+            kind = source.config.get("type", "unknown")
+            started = clock()
+            try:
+                results.append((node_id, await source.read()))
+                elapsed = clock() - started
+                read_seconds.labels(kind).observe(elapsed)
+                record_read(node_id, elapsed)
+                if source.error:
+                    read_errors.labels(kind).inc()
+            except Exception as e:
+                read_errors.labels(kind).inc()
+                _logger.error(f"Error reading node {node_id}: {e}")
+        return results
+
+    async def read_sources(self, node_ids):
+        """
+        Reads the given nodes, fanning out across independent buses concurrently.
+        Sources on the same bus (I2C, one SPI chip select, GPIO) are read in turn,
+        so cycle time follows the slowest bus rather than the sum of all reads.
+        Returns a list of (node_id, raw_value).
+        """
+        groups = {}
+        for node_id in node_ids:
+            source = self.data_sources.get(node_id)
+            if source is None:
+                continue
+            # Sources without shared hardware get a group of their own
+            key = source.bus_key or ("node", node_id)
+            groups.setdefault(key, []).append((node_id, source))
+
+        if len(groups) == 1:
+            (entries,) = groups.values()
+            return await self._read_bus(entries)
+
+        batches = await asyncio.gather(*(self._read_bus(entries) for entries in groups.values()))
+        return [item for batch in batches for item in batch]
+
+    def _session_count(self):
+        iserver = getattr(self.server, "iserver", None) if self.is_running else None
+        return len(getattr(iserver, "_external_sessions", ()))
+
+    async def publish_readings(self, readings):
+        """Scales, filters and writes one batch of (node_id, raw_value) readings."""
+        node_ids = [node_id for node_id, _ in readings]
+        raw_values = [raw for _, raw in readings]
+        read_values = list(raw_values)
+        conditioners = self.conditioners
+        if conditioners:
+            for i, node_id in enumerate(node_ids):
+                pipeline = conditioners.get(node_id)
+                if pipeline is not None:
+                    raw_values[i] = pipeline.process(raw_values[i])
+        # Scale the whole batch in one vectorized pass
+        scaled_values = self.scaling.apply(node_ids, raw_values)
+        now = time.time()
+        self.trends.record(now, node_ids, scaled_values)
+        sources = self.data_sources
+        self.live.update(now, node_ids, read_values, scaled_values,
+                         [getattr(sources.get(node_id), "error", None) for node_id in node_ids])
+        
+        values = {}
+        for node_id, scaled_value in zip(node_ids, scaled_values):
+            # Skip the write if the change is inside the node's deadband
+            publish_filter = self.publish_filters.get(node_id)
+            if publish_filter is None or publish_filter.accept(scaled_value):
+                values[node_id] = scaled_value
         
+        metrics = self.metrics
+        if len(values) < len(node_ids):
+            metrics.suppressed_writes.inc(len(node_ids) - len(values))
+        if values:
+            started = time.perf_counter()
+            try:
+                await self.node_manager.set_node_values(values)
+                metrics.published_values.inc(len(values))
+            except Exception as e:
+                _logger.error(f"Error updating address space: {e}")
+            metrics.write_seconds.observe(time.perf_counter() - started)
+            if self.history is not None:
+                self.history.append(now, values)
+
+    def queue_event(self, node_id, value):
+        """Queues a pushed value; edges arriving together are written as one batch."""
+        if node_id not in self.data_sources or self.node_manager is None:
+            return
+        self.pending_events[node_id] = value
+        if self._event_flush is None or self._event_flush.done():
+            self._event_flush = asyncio.ensure_future(self._flush_events())
+
+    async def _flush_events(self):
+        while self.pending_events:
+            readings = list(self.pending_events.items())
+            self.pending_events = {}
+            try:
+                await self.publish_readings(readings)
+            except Exception as e:
+                self.metrics.cycle_errors.inc()
+                _logger.error(f"Error publishing {len(readings)} pushed values: {e}")
+
+    async def poll_nodes(self):
+        # Configuration changes arrive through the config bus, so the loop never touches the DB
         while self.is_running:
-            # Refresh scaling cache every 30 cycles (~30 seconds)
-            if cache_refresh_counter % 30 == 0:
-                db = SessionLocal()
+            now = time.monotonic()
+            due = self.scheduler.pop_due(now)
+            if due:
+                self.diagnostics.start_cycle()
                 try:
-                    nodes_db = db.query(Node).all()
-                    scaling_cache = {
-                        n.node_id: {
-                            "scale_enabled": n.scale_enabled,
-                            "scale_min": n.scale_min,
-                            "scale_max": n.scale_max,
-                            "voltage_min": n.voltage_min,
-                            "voltage_max": n.voltage_max
-                        } for n in nodes_db
-                    }
+                    readings = await self.read_sources(due)
+                    await self.publish_readings(readings)
                 except Exception as e:
-                    _logger.error(f"Error refreshing scaling cache: {e}")
-                finally:
-                    db.close()
-            cache_refresh_counter += 1
+                    # Drop this batch only; the nodes stay scheduled for their next deadline
+                    self.metrics.cycle_errors.inc()
+                    _logger.error(f"Error in acquisition cycle of {len(due)} nodes: {e}")
+                elapsed = time.monotonic() - now
+                # Overrun: a node read this cycle has already missed its next deadline
+                overrun = elapsed > self.scheduler.last_min_period
+                self.metrics.cycle_seconds.observe(elapsed)
+                if overrun:
+                    self.metrics.cycle_overruns.inc()
+                self.diagnostics.end_cycle(self.scheduler.last_jitter, elapsed, len(due), overrun)
             
-            for node_id, source in self.data_sources.items():
-                try:
-                    raw_value = await source.read()
-                    
-                    # Apply scaling if enabled for this node
-                    scaled_value = raw_value
-                    scale_config = scaling_cache.get(node_id)
-                    
-                    if scale_config and scale_config.get("scale_enabled") and raw_value is not None:
-                        try:
-                            v_min = float(scale_config.get("voltage_min") or 0)
-                            v_max = float(scale_config.get("voltage_max") or 3.3)
-                            e_min = float(scale_config.get("scale_min") or 0)
-                            e_max = float(scale_config.get("scale_max") or 100)
-                            
-                            # Apply linear scaling: scaled = (raw - v_min) / (v_max - v_min) * (e_max - e_min) + e_min
-                            if v_max != v_min:
-                                scaled_value = ((raw_value - v_min) / (v_max - v_min)) * (e_max - e_min) + e_min
-                            else:
-                                scaled_value = e_min
-                        except (ValueError, TypeError) as e:
-                            _logger.warning(f"Scaling error for {node_id}: {e}, using raw value")
-                            scaled_value = raw_value
-                    
-                    await self.node_manager.set_node_value(node_id, scaled_value)
-                except Exception as e:
-                    _logger.error(f"Error polling node {node_id}: {e}")
-            await asyncio.sleep(1)
+            # Sleep until the next deadline; capped so new nodes and stop requests are noticed
+            delay = self.scheduler.time_until_next()
+            await asyncio.sleep(MAX_IDLE_SLEEP if delay is None else min(delay, MAX_IDLE_SLEEP))
+
+    async def profile_acquisition(self, seconds=5.0, interval=0.005):
+        """Samples the acquisition stacks for a while; one profile at a time."""
+        if self._profiling:
+            raise RuntimeError("A profile is already running")
+        seconds = min(max(float(seconds), 0.1), MAX_PROFILE_SECONDS)
+        interval = max(float(interval), MIN_PROFILE_INTERVAL)
+        sampler = StackSampler(threading.get_ident())
+        self._profiling = True
+        try:
+            _logger.info(f"Profiling acquisition for {seconds}s every {interval * 1000:g}ms")
+            result = await asyncio.to_thread(sampler.run, seconds, interval)
+        finally:
+            self._profiling = False
+        return {"seconds": seconds, "interval_ms": interval * 1000, **result}
+
+    def get_acquisition_stats(self):
+        """Per-node timing from the scheduler merged with publication filter counters."""
+        nodes = self.scheduler.get_stats()
+        published = suppressed = 0
+        for node_id, publish_filter in self.publish_filters.items():
+            filter_stats = publish_filter.get_stats()
+            published += filter_stats["published_writes"]
+            suppressed += filter_stats["suppressed_writes"]
+            if node_id in nodes:
+                nodes[node_id].update(filter_stats)
+        for node_id, source in self.data_sources.items():
+            if getattr(source, "event_driven", False):
+                stats = source.get_edge_stats()
+                if node_id in self.publish_filters:
+                    stats.update(self.publish_filters[node_id].get_stats())
+                nodes[node_id] = stats
+        return {
+            "scheduled_nodes": len(self.scheduler),
+            "published_writes": published,
+            "suppressed_writes": suppressed,
+            "hardware": hardware_registry.get_stats(),
+            "adc_scanners": hardware_registry.get_scanner_stats(),
+            "history": self.history.get_stats() if self.history is not None else None,
+            "startup": self.startup_timings,
+            "nodes": nodes
+        }
 
     async def start(self):
         if self.is_running:
@@ -332,6 +718,7 @@ class OPCUAServer:
             _logger.error(f"Error in server runtime: {e}")
         finally:
             self.is_running = False
+            detach_metrics(self.server.iserver)
             _logger.info("OPC UA Server stopped and port released.")
 
     async def stop(self):
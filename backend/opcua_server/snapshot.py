@@ -0,0 +1,153 @@
+import json
+import logging
+import math
+
+_logger = logging.getLogger(__name__)
+
+# ADC-backed source types are shown as 'analog' in the UI
+ADC_TYPES = ("ads1115", "mcp3008", "mcp3208", "analog")
+
+
+def _json_safe(value):
+    """NaN/inf are not valid JSON; report them as missing."""
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    return value
+
+
+def node_metadata(node_id, source, scaling):
+    """Fields of a live-values row that only change when the node is reconfigured."""
+    source_type = source.config.get("type", "")
+    adc_device = source.config.get("adc_device", "")
+    display_type = "analog" if source_type in ADC_TYPES or adc_device in ADC_TYPES else source_type
+    scale_enabled = scaling.is_enabled(node_id)
+    return {
+        "node_id": node_id,
+        "name": source.config.get("name", "Unknown"),
+        "type": display_type,
+        "pin": source.config.get("pin"),
+        "channel": source.config.get("channel"),
+        "adc_device": adc_device or source_type if display_type == "analog" else None,
+        "scale_enabled": scale_enabled,
+        "scale_unit": scaling.get_unit(node_id) if scale_enabled else None,
+    }
+
+
+class LiveSnapshot:
+    """
+    The latest reading of every active node as published by one poll cycle.
+
+    Never modified after construction: readers can hold on to it while the
+    poller builds the next one. The JSON body is rendered once, on first
+    request, and shared by every client that asks for the same sequence.
+    """
+
+    __slots__ = ("seq", "timestamp", "nodes", "etag", "_body")
+
+    def __init__(self, seq, timestamp, nodes, instance_id=""):
+        self.seq = seq
+        self.timestamp = timestamp
+        self.nodes = nodes # node_id -> row dict, in node order; rows are shared until they change
+        self.etag = f'"{instance_id}-{seq}"'
+        self._body = None
+
+    @property
+    def rows(self):
+        return tuple(self.nodes.values())
+
+    def body(self):
+        if self._body is None:
+            self._body = json.dumps(list(self.nodes.values())).encode()
+        return self._body
+
+
+class LiveValues:
+    """
+    Builds a new LiveSnapshot whenever a cycle changes something visible.
+
+    Static per-node fields are computed when the node is (re)configured, so
+    a cycle only rebuilds the rows of nodes whose value, raw value or error
+    changed, and the sequence number (and ETag) only advances on a change.
+    Each row's timestamp is when that node last changed. Unchanged rows are
+    the same objects from one snapshot to the next, so consumers can find
+    what changed with an identity check.
+    """
+
+    def __init__(self, instance_id=""):
+        self.instance_id = instance_id
+        self._meta = {} # node_id -> static fields
+        self._state = {} # node_id -> (raw_value, value, error)
+        self._rows = {} # node_id -> published row
+        self._seq = 0
+        self._listeners = []
+        self.snapshot = LiveSnapshot(0, None, {}, instance_id)
+
+    def add_listener(self, callback):
+        """Calls callback(snapshot) on the event loop after each new snapshot."""
+        self._listeners.append(callback)
+
+    def remove_listener(self, callback):
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def _publish(self, ts):
+        self._seq += 1
+        self.snapshot = LiveSnapshot(self._seq, ts, dict(self._rows), self.instance_id)
+        for callback in self._listeners:
+            try:
+                callback(self.snapshot)
+            except Exception as e:
+                _logger.error(f"Live value listener failed: {e}")
+
+    def _row(self, node_id, ts):
+        raw_value, value, error = self._state.get(node_id, (None, None, None))
+        row = dict(self._meta[node_id])
+        row.update({
+            "value": value,
+            "raw_value": raw_value,
+            "error": error,
+            "status": "bad" if error or value is None else "good",
+            "timestamp": ts,
+        })
+        return row
+
+    def set_node(self, node_id, source, scaling):
+        meta = node_metadata(node_id, source, scaling)
+        if self._meta.get(node_id) == meta:
+            return
+        self._meta[node_id] = meta
+        previous = self._rows.get(node_id)
+        self._rows[node_id] = self._row(node_id, previous["timestamp"] if previous else None)
+        self._publish(self.snapshot.timestamp)
+
+    def remove(self, node_id):
+        self._meta.pop(node_id, None)
+        self._state.pop(node_id, None)
+        if self._rows.pop(node_id, None) is not None:
+            self._publish(self.snapshot.timestamp)
+
+    def clear(self):
+        self._meta = {}
+        self._state = {}
+        self._rows = {}
+        self._publish(None) # Sequence keeps counting so old ETags never match again
+
+    def update(self, ts, node_ids, raw_values, values, errors):
+        """Records one cycle of readings; returns True if a new snapshot was published."""
+        changed = False
+        state, meta = self._state, self._meta
+        for node_id, raw_value, value, error in zip(node_ids, raw_values, values, errors):
+            if node_id not in meta:
+                continue
+            current = (_json_safe(raw_value), _json_safe(value), error)
+            if state.get(node_id) == current:
+                continue
+            state[node_id] = current
+            self._rows[node_id] = self._row(node_id, ts)
+            changed = True
+        if changed:
+            self._publish(ts)
+        return changed
+
+    def get_stats(self):
+        return {"seq": self.snapshot.seq, "nodes": len(self._rows)}
@@ -0,0 +1,147 @@
+import logging
+import math
+from array import array
+
+import numpy as np
+
+_logger = logging.getLogger(__name__)
+
+DEFAULT_TREND_DEPTH = 1000
+MAX_TREND_DEPTH = 1_000_000
+
+
+def _preallocated(depth):
+    return array("d", bytes(8 * depth))
+
+
+class TrendBuffer:
+    """
+    Fixed-depth ring of (timestamp, value) samples for one node.
+
+    Timestamps and values live in two array('d') buffers allocated once;
+    append() overwrites the oldest slot in place. NumPy views share the same
+    memory, so queries search and slice the ring without copying it and
+    only the returned points are materialized. Timestamps are expected to
+    be non-decreasing (they come from one poller).
+    """
+
+    def __init__(self, depth=DEFAULT_TREND_DEPTH):
+        self.depth = depth
+        self._ts = _preallocated(depth)
+        self._values = _preallocated(depth)
+        self._ts_view = np.frombuffer(self._ts, dtype=np.float64)
+        self._values_view = np.frombuffer(self._values, dtype=np.float64)
+        self._next = 0 # slot the next sample goes to
+        self.count = 0
+
+    def append(self, ts, value):
+        i = self._next
+        self._ts[i] = ts
+        self._values[i] = value
+        self._next = i + 1 if i + 1 < self.depth else 0
+        if self.count < self.depth:
+            self.count += 1
+
+    def _segments(self):
+        """The ring in chronological order as up to two contiguous slices."""
+        if self.count < self.depth:
+            return (slice(0, self.count),)
+        if self._next == 0:
+            return (slice(0, self.depth),)
+        return (slice(self._next, self.depth), slice(0, self._next))
+
+    def _collect(self, ranges):
+        ts = [self._ts_view[r] for r in ranges]
+        values = [self._values_view[r] for r in ranges]
+        if len(ranges) == 1:
+            return ts[0], values[0]
+        return np.concatenate(ts), np.concatenate(values)
+
+    def last(self, n):
+        """Returns (timestamps, values) arrays of the newest n samples, oldest first."""
+        n = max(0, min(n, self.count))
+        end = self._next
+        start = end - n
+        if start >= 0:
+            return self._collect((slice(start, end),))
+        return self._collect((slice(self.depth + start, self.depth), slice(0, end)))
+
+    def between(self, start=None, end=None, limit=None):
+        """Returns samples with start <= ts <= end, oldest first (newest `limit` if given)."""
+        ranges = []
+        for seg in self._segments():
+            ts = self._ts_view[seg]
+            lo = 0 if start is None else int(np.searchsorted(ts, start, side="left"))
+            hi = len(ts) if end is None else int(np.searchsorted(ts, end, side="right"))
+            if hi > lo:
+                ranges.append(slice(seg.start + lo, seg.start + hi))
+        if limit is not None:
+            # Trim from the oldest end so the newest points are kept
+            total = sum(r.stop - r.start for r in ranges)
+            while ranges and total > limit:
+                r = ranges[0]
+                drop = min(total - limit, r.stop - r.start)
+                total -= drop
+                ranges[0] = slice(r.start + drop, r.stop)
+                if ranges[0].start == ranges[0].stop:
+                    ranges.pop(0)
+        if not ranges:
+            empty = self._ts_view[:0]
+            return empty, empty
+        return self._collect(tuple(ranges))
+
+    def resized(self, depth):
+        """Returns a buffer of the new depth holding the newest samples of this one."""
+        other = TrendBuffer(depth)
+        ts, values = self.last(depth)
+        for t, v in zip(ts.tolist(), values.tolist()):
+            other.append(t, v)
+        return other
+
+
+def _to_float(value):
+    if value is None:
+        return math.nan
+    try:
+        return float(value) # bools become 0.0/1.0
+    except (TypeError, ValueError):
+        return math.nan
+
+
+class TrendStore:
+    """Recent-history buffers for every node, fed once per poll cycle."""
+
+    def __init__(self, depth=DEFAULT_TREND_DEPTH):
+        self.depth = depth
+        self._buffers = {} # node_id -> TrendBuffer
+
+    def __contains__(self, node_id):
+        return node_id in self._buffers
+
+    def get(self, node_id):
+        return self._buffers.get(node_id)
+
+    def remove(self, node_id):
+        self._buffers.pop(node_id, None)
+
+    def clear(self):
+        self._buffers = {}
+
+    def set_depth(self, depth):
+        depth = int(depth)
+        if not 1 <= depth <= MAX_TREND_DEPTH:
+            raise ValueError(f"trend depth must be 1..{MAX_TREND_DEPTH}, got {depth}")
+        if depth == self.depth:
+            return
+        self.depth = depth
+        self._buffers = {node_id: buf.resized(depth) for node_id, buf in self._buffers.items()}
+        _logger.info(f"Trend depth set to {depth} samples per node")
+
+    def record(self, ts, node_ids, values):
+        """Appends one sample per node; missing readings are stored as NaN."""
+        buffers = self._buffers
+        for node_id, value in zip(node_ids, values):
+            buf = buffers.get(node_id)
+            if buf is None:
+                buf = buffers[node_id] = TrendBuffer(self.depth)
+            buf.append(ts, _to_float(value))
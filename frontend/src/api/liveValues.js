@@ -0,0 +1,62 @@
+import { useEffect, useState } from 'react';
+import api from './client';
+
+const RECONNECT_MS = 3000;
+
+const streamUrl = (token, maxHz) => {
+    const scheme = window.location.protocol === 'https:' ? 'wss' : 'ws';
+    const params = new URLSearchParams({ token, max_hz: String(maxHz) });
+    return `${scheme}://${window.location.host}/api/nodes/live/stream?${params}`;
+};
+
+// Applies a stream frame to the current list of rows, keeping node order
+const applyFrame = (rows, frame) => {
+    if (frame.type === 'full') return frame.changed;
+    const changed = new Map(frame.changed.map(row => [row.node_id, row]));
+    const removed = new Set(frame.removed);
+    const next = [];
+    for (const row of rows) {
+        if (removed.has(row.node_id)) continue;
+        next.push(changed.get(row.node_id) || row);
+        changed.delete(row.node_id);
+    }
+    return next.concat([...changed.values()]);
+};
+
+// Live node values pushed over the WebSocket stream (deltas only),
+// seeded with one REST request so the page is not empty while connecting.
+export const useLiveValues = (maxHz = 2) => {
+    const [values, setValues] = useState(undefined);
+
+    useEffect(() => {
+        let socket = null;
+        let retry = null;
+        let closed = false;
+
+        api.get('/nodes/live/values')
+            .then(resp => setValues(current => current ?? resp.data))
+            .catch(() => {});
+
+        const connect = () => {
+            const token = localStorage.getItem('opcua_token');
+            if (!token || closed) return;
+            socket = new WebSocket(streamUrl(token, maxHz));
+            socket.onmessage = (event) => {
+                const frame = JSON.parse(event.data);
+                setValues(current => applyFrame(current || [], frame));
+            };
+            socket.onclose = () => {
+                if (!closed) retry = setTimeout(connect, RECONNECT_MS);
+            };
+        };
+        connect();
+
+        return () => {
+            closed = true;
+            clearTimeout(retry);
+            if (socket) socket.close();
+        };
+    }, [maxHz]);
+
+    return { data: values, isLoading: values === undefined };
+};
@@ -9,6 +9,7 @@ import {
     Wifi
 } from 'lucide-react';
 import api from '../api/client';
+import { useLiveValues } from '../api/liveValues';
 import { useQuery } from '@tanstack/react-query';
 import GPIOStatus from '../components/GPIOStatus';
 import AnalogStatus from '../components/AnalogStatus';
@@ -35,15 +36,8 @@ const Dashboard = () => {
         refetchInterval: 5000
     });
 
-    // Fetch Live Node Values
-    const { data: nodeValues } = useQuery({
-        queryKey: ['node-values'],
-        queryFn: async () => {
-            const resp = await api.get('/nodes/live/values');
-            return resp.data;
-        },
-        refetchInterval: 2000
-    });
+    // Live Node Values, pushed as they change
+    const { data: nodeValues } = useLiveValues();
 
     // Fetch Security Events (Audit Logs)
     const { data: securityEvents } = useQuery({
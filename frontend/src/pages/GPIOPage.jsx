@@ -1,21 +1,13 @@
 import React from 'react';
 import { Activity, CircuitBoard, Info, Plus } from 'lucide-react';
-import api from '../api/client';
-import { useQuery } from '@tanstack/react-query';
+import { useLiveValues } from '../api/liveValues';
 import GPIOStatus from '../components/GPIOStatus';
 import AnalogStatus from '../components/AnalogStatus';
 import { Link } from 'react-router-dom';
 
 const GPIOPage = () => {
-    // Fetch Live Node Values
-    const { data: nodeValues, isLoading } = useQuery({
-        queryKey: ['node-values'],
-        queryFn: async () => {
-            const resp = await api.get('/nodes/live/values');
-            return resp.data;
-        },
-        refetchInterval: 2000
-    });
+    // Live Node Values, pushed as they change
+    const { data: nodeValues, isLoading } = useLiveValues();
 
     const gpioNodes = nodeValues?.filter(n => n.type === 'gpio') || [];
     const analogNodes = nodeValues?.filter(n => n.type === 'analog') || [];
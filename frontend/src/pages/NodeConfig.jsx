@@ -294,6 +294,32 @@ const NodeConfig = () => {
                                                         <option value="output">Output (Digital Out)</option>
                                                     </select>
                                                 </div>
+                                                {(formData.source_config?.mode || 'input') === 'input' && (
+                                                    <>
+                                                        <div className="space-y-2">
+                                                            <label className="text-sm font-semibold text-surface-700">Acquisition</label>
+                                                            <select
+                                                                className="input-field"
+                                                                value={formData.source_config?.event_driven ? 'edges' : 'poll'}
+                                                                onChange={(e) => handleSourceConfigChange('event_driven', e.target.value === 'edges')}
+                                                            >
+                                                                <option value="poll">Polled</option>
+                                                                <option value="edges">Edge events (interrupt)</option>
+                                                            </select>
+                                                        </div>
+                                                        <div className="space-y-2">
+                                                            <label className="text-sm font-semibold text-surface-700">Debounce (ms)</label>
+                                                            <input
+                                                                type="number"
+                                                                min="0"
+                                                                value={formData.source_config?.debounce_ms || 0}
+                                                                onChange={(e) => handleSourceConfigChange('debounce_ms', parseInt(e.target.value) || 0)}
+                                                                className="input-field font-mono"
+                                                                disabled={!formData.source_config?.event_driven}
+                                                            />
+                                                        </div>
+                                                    </>
+                                                )}
                                             </div>
                                         )}
 
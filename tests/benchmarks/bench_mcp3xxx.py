@@ -0,0 +1,143 @@
+"""
+Throughput benchmark for the MCP3008/MCP3208 channel scanner.
+
+Runs against a simulated SPI device that decodes the real command frames
+and spends the wire time of a 24-clock transfer plus a fixed per-transfer
+driver overhead. Compares per-channel transactions (one bus lock, SPI
+configure and worker job per channel, as AnalogIn did) with one burst per
+chip read through a single worker job (as the poller's bus groups do), and
+prints samples/s per chip.
+
+    PYTHONPATH=. python tests/benchmarks/bench_mcp3xxx.py [--baudrate 1000000] [--channels 8]
+"""
+import argparse
+import asyncio
+import json
+import threading
+import time
+from types import SimpleNamespace
+
+from backend.opcua_server.data_sources import BusWorker, _read_scanned_channels
+from backend.opcua_server.hardware import MCP3XXX_BITS, MCP3xxxScanner, mcp3xxx_command, mcp3xxx_result
+
+
+def _spin(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+class SimulatedSPI:
+    """busio.SPI stand-in serving a fixed ramp of codes per channel."""
+
+    def __init__(self, model, transfer_overhead=15e-6, configure_overhead=5e-6):
+        self.model = model
+        self.baudrate = 1000000
+        self.transfer_overhead = transfer_overhead
+        self.configure_overhead = configure_overhead
+        self.codes = [(channel + 1) * ((1 << MCP3XXX_BITS[model]) // 9) for channel in range(8)]
+        self._lock = threading.Lock()
+
+    def try_lock(self):
+        return self._lock.acquire(blocking=False)
+
+    def unlock(self):
+        self._lock.release()
+
+    def configure(self, baudrate=1000000, **kwargs):
+        self.baudrate = baudrate
+        _spin(self.configure_overhead)
+
+    def write_readinto(self, out_buf, in_buf):
+        if self.model == "mcp3208":
+            channel = ((out_buf[0] & 0x01) << 2) | (out_buf[1] >> 6)
+            code = self.codes[channel]
+            in_buf[1], in_buf[2] = code >> 8, code & 0xFF
+        else:
+            channel = (out_buf[1] >> 4) & 0x07
+            code = self.codes[channel]
+            in_buf[1], in_buf[2] = code >> 8, code & 0xFF
+        _spin(self.transfer_overhead + 24 / self.baudrate)
+
+
+class SimulatedCS:
+    value = True
+
+
+def per_channel_read(scanner, channel):
+    """One full SPI transaction per sample, as the AnalogIn path did."""
+    spi, frame = scanner.spi, bytearray(3)
+    with scanner.bus_lock:
+        while not spi.try_lock():
+            pass
+        try:
+            spi.configure(baudrate=scanner.baudrate)
+            scanner.cs.value = False
+            spi.write_readinto(mcp3xxx_command(scanner.model, channel), frame)
+            scanner.cs.value = True
+        finally:
+            spi.unlock()
+    return mcp3xxx_result(scanner.model, frame) * scanner._lsb
+
+
+async def run(model, channels, baudrate, duration):
+    scanner = MCP3xxxScanner(SimulatedSPI(model), SimulatedCS(), model, threading.Lock(),
+                             baudrate=baudrate, cs_pin=8)
+    for channel in range(channels):
+        scanner.add_channel(channel)
+    worker = BusWorker(f"bench-{model}")
+    expected = [scanner.read_channel(c) for c in range(channels)]
+
+    async def per_channel_cycle():
+        for channel in range(channels):
+            await worker.run(per_channel_read, scanner, channel)
+
+    sources = [SimpleNamespace(scanner=scanner, channel=c, error=None) for c in range(channels)]
+
+    async def burst_cycle():
+        await worker.run(_read_scanned_channels, sources)
+
+    async def rate(cycle):
+        samples, start = 0, time.perf_counter()
+        while time.perf_counter() - start < duration:
+            await cycle()
+            samples += channels
+        return samples / (time.perf_counter() - start)
+
+    legacy = await rate(per_channel_cycle)
+    burst = await rate(burst_cycle)
+
+    # Chip-level ceiling: burst scans issued directly on the bus thread
+    samples, start = 0, time.perf_counter()
+    while time.perf_counter() - start < duration:
+        scanner._fresh.clear()
+        scanner.scan()
+        samples += channels
+    ceiling = samples / (time.perf_counter() - start)
+    worker.stop()
+
+    assert [scanner.read_channel(c) for c in range(channels)] == expected
+    return {
+        "model": model,
+        "bits": scanner.bits,
+        "channels": channels,
+        "baudrate": baudrate,
+        "per_channel_samples_per_s": round(legacy),
+        "burst_samples_per_s": round(burst),
+        "burst_scan_ceiling_samples_per_s": round(ceiling),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--baudrate", type=int, default=1000000)
+    parser.add_argument("--channels", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=1.0)
+    args = parser.parse_args()
+    results = [asyncio.run(run(model, args.channels, args.baudrate, args.duration))
+               for model in ("mcp3008", "mcp3208")]
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
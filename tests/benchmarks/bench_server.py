@@ -0,0 +1,294 @@
+"""
+End-to-end benchmark of the acquisition and address-space path.
+
+Builds an OPCUAServer with N simulated nodes (SimulationSource, plus a
+share of ManualSource nodes) from a throwaway SQLite database and reports:
+
+  - startup: setup() and time until the first poll cycle completed
+    (certificates and the address space cache are prepared beforehand, as
+    on any restart, unless --cold is given)
+  - steady-state cycle time with no clients connected; --adc-nodes adds
+    ADS1115/MCP3008 nodes on the simulated buses of fake_hardware
+  - RSS growth per node (and, for several N, the fitted bytes/node slope)
+  - data change notifications/s delivered to local asyncua clients, and
+    the cycle time while they are subscribed
+
+Each N runs in its own interpreter so RSS and import state do not leak
+between sizes. Results are printed (or written with --output) as JSON for
+comparison between commits.
+
+    PYTHONPATH=. python tests/benchmarks/bench_server.py [--nodes 100 500 2000] [--clients 2] [--output out.json]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+SIM_TYPES = ("sine", "random", "incremental")
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _adc_node(i):
+    """Spreads ADC nodes over four ADS1115 addresses and two MCP3008 chip selects."""
+    if i % 2 == 0:
+        n = i // 2
+        return "ads1115", {"channel": n % 4, "i2c_address": 0x48 + (n // 4) % 4, "data_rate": 860}
+    n = i // 2
+    return "mcp3008", {"channel": n % 8, "cs_pin": (8, 7)[(n // 8) % 2]}
+
+
+def _seed(nodes, interval_ms, manual_share, port, history, adc_nodes=0):
+    from backend.database.db import SessionLocal, init_db
+    from backend.database.models import Node, ServerSetting
+
+    init_db()
+    db = SessionLocal()
+    try:
+        settings = {"port": str(port), "allow_anonymous": "true",
+                    "history_enabled": "true" if history else "false"}
+        for key, value in settings.items():
+            db.add(ServerSetting(key=key, value=value))
+        manual = int(nodes * manual_share)
+        for i in range(nodes):
+            if i < manual:
+                source_type, config = "manual", {"initial_value": float(i)}
+            else:
+                source_type = "simulation"
+                config = {"sim_type": SIM_TYPES[i % len(SIM_TYPES)], "min": 0, "max": 100}
+            db.add(Node(name=f"Bench{i}", node_id=f"Bench{i}", source_type=source_type, source_config=config,
+                        update_interval_ms=interval_ms, data_type="Float", enabled=True))
+        for i in range(adc_nodes):
+            source_type, config = _adc_node(i)
+            db.add(Node(name=f"BenchAdc{i}", node_id=f"BenchAdc{i}", source_type=source_type, source_config=config,
+                        update_interval_ms=interval_ms, data_type="Float", enabled=True))
+        db.commit()
+        return manual
+    finally:
+        db.close()
+
+
+def _cycle_stats(server, elapsed):
+    report = server.diagnostics.get_report(recent=0) # Percentiles over the last DEFAULT_CYCLE_HISTORY cycles
+    return {
+        "cycles": report["cycles"],
+        "cycles_per_s": round(report["cycles"] / elapsed, 1),
+        "overruns": report["overruns"],
+        "duration_ms": report["duration"],
+        "jitter_ms": report["jitter"],
+    }
+
+
+class _Counter:
+    def __init__(self):
+        self.count = 0
+
+    def datachange_notification(self, node, val, data):
+        self.count += 1
+
+
+async def _connect_client(endpoint, workdir, server_cert, index):
+    from asyncua import Client, ua
+    from asyncua.crypto.security_policies import SecurityPolicyBasic256Sha256
+    from backend.opcua_server.security import SecurityManager
+
+    app_uri = f"urn:bench:client:{index}"
+    certs = SecurityManager(cert_dir=os.path.join(workdir, f"client{index}"))
+    certs.generate_self_signed_cert(common_name=f"bench-client-{index}", app_uri=app_uri)
+    client = Client(endpoint)
+    client.application_uri = app_uri
+    await client.set_security(SecurityPolicyBasic256Sha256, certs.server_cert_path, certs.server_key_path,
+                              server_certificate=server_cert, mode=ua.MessageSecurityMode.SignAndEncrypt)
+    await client.connect()
+    return client
+
+
+async def _measure_subscriptions(server, args, workdir, node_ids):
+    endpoint = server.endpoint # The server listens on the address it reports
+    server_cert = server.security_manager.server_cert_path
+    clients, counters = [], []
+    try:
+        for index in range(args.clients):
+            client = await _connect_client(endpoint, workdir, server_cert, index)
+            clients.append(client)
+            ns = await client.get_namespace_index("http://raspberry.opcua.server")
+            counter = _Counter()
+            subscription = await client.create_subscription(args.interval_ms, counter)
+            await subscription.subscribe_data_change(
+                [client.get_node(f"ns={ns};s={node_id}") for node_id in node_ids])
+            counters.append(counter)
+
+        await asyncio.sleep(args.warmup)
+        server.diagnostics.reset()
+        start = [c.count for c in counters]
+        started = time.perf_counter()
+        await asyncio.sleep(args.duration)
+        elapsed = time.perf_counter() - started
+        delivered = [c.count - s for c, s in zip(counters, start)]
+        return {
+            "clients": args.clients,
+            "monitored_items_per_client": len(node_ids),
+            "notifications_per_s": round(sum(delivered) / elapsed, 1),
+            "notifications_per_s_per_client": [round(d / elapsed, 1) for d in delivered],
+            "cycle": _cycle_stats(server, elapsed),
+        }
+    finally:
+        for client in clients:
+            try:
+                await client.disconnect()
+            except Exception:
+                pass
+
+
+async def _run_single(args, nodes):
+    import psutil
+
+    workdir = tempfile.mkdtemp(prefix="opcua-bench-")
+    os.environ["OPCUA_DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    if args.adc_nodes:
+        os.environ.setdefault("OPCUA_FAKE_HARDWARE", "1") # Or a fake_hardware JSON config path
+    sys.path.insert(0, ROOT)
+    os.chdir(workdir) # Certificates use relative paths
+
+    from backend.opcua_server import address_space_cache, history
+    from backend.opcua_server.address_space_cache import CachedAddressSpaceServer
+    from backend.opcua_server.security import SecurityManager
+    from backend.opcua_server.server import OPCUAServer
+
+    # Keep the address space cache in the run's workdir so --cold really starts without one
+    address_space_cache.ASPACE_CACHE_PATH = os.path.join(workdir, "aspace")
+    history.HISTORY_DB_PATH = os.path.join(workdir, "history.db")
+    port = _free_port()
+    manual = _seed(nodes, args.interval_ms, args.manual_share, port, args.history, args.adc_nodes)
+    if not args.cold:
+        # Key generation and the address space cache only happen on first boot;
+        # keep them out of the startup figure
+        SecurityManager().generate_self_signed_cert(ip_addresses=["127.0.0.1"])
+        iserver = CachedAddressSpaceServer()
+        await iserver.load_standard_address_space()
+        iserver.close()
+    process = psutil.Process()
+    rss_before = process.memory_info().rss
+
+    server = OPCUAServer()
+    started = time.perf_counter()
+    task = asyncio.create_task(server.start())
+    while not server.is_running:
+        if task.done():
+            raise RuntimeError("server failed to start")
+        await asyncio.sleep(0.002)
+    setup_s = time.perf_counter() - started
+    while server.diagnostics.total_cycles == 0:
+        await asyncio.sleep(0.002)
+    first_cycle_s = time.perf_counter() - started
+
+    try:
+        await asyncio.sleep(args.warmup)
+        rss_after = process.memory_info().rss
+        server.diagnostics.reset()
+        started = time.perf_counter()
+        await asyncio.sleep(args.duration)
+        idle = _cycle_stats(server, time.perf_counter() - started)
+
+        subscriptions = None
+        if args.clients:
+            subscriptions = await _measure_subscriptions(
+                server, args, workdir, [f"Bench{i}" for i in range(manual, nodes)])
+    finally:
+        server.is_running = False
+        await task
+
+    return {
+        "nodes": nodes,
+        "simulation_nodes": nodes - manual,
+        "manual_nodes": manual,
+        "adc_nodes": args.adc_nodes,
+        "interval_ms": args.interval_ms,
+        "history": args.history,
+        "cold": args.cold,
+        "startup": {"setup_s": round(setup_s, 3), "first_cycle_s": round(first_cycle_s, 3),
+                    "phases_s": server.startup_timings},
+        "steady_state": idle,
+        "rss": {
+            "before_bytes": rss_before,
+            "after_bytes": rss_after,
+            "per_node_bytes": round((rss_after - rss_before) / nodes) if nodes else 0,
+        },
+        "subscriptions": subscriptions,
+    }
+
+
+def _slope(points):
+    """Least-squares slope of (nodes, rss) pairs, the marginal memory per node."""
+    n = len(points)
+    mean_x = sum(x for x, _ in points) / n
+    mean_y = sum(y for _, y in points) / n
+    var = sum((x - mean_x) ** 2 for x, _ in points)
+    if not var:
+        return None
+    return round(sum((x - mean_x) * (y - mean_y) for x, y in points) / var)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--nodes", type=int, nargs="+", default=[100, 500, 2000])
+    parser.add_argument("--interval-ms", type=int, default=100)
+    parser.add_argument("--manual-share", type=float, default=0.1, help="fraction of nodes backed by ManualSource")
+    parser.add_argument("--clients", type=int, default=2, help="local asyncua clients subscribing to every simulated node")
+    parser.add_argument("--warmup", type=float, default=1.0)
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--adc-nodes", type=int, default=0,
+                        help="extra ADS1115/MCP3008 nodes on simulated buses (see fake_hardware)")
+    parser.add_argument("--cold", action="store_true", help="include first-boot certificate and cache creation in startup")
+    parser.add_argument("--history", action="store_true", help="keep the disk-backed history store enabled")
+    parser.add_argument("--output", help="write the JSON report to this file")
+    parser.add_argument("--single", type=int, help=argparse.SUPPRESS) # Child process: one node count
+    args = parser.parse_args()
+
+    if args.single is not None:
+        logging.disable(logging.WARNING)
+        print(json.dumps(asyncio.run(_run_single(args, args.single))))
+        return
+
+    argv = ["--interval-ms", str(args.interval_ms), "--manual-share", str(args.manual_share),
+            "--clients", str(args.clients), "--adc-nodes", str(args.adc_nodes), "--warmup", str(args.warmup), "--duration", str(args.duration)]
+    if args.history:
+        argv.append("--history")
+    if args.cold:
+        argv.append("--cold")
+    runs = []
+    for nodes in args.nodes:
+        cmd = [sys.executable, os.path.abspath(__file__), *argv, "--single", str(nodes)]
+        result = subprocess.run(cmd, capture_output=True, text=True, check=True)
+        runs.append(json.loads(result.stdout.strip().splitlines()[-1]))
+
+    report = {
+        "benchmark": "opcua_server",
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "runs": runs,
+        "rss_slope_bytes_per_node": _slope([(r["nodes"], r["rss"]["after_bytes"]) for r in runs])
+        if len(runs) > 1 else None,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+import sys
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from backend.opcua_server import hardware
+from backend.opcua_server.hardware import (
+    ADS1115Scanner, ADS1115_MODE_CONTINUOUS, ADS1115_MODE_SINGLE, MCP3xxxScanner,
+)
+
+
+class FakeADS:
+    def __init__(self):
+        self.mode = ADS1115_MODE_SINGLE
+        self.data_rate = 128
+        self.gain = 1
+        self.conversions = []
+
+
+class FakeAnalogIn:
+    def __init__(self, device, pin):
+        self.device, self.pin = device, pin
+
+    @property
+    def voltage(self):
+        self.device.conversions.append(self.pin)
+        return self.pin / 10
+
+
+@pytest.fixture
+def scanner(monkeypatch):
+    monkeypatch.setattr(hardware, "AnalogIn", FakeAnalogIn)
+    monkeypatch.setattr(hardware, "ADS", SimpleNamespace(P0=0, P1=1, P2=2, P3=3))
+    return ADS1115Scanner(FakeADS(), 0x48, threading.Lock())
+
+
+def test_one_scan_per_cycle_serves_all_channels(scanner):
+    for channel in (0, 1, 2):
+        scanner.add_channel(channel)
+
+    assert [scanner.read_channel(c) for c in (0, 1, 2)] == [0.0, 0.1, 0.2]
+    assert scanner.scans == 1
+    assert scanner.device.conversions == [0, 1, 2]
+
+    # Re-reading a consumed channel starts the next cycle; unread values are kept
+    scanner.device.conversions.clear()
+    scanner.read_channel(0)
+    scanner.read_channel(0)
+    assert scanner.scans == 3
+    assert scanner.device.conversions == [0, 1, 2, 0]
+
+
+def test_unread_sibling_values_expire_after_max_age(scanner, monkeypatch):
+    clock = [100.0]
+    monkeypatch.setattr(hardware.time, "monotonic", lambda: clock[0])
+    scanner.max_age = 0.05
+    scanner.add_channel(0)
+    scanner.add_channel(1)
+
+    scanner.read_channel(0)
+    clock[0] += 0.2
+    scanner.device.conversions.clear()
+    assert scanner.read_channel(1) == 0.1
+    assert scanner.device.conversions == [0, 1] # Converted again, not served from the old scan
+    assert scanner.scans == 2
+
+
+def test_channel_removed_during_a_scan(scanner, monkeypatch):
+    for channel in (0, 1, 2):
+        scanner.add_channel(channel)
+    convert = scanner._convert
+
+    def convert_while_node_is_deleted(channels):
+        # The event loop deletes a node while the bus worker is converting
+        scanner.remove_channel(1)
+        return convert(channels)
+
+    monkeypatch.setattr(scanner, "_convert", convert_while_node_is_deleted)
+    assert scanner.read_channel(0) == 0.0
+    assert scanner.read_channel(1) is None
+    assert scanner.read_channel(2) == 0.2
+    assert scanner.get_stats()["channels"] == [0, 2]
+
+
+def test_oversampled_channels_are_averaged_in_one_pass(scanner):
+    scanner.add_channel(1)
+    scanner.add_channel(2)
+    scanner.set_oversample(2, 4)
+
+    assert scanner.read_channel(2) == pytest.approx(0.2)
+    assert scanner.device.conversions == [1, 2, 2, 2, 2]
+    assert scanner.scans == 1
+
+
+def test_continuous_mode_only_with_a_single_channel(scanner):
+    scanner.add_channel(0)
+    scanner.configure(data_rate=860, continuous=True)
+    assert scanner.device.mode == ADS1115_MODE_CONTINUOUS
+    assert scanner.device.data_rate == 860
+
+    scanner.add_channel(3)
+    assert scanner.device.mode == ADS1115_MODE_SINGLE
+    scanner.remove_channel(3)
+    assert scanner.device.mode == ADS1115_MODE_CONTINUOUS
+
+
+class FakeSPI:
+    """Answers MCP3208 frames with code 4095 - channel and records bus sessions."""
+
+    def __init__(self):
+        self.sessions = 0
+        self.frames = []
+
+    def try_lock(self):
+        self.sessions += 1
+        return True
+
+    def unlock(self):
+        pass
+
+    def configure(self, baudrate):
+        pass
+
+    def write_readinto(self, out_buf, in_buf):
+        self.frames.append(bytes(out_buf))
+        channel = ((out_buf[0] & 0x01) << 2) | (out_buf[1] >> 6)
+        code = 4095 - channel
+        in_buf[1], in_buf[2] = 0xE0 | (code >> 8), code & 0xFF # undefined high bits set
+
+
+def test_mcp3208_burst_reads_full_12_bits_in_one_session():
+    spi = FakeSPI()
+    scanner = MCP3xxxScanner(spi, SimpleNamespace(value=True), "mcp3208", threading.Lock(), ref_voltage=4.095)
+    for channel in (0, 5, 7):
+        scanner.add_channel(channel)
+
+    values = [scanner.read_channel(c) for c in (0, 5, 7)]
+    assert values == pytest.approx([4.095, 4.090, 4.088])
+    assert spi.sessions == 1
+    assert spi.frames == [bytes((0x06, 0x00, 0)), bytes((0x07, 0x40, 0)), bytes((0x07, 0xC0, 0))]
+
+
+def test_i2c_bus_numbers_open_their_own_bus(monkeypatch):
+    opened = []
+    monkeypatch.setattr(hardware, "board", SimpleNamespace(SCL="SCL", SDA="SDA"))
+    monkeypatch.setattr(hardware, "busio", SimpleNamespace(I2C=lambda scl, sda: opened.append((scl, sda)) or "pins"))
+    monkeypatch.setitem(sys.modules, "adafruit_extended_bus", None) # Not installed
+    registry = hardware.HardwareRegistry()
+
+    assert registry.i2c() == "pins" and opened == [("SCL", "SDA")]
+    with pytest.raises(ValueError):
+        registry.i2c(3) # Never a second handle on the header pins under another lock
+
+    monkeypatch.setitem(sys.modules, "adafruit_extended_bus",
+                        SimpleNamespace(ExtendedI2C=lambda bus: f"/dev/i2c-{bus}"))
+    assert registry.i2c(3) == "/dev/i2c-3"
+    assert opened == [("SCL", "SDA")]
@@ -0,0 +1,40 @@
+import random
+import statistics
+
+import pytest
+
+from backend.opcua_server.conditioning import ConditioningPipeline, MedianFilter, MovingAverageFilter
+
+
+def test_median_rejects_spikes_and_moving_average_slides():
+    median = MedianFilter(3)
+    assert [median.process(x) for x in (1.0, 100.0, 2.0, 3.0, 4.0)] == [1.0, 50.5, 2.0, 3.0, 3.0]
+
+    average = MovingAverageFilter(3)
+    assert [average.process(x) for x in (3.0, 6.0, 9.0, 12.0)] == [3.0, 4.5, 6.0, 9.0]
+
+
+def test_median_matches_a_full_sort_over_the_window():
+    rng = random.Random(3)
+    for window in (1, 2, 5, 8):
+        median = MedianFilter(window)
+        samples = [float(rng.randint(0, 9)) for _ in range(200)] # Many duplicates
+        for i, x in enumerate(samples):
+            assert median.process(x) == statistics.median(samples[max(0, i + 1 - window):i + 1])
+        median.reset()
+        assert median.process(7.0) == 7.0
+
+
+def test_pipeline_order_passthrough_and_oversample():
+    pipeline = ConditioningPipeline([
+        {"type": "oversample", "samples": 8},
+        {"type": "median", "window": 3},
+        {"type": "ema", "alpha": 0.5},
+    ])
+    assert pipeline.oversample == 8
+    assert pipeline.process(None) is None
+    assert pipeline.process(True) is True
+    assert [pipeline.process(x) for x in (2.0, 2.0, 50.0, 4.0)] == pytest.approx([2.0, 2.0, 2.0, 3.0])
+
+    with pytest.raises(ValueError):
+        ConditioningPipeline([{"type": "kalman"}])
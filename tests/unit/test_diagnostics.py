@@ -0,0 +1,41 @@
+import threading
+
+from backend.opcua_server.diagnostics import PollDiagnostics, StackSampler
+
+
+def test_cycles_keep_top_sources_in_a_bounded_buffer():
+    diag = PollDiagnostics(capacity=3, top_n=2)
+    for cycle in range(5):
+        diag.start_cycle()
+        for i, seconds in enumerate((0.001, 0.004, 0.002, 0.003)):
+            diag.record_read(f"N{i}", seconds)
+        diag.end_cycle(jitter=0.001 * cycle, duration=0.01, nodes=4, overrun=cycle == 4)
+
+    report = diag.get_report(recent=2)
+    assert report["cycles"] == 5 and report["window"] == 3
+    assert report["overruns"] == 1
+    assert report["jitter"]["max_ms"] == 4.0
+    assert [s["source"] for s in report["recent"][-1]["slowest"]] == ["N1", "N3"]
+    assert report["slowest_sources"][0] == {"source": "N1", "times_in_top": 3, "avg_ms": 4.0, "max_ms": 4.0}
+    assert len(report["recent"]) == 2
+
+
+def test_sampler_folds_stacks_from_the_marker():
+    stop = threading.Event()
+
+    def poll_nodes():
+        busy_read()
+
+    def busy_read():
+        while not stop.is_set():
+            sum(range(1000))
+
+    worker = threading.Thread(target=poll_nodes)
+    worker.start()
+    try:
+        result = StackSampler(worker.ident).run(0.2, 0.005)
+    finally:
+        stop.set()
+        worker.join()
+    assert result["acquisition"] > 0
+    assert result["stacks"][0]["stack"].startswith("test_diagnostics.py:poll_nodes;test_diagnostics.py:busy_read")
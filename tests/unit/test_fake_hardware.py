@@ -0,0 +1,51 @@
+import threading
+
+import pytest
+
+from backend.opcua_server import fake_hardware
+from backend.opcua_server.fake_hardware import make_waveform
+from backend.opcua_server.hardware import MCP3xxxScanner
+
+
+@pytest.fixture
+def bench():
+    yield fake_hardware.bench
+    fake_hardware.bench.configure({})
+
+
+def test_waveforms():
+    square = make_waveform({"type": "square", "min": 0, "max": 1, "period": 2.0, "duty": 0.25})
+    assert [square(t) for t in (0.0, 0.4, 0.6, 1.9, 2.1)] == [1, 1, 0, 0, 1]
+
+    script = make_waveform({"type": "script", "points": [[0, 1.0], [1, 2.0], [2, 2.0]], "interpolate": True})
+    assert script(0.5) == pytest.approx(1.5)
+    assert script(2.5) == pytest.approx(1.5) # Loops over the script span
+    assert make_waveform(0.7)(123) == 0.7
+
+
+def test_mcp3208_answers_command_frames(bench):
+    bench.configure({"buses": {"spi": {"latency_ms": 0, "jitter_ms": 0}},
+                     "devices": {"mcp3208@cs8": {"channels": {"2": 1.65, "5": 3.3}}}})
+    cs = fake_hardware.digitalio.DigitalInOut(fake_hardware.board.D8)
+    cs.switch_to_output(value=True)
+    scanner = MCP3xxxScanner(fake_hardware.busio.SPI(), cs, "mcp3208", threading.Lock(), cs_pin=8)
+    scanner.add_channel(2)
+    scanner.add_channel(5)
+
+    assert scanner.read_channel(2) == pytest.approx(1.65, abs=scanner._lsb)
+    assert scanner.read_channel(5) == pytest.approx(3.3)
+    assert bench.get_stats() == [{"device": "mcp3208@cs8", "transactions": 2, "errors": 0}]
+
+
+def test_injected_faults(bench):
+    bench.configure({"devices": {"ads1115@0x49": {"offline": True},
+                                 "ads1115@0x48": {"latency_ms": 0, "faults": [[0, 60]]}}})
+    with pytest.raises(ValueError):
+        fake_hardware.ads1115.ADS1115(fake_hardware.busio.I2C(), address=0x49)
+
+    device = fake_hardware.ads1115.ADS1115(fake_hardware.busio.I2C(), address=0x48, data_rate=860)
+    with pytest.raises(OSError):
+        fake_hardware.AnalogIn(device, fake_hardware.ads1115.P0).voltage
+
+    bench.configure({"devices": {"ads1115@0x48": {"latency_ms": 0, "channels": {"0": 1.0}}}})
+    assert fake_hardware.AnalogIn(device, 0).voltage == pytest.approx(1.0, abs=0.000125)
@@ -0,0 +1,66 @@
+import asyncio
+import threading
+
+from backend.opcua_server import data_sources
+from backend.opcua_server.data_sources import GPIOSource
+
+
+class FakeGPIO:
+    IN, OUT, PUD_DOWN, BOTH = "in", "out", "down", "both"
+
+    def __init__(self):
+        self.levels = {}
+        self.callbacks = {}
+
+    def setup(self, pin, direction, pull_up_down=None):
+        self.levels.setdefault(pin, 0)
+
+    def input(self, pin):
+        return self.levels[pin]
+
+    def add_event_detect(self, pin, edge, callback, bouncetime=None):
+        assert pin not in self.callbacks, "Conflicting edge detection"
+        self.callbacks[pin] = callback
+
+    def remove_event_detect(self, pin):
+        del self.callbacks[pin]
+
+    def edge(self, pin, level):
+        self.levels[pin] = level
+        self.callbacks[pin](pin)
+
+
+def test_edges_are_counted_and_pushed_to_the_loop(monkeypatch):
+    gpio = FakeGPIO()
+    monkeypatch.setattr(data_sources, "GPIO", gpio, raising=False)
+    monkeypatch.setattr(data_sources, "HAS_GPIO", True)
+
+    async def scenario():
+        source = GPIOSource({"pin": 17, "event_driven": True, "debounce_ms": 5})
+        assert source.event_driven
+        pushed = []
+        source.set_listener(pushed.append)
+
+        def pulses():
+            for _ in range(3):
+                gpio.edge(17, 1)
+                gpio.edge(17, 0)
+
+        thread = threading.Thread(target=pulses)
+        thread.start()
+        thread.join()
+        await asyncio.sleep(0)
+
+        stats = source.get_edge_stats()
+        assert (stats["rising_edges"], stats["falling_edges"]) == (3, 3)
+        assert pushed == [1, 0, 1, 0, 1, 0]
+        assert await source.read() == 0
+
+        # A rebuilt source takes the pin over; closing the old one leaves it alone
+        replacement = GPIOSource({"pin": 17, "event_driven": True})
+        source.close()
+        assert gpio.callbacks[17] == replacement._on_edge
+        replacement.close()
+        assert 17 not in gpio.callbacks
+
+    asyncio.run(scenario())
@@ -0,0 +1,36 @@
+import asyncio
+
+from backend.monitoring.health_sampler import HealthSampler
+
+
+class FakeMonitor:
+    def __init__(self):
+        self.calls = 0
+
+    def get_health_metrics(self):
+        self.calls += 1
+        return {"cpu_percent": float(self.calls)}
+
+
+def test_one_sample_per_tick_shared_by_all_subscribers():
+    async def scenario():
+        monitor = FakeMonitor()
+        sampler = HealthSampler(monitor, interval=0.2)
+        queues = [sampler.subscribe() for _ in range(10)]
+        frames = [await q.get() for q in queues]
+        assert all(frame is frames[0] for frame in frames)
+
+        await asyncio.sleep(0.3)
+        # Ticks, not viewers, drive sampling
+        assert monitor.calls == 2
+        # REST readers reuse the fresh sample
+        calls = monitor.calls
+        assert sampler.current()["cpu_percent"] == float(calls)
+        assert monitor.calls == calls
+
+        for q in queues:
+            sampler.unsubscribe(q)
+        await asyncio.sleep(0.3)
+        assert monitor.calls <= calls + 1
+
+    asyncio.run(scenario())
@@ -0,0 +1,42 @@
+import json
+
+from backend.opcua_server.scaling import ScalingEngine
+from backend.opcua_server.snapshot import LiveValues
+
+
+class FakeSource:
+    def __init__(self, **config):
+        self.config = config
+
+
+def test_snapshot_advances_only_on_change():
+    live = LiveValues("abc")
+    scaling = ScalingEngine()
+    live.set_node("T1", FakeSource(name="Temp", type="ads1115", channel=2), scaling)
+    live.set_node("S1", FakeSource(name="Switch", type="gpio", pin=17), scaling)
+    first = live.snapshot
+
+    assert live.update(10.0, ["T1", "S1"], [1.5, True], [1.5, True], [None, None])
+    snap = live.snapshot
+    assert snap.seq == first.seq + 1 and snap.etag == f'"abc-{snap.seq}"'
+    rows = json.loads(snap.body())
+    assert rows[0] == {
+        "node_id": "T1", "name": "Temp", "type": "analog", "pin": None, "channel": 2,
+        "adc_device": "ads1115", "scale_enabled": False, "scale_unit": None,
+        "value": 1.5, "raw_value": 1.5, "error": None, "status": "good", "timestamp": 10.0,
+    }
+
+    # Same readings: no new snapshot, the old one is untouched
+    assert not live.update(11.0, ["T1", "S1"], [1.5, True], [1.5, True], [None, None])
+    assert live.snapshot is snap
+
+    assert live.update(12.0, ["T1"], [float("nan")], [float("nan")], ["bus timeout"])
+    rows = json.loads(live.snapshot.body())
+    assert rows[0]["value"] is None and rows[0]["status"] == "bad" and rows[0]["timestamp"] == 12.0
+    assert rows[1]["timestamp"] == 10.0
+    assert json.loads(snap.body())[0]["value"] == 1.5
+
+    live.remove("S1")
+    assert [row["node_id"] for row in live.snapshot.rows] == ["T1"]
+    live.clear()
+    assert live.snapshot.rows == () and live.snapshot.seq > snap.seq
@@ -0,0 +1,60 @@
+import json
+
+import pytest
+
+from backend.api.live_stream import StreamClient, _JsonFrames, _MsgpackFrames, _RowCache
+from backend.opcua_server.scaling import ScalingEngine
+from backend.opcua_server.snapshot import LiveValues
+
+
+class FakeSource:
+    def __init__(self, **config):
+        self.config = config
+
+
+def make_live():
+    live = LiveValues()
+    scaling = ScalingEngine()
+    for node_id in ("A", "B", "C"):
+        live.set_node(node_id, FakeSource(name=node_id, type="simulation"), scaling)
+    live.update(1.0, ["A", "B", "C"], [1, 2, 3], [1, 2, 3], [None] * 3)
+    return live
+
+
+def test_frames_carry_only_changed_rows():
+    live = make_live()
+    cache = _RowCache(_JsonFrames())
+    client = StreamClient(nodes=["A", "B"])
+
+    first = json.loads(client.next_frame(live.snapshot, cache))
+    assert first["type"] == "full"
+    assert [row["node_id"] for row in first["changed"]] == ["A", "B"]
+    assert client.next_frame(live.snapshot, cache) is None
+
+    # A change outside the subscription produces no frame
+    live.update(2.0, ["C"], [30], [30], [None])
+    assert client.next_frame(live.snapshot, cache) is None
+
+    live.update(3.0, ["A", "C"], [10, 31], [10, 31], [None, None])
+    live.remove("B")
+    delta = json.loads(client.next_frame(live.snapshot, cache))
+    assert delta["type"] == "delta" and delta["seq"] == live.snapshot.seq
+    assert [row["value"] for row in delta["changed"]] == [10]
+    assert delta["removed"] == ["B"]
+
+    # Changing the filter starts over with a full frame
+    client.set_filter(None, max_hz=1000)
+    assert client.min_interval == 1 / 20
+    full = json.loads(client.next_frame(live.snapshot, cache))
+    assert full["type"] == "full" and [row["node_id"] for row in full["changed"]] == ["A", "C"]
+
+
+def test_msgpack_frames_match_json_and_share_encoded_rows():
+    msgpack = pytest.importorskip("msgpack")
+    live = make_live()
+    packed, plain = _RowCache(_MsgpackFrames()), _RowCache(_JsonFrames())
+    row = live.snapshot.nodes["A"]
+    assert packed.encoded("A", row) is packed.encoded("A", row)
+
+    frame = msgpack.unpackb(StreamClient().next_frame(live.snapshot, packed))
+    assert frame == json.loads(StreamClient().next_frame(live.snapshot, plain))
@@ -0,0 +1,60 @@
+import gc
+from types import SimpleNamespace
+
+from asyncua import ua
+from asyncua.server.internal_subscription import InternalSubscription
+
+from backend.monitoring import opcua_metrics
+from backend.monitoring.metrics import MetricsRegistry
+from backend.monitoring.opcua_metrics import OPCUAMetrics, attach_metrics, detach_metrics
+
+
+def test_registry_renders_prometheus_text():
+    registry = MetricsRegistry()
+    cycles = registry.histogram("poll_cycle_seconds", "Cycle time", buckets=(0.01, 0.1))
+    errors = registry.counter("read_errors_total", "Read errors", label="source")
+    registry.gauge("sessions", "Sessions", callback=lambda: 3)
+
+    for value in (0.005, 0.05, 0.5):
+        cycles.observe(value)
+    errors.labels("ads1115").inc()
+    errors.labels('we"ird').inc(2)
+
+    lines = registry.render().splitlines()
+    assert "# TYPE poll_cycle_seconds histogram" in lines
+    assert 'poll_cycle_seconds_bucket{le="0.01"} 1' in lines
+    assert 'poll_cycle_seconds_bucket{le="0.1"} 2' in lines
+    assert 'poll_cycle_seconds_bucket{le="+Inf"} 3' in lines
+    assert "poll_cycle_seconds_count 3" in lines
+    assert 'read_errors_total{source="ads1115"} 1' in lines
+    assert 'read_errors_total{source="we\\"ird"} 2' in lines
+    assert "sessions 3" in lines
+
+
+class FakeAddressSpace:
+    pass
+
+
+def test_each_server_counts_only_its_own_sessions():
+    first, second = SimpleNamespace(aspace=FakeAddressSpace()), SimpleNamespace(aspace=FakeAddressSpace())
+    first_metrics, second_metrics = OPCUAMetrics(), OPCUAMetrics()
+    attach_metrics(first, first_metrics)
+    attach_metrics(second, second_metrics)
+
+    opcua_metrics._record(SimpleNamespace(external=True, iserver=first), "read", True)
+    assert (first_metrics.read_requests, second_metrics.read_requests) == (1, 0)
+
+    # Publish responses of the server's subscriptions count as its notifications
+    subscription = InternalSubscription(ua.CreateSubscriptionResult(), first.aspace, None, ua.NodeId())
+    subscription._triggered_datachanges = {1: [object(), object()]}
+    subscription._pop_triggered_datachanges(ua.PublishResult())
+    assert (first_metrics.notifications.value, second_metrics.notifications.value) == (2, 0)
+
+    detach_metrics(first)
+    opcua_metrics._record(SimpleNamespace(external=True, iserver=first), "read", True)
+    assert first_metrics.read_requests == 1
+
+    # A server that is dropped without stopping releases its metrics too
+    del second
+    gc.collect()
+    assert not any(m is second_metrics for m in opcua_metrics._sinks.values())
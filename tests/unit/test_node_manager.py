@@ -0,0 +1,37 @@
+import asyncio
+
+from asyncua import Server, ua
+
+from backend.opcua_server.node_manager import NodeManager
+
+
+def test_bulk_add_links_nodes_to_their_folder():
+    async def scenario():
+        server = Server()
+        await server.init()
+        idx = await server.register_namespace("http://raspberry.opcua.server")
+        manager = NodeManager(server, idx)
+        folder = await server.nodes.objects.add_folder(idx, "Sensors")
+        configs = [{"name": f"N{i}", "node_id": f"N{i}", "data_type": "Float", "initial_value": "1.5"}
+                   for i in range(3)]
+        configs.append({"name": "Dup", "node_id": "N0"})
+        configs.append({"name": "W", "node_id": "W", "data_type": "Boolean",
+                        "access_level": "CurrentReadWrite", "initial_value": "true"})
+
+        async def on_write(node_id, value):
+            pass
+
+        results = await manager.add_nodes(folder, configs, [on_write] * len(configs))
+        assert isinstance(results[3], ua.UaStatusCodeError)
+        assert set(manager.nodes) == {"N0", "N1", "N2", "W"}
+
+        children = await folder.get_children()
+        assert [c.nodeid for c in children] == [results[i].nodeid for i in (0, 1, 2, 4)]
+        assert (await results[1].get_parent()).nodeid == folder.nodeid
+        value = await results[2].read_data_value()
+        assert value.Value.Value == 1.5 and value.SourceTimestamp is not None
+        assert ua.AccessLevel.CurrentWrite in await results[4].get_access_level()
+        assert ua.AccessLevel.CurrentWrite not in await results[0].get_access_level()
+        assert await results[4].read_value() is True
+
+    asyncio.run(scenario())
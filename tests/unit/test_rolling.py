@@ -0,0 +1,38 @@
+from backend.monitoring.rolling import RateWindows, RollingCounter
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_rolling_counter_expires_old_buckets():
+    clock = Clock()
+    counter = RollingCounter(60.0, 60, clock)
+    for _ in range(100): # More than the old deque(maxlen=60) could hold
+        counter.add()
+    assert counter.count() == 100
+
+    clock.now += 30
+    counter.add(5)
+    assert counter.count() == 105
+    clock.now += 31 # The first 100 are now older than a minute
+    assert counter.count() == 5
+    clock.now += 3600 # Long idle: one pass over the ring
+    assert counter.count() == 0
+    assert counter.rate() == 0.0
+
+
+def test_rate_windows_report_each_window():
+    clock = Clock()
+    rates = RateWindows(clock=clock)
+    for _ in range(10):
+        rates.add()
+        clock.now += 0.5
+    # Last event at +4.5 s, now +5.0 s: only it falls in the 1 s window
+    assert rates.snapshot() == {"1s": 1, "1m": 10, "15m": 10, "total": 10}
+    clock.now += 120
+    assert rates.count("1m") == 0 and rates.count("15m") == 10
@@ -0,0 +1,100 @@
+import asyncio
+import time
+
+import numpy as np
+from asyncua import ua
+
+from backend.opcua_server.history import SQLiteHistoryStore
+from backend.opcua_server.rollups import RollupEngine, merge_rows, pick_tier, rows_from_samples
+
+
+def test_rollups_close_minutes_into_hours_incrementally():
+    engine = RollupEngine()
+    base = 7200.0 # aligned to an hour
+    for i in range(180): # three minutes at 1 Hz
+        engine.add("Temp", base + i, float(i))
+    engine.add("Temp", base + 30, float("nan")) # missing readings are skipped
+
+    closed = engine.drain()
+    assert [(tier, row[0]) for tier, _, row in closed] == [(60, base), (60, base + 60)]
+    _, _, first = closed[0]
+    assert first[1:] == [0.0, 59.0, sum(range(60)), 60, 0.0, 59.0]
+
+    # The open hour already holds the two closed minutes plus the open one
+    (hour,) = engine.open_rows("Temp", 3600)
+    assert hour[0] == base
+    assert hour[4] == 180 and hour[2] == 179.0 and hour[6] == 179.0
+
+    rows = engine.close_all()
+    assert [(tier, row[0]) for tier, _, row in rows] == [(60, base + 120), (3600, base), (86400, 0.0)]
+    assert rows[-1][2][4] == 180
+
+
+def test_tier_choice_and_bucket_merge():
+    assert pick_tier(10) is None
+    assert pick_tier(60) == 60
+    assert pick_tier(7200) == 3600
+    assert pick_tier(10 * 86400) == 86400
+
+    ts = np.arange(0.0, 10.0)
+    values = ts.copy()
+    values[3] = np.nan
+    points = merge_rows(rows_from_samples(ts, values), 0.0, 5.0, buckets=2)
+    assert [p["t"] for p in points] == [0.0, 5.0]
+    assert points[0]["count"] == 4 and points[0]["avg"] == (0 + 1 + 2 + 4) / 4
+    assert points[1]["min"] == 5.0 and points[1]["max"] == 9.0 and points[1]["last"] == 9.0
+
+
+def test_store_aggregates_from_rollups_and_open_buckets(tmp_path):
+    async def scenario():
+        store = SQLiteHistoryStore(path=str(tmp_path / "history.db"))
+        await store.init()
+        store.register("Temp", ua.VariantType.Float)
+        base = time.time() - 3 * 3600
+        base -= base % 3600
+        for i in range(0, 3 * 3600, 10):
+            store.append(base + i, {"Temp": 1.0 if i < 3600 else 3.0})
+        await store.flush()
+
+        resolution, points = await store.aggregate("Temp", base, base + 3 * 3600, 3600)
+        assert resolution == "1h"
+        assert [p["avg"] for p in points] == [1.0, 3.0, 3.0]
+        assert sum(p["count"] for p in points) == 3 * 360
+
+        resolution, points = await store.aggregate("Temp", base, base + 120, 1)
+        assert resolution == "raw"
+        assert len(points) == 13 # one per 10 s sample, both ends inclusive
+        await store.stop()
+
+    asyncio.run(scenario())
+
+
+def test_closed_buckets_are_queryable_and_survive_a_failed_flush(tmp_path):
+    async def scenario():
+        store = SQLiteHistoryStore(path=str(tmp_path / "history.db"))
+        await store.init()
+        base = time.time() - 3600
+        base -= base % 60
+        for i in range(0, 600, 10):
+            store.append(base + i, {"Temp": 2.0})
+
+        async def counted():
+            _, points = await store.aggregate("Temp", base, base + 600, 600)
+            return sum(p["count"] for p in points)
+
+        assert await counted() == 60 # Nine closed minutes not flushed yet, plus the open one
+
+        write = store._write_chunks
+        def failing_write(batch, closed=()):
+            raise OSError("disk full")
+        store._write_chunks = failing_write
+        await store.flush()
+        assert await counted() == 60 # Kept for the next flush
+
+        store._write_chunks = write
+        await store.flush()
+        assert store._rollup_backlog == []
+        assert await counted() == 60 # Written once, not merged twice
+        await store.stop()
+
+    asyncio.run(scenario())
@@ -0,0 +1,57 @@
+from types import SimpleNamespace
+
+import pytest
+
+from backend.opcua_server.scaling import ScalingEngine
+
+
+def make_node(**overrides):
+    fields = dict(
+        scale_enabled=True, scale_min="0", scale_max="100", scale_unit="bar",
+        voltage_min="0", voltage_max="3.3", scale_clamp=False, scale_table=None,
+    )
+    fields.update(overrides)
+    return SimpleNamespace(**fields)
+
+
+def test_linear_scaling_matches_formula_and_passes_through_raw():
+    engine = ScalingEngine()
+    engine.set_node("p1", make_node(scale_min="10", scale_max="110", voltage_min="0.5", voltage_max="2.5"))
+    engine.set_node("gpio", make_node(scale_enabled=False))
+
+    out = engine.apply(["p1", "gpio", "p1", "unknown"], [1.5, 1, None, 7])
+    assert out[0] == pytest.approx(60.0)
+    assert out[1] == 1 and isinstance(out[1], int)
+    assert out[2] is None
+    assert out[3] == 7
+    assert engine.get_unit("p1") == "bar"
+
+
+def test_clamping_and_equal_voltage_range():
+    engine = ScalingEngine()
+    engine.set_node("c", make_node(scale_clamp=True))
+    engine.set_node("flat", make_node(voltage_min="1", voltage_max="1", scale_min="5"))
+
+    assert engine.apply(["c", "c", "flat"], [-1.0, 5.0, 2.0]) == [0.0, 100.0, 5.0]
+
+
+def test_piecewise_table_interpolates_and_extrapolates():
+    engine = ScalingEngine()
+    table = [[2.0, 50.0], [0.0, 0.0], [1.0, 10.0]]
+    engine.set_node("t", make_node(scale_table=table))
+    engine.set_node("tc", make_node(scale_table=table, scale_clamp=True))
+
+    assert engine.apply(["t", "t", "t"], [0.5, 1.5, 3.0]) == pytest.approx([5.0, 30.0, 90.0])
+    assert engine.scale("tc", 3.0) == pytest.approx(50.0)
+
+
+def test_slots_are_reused_and_grown():
+    engine = ScalingEngine(capacity=2)
+    for i in range(5):
+        engine.set_node(f"n{i}", make_node())
+    engine.remove("n0")
+    engine.set_node("n5", make_node(scale_max="200"))
+
+    out = engine.apply([f"n{i}" for i in range(1, 6)], [3.3] * 5)
+    assert out == pytest.approx([100.0, 100.0, 100.0, 100.0, 200.0])
+    assert "n0" not in engine
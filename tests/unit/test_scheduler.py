@@ -0,0 +1,128 @@
+import asyncio
+
+from backend.opcua_server.config_bus import SettingsChanged
+from backend.opcua_server.scheduler import AcquisitionScheduler
+from backend.opcua_server.server import OPCUAServer
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_nodes_run_at_their_own_interval():
+    clock = FakeClock()
+    sched = AcquisitionScheduler(clock=clock)
+    sched.add("fast", 50)
+    sched.add("slow", 1000)
+
+    dispatched = {"fast": 0, "slow": 0}
+    for _ in range(200):  # 2 s in 10 ms steps
+        for node_id in sched.pop_due():
+            dispatched[node_id] += 1
+        clock.now += 0.01
+
+    assert dispatched["fast"] == 40
+    assert dispatched["slow"] == 2
+    assert abs(sched.get_stats("fast")["achieved_hz"] - 20.0) < 0.5
+
+
+def test_deadlines_do_not_drift_and_overruns_are_skipped():
+    clock = FakeClock()
+    sched = AcquisitionScheduler(clock=clock)
+    sched.add("n1", 100)
+    start = clock.now
+
+    assert sched.pop_due() == ["n1"]
+    # Dispatched 30 ms late: the next deadline stays on the original grid
+    clock.now = start + 0.13
+    assert sched.pop_due() == ["n1"]
+    assert abs(sched.time_until_next() - 0.07) < 1e-9
+    assert abs(sched.get_stats("n1")["lateness_ms"] - 30.0) < 1e-6
+
+    # Stall for 3.5 periods: missed deadlines are counted, not replayed
+    clock.now = start + 0.55
+    assert sched.pop_due() == ["n1"]
+    assert sched.pop_due() == []
+    assert sched.get_stats("n1")["missed_deadlines"] == 3
+    assert abs(sched.time_until_next() - 0.05) < 1e-9
+
+
+def test_remove_and_reschedule():
+    clock = FakeClock()
+    sched = AcquisitionScheduler(clock=clock)
+    sched.add("n1", 100)
+    sched.remove("n1")
+    assert sched.pop_due() == []
+    assert sched.time_until_next() is None
+
+    sched.add("n1", 100)
+    sched.add("n1", 500)  # update replaces the previous entry
+    assert sched.pop_due() == ["n1"]
+    clock.now += 0.1
+    assert sched.pop_due() == []
+    assert sched.get_stats("n1")["interval_ms"] == 500.0
+
+
+def test_default_interval_change_reschedules_nodes_without_their_own():
+    clock = FakeClock()
+    sched = AcquisitionScheduler(default_interval_ms=1000, clock=clock)
+    sched.add("default")
+    sched.add("own", 250)
+
+    sched.set_default_interval(200)
+    assert sched.get_stats("default")["interval_ms"] == 200.0
+    assert sched.get_stats("own")["interval_ms"] == 250.0
+    sched.add("later")
+    assert sched.get_stats("later")["interval_ms"] == 200.0
+
+
+def test_polling_rate_setting_applies_to_running_nodes():
+    server = OPCUAServer()
+    server.scheduler.add("n1")
+    asyncio.run(server.handle_config_event(SettingsChanged({"polling_rate": "500"})))
+    assert server.scheduler.get_stats("n1")["interval_ms"] == 500.0
+
+
+def test_same_interval_nodes_share_one_deadline():
+    clock = FakeClock()
+    sched = AcquisitionScheduler(clock=clock)
+    for i in range(5):
+        sched.add(f"n{i}", 100)
+        assert sched.pop_due() == [f"n{i}"] # Read once when added...
+        clock.now += 0.0137
+
+    batches = []
+    for _ in range(100):  # 1 s in 10 ms steps
+        clock.now += 0.01
+        due = sched.pop_due()
+        if due:
+            batches.append(sorted(due))
+    # ...then all on the 100 ms grid: one wake-up per period for the whole set
+    assert batches == [[f"n{i}" for i in range(5)]] * 10
+
+
+def test_poll_loop_survives_a_failing_cycle():
+    server = OPCUAServer()
+    server.scheduler.add("n1", 10)
+    cycles = []
+
+    async def read_sources(due):
+        cycles.append(due)
+        if len(cycles) == 1:
+            raise RuntimeError("bad batch")
+        return []
+
+    async def publish_readings(readings):
+        if len(cycles) >= 3:
+            server.is_running = False
+
+    server.read_sources, server.publish_readings = read_sources, publish_readings
+    server.is_running = True
+    asyncio.run(asyncio.wait_for(server.poll_nodes(), 2))
+    assert len(cycles) == 3
+    assert server.metrics.cycle_errors.value == 1
+    assert server.diagnostics.total_cycles == 3
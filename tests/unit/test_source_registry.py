@@ -0,0 +1,39 @@
+import subprocess
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+from backend.opcua_server import data_sources
+from backend.opcua_server.data_sources import ManualSource, create_source
+
+
+def test_importing_sources_loads_no_drivers():
+    code = ("import sys, backend.opcua_server.server; "
+            "print(sorted(m for m in ('board', 'busio', 'RPi', 'adafruit_ads1x15', "
+            "'backend.opcua_server.fake_hardware') if m in sys.modules))")
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == "[]"
+
+
+def test_types_resolve_through_registry_and_entry_points(monkeypatch):
+    monkeypatch.setattr(data_sources, "_source_types", dict(data_sources._source_types))
+    assert isinstance(create_source({"type": "manual", "initial_value": 2.0}), ManualSource)
+
+    class PluginSource(ManualSource):
+        pass
+
+    loaded = []
+    entry_point = SimpleNamespace(value="plugin:PluginSource", load=lambda: loaded.append(1) or PluginSource)
+
+    def entry_points(group, name):
+        assert group == data_sources.ENTRY_POINT_GROUP
+        return [entry_point] if name == "plugin" else []
+
+    monkeypatch.setattr("importlib.metadata.entry_points", entry_points)
+    assert isinstance(create_source({"type": "plugin"}), PluginSource)
+    assert isinstance(create_source({"type": "plugin"}), PluginSource)
+    assert loaded == [1] # Loaded on first use, then served from the registry
+
+    with pytest.raises(ValueError):
+        create_source({"type": "nope"})
@@ -0,0 +1,75 @@
+import asyncio
+import socket
+from types import SimpleNamespace
+
+import pytest
+from asyncua import Server
+
+from backend.opcua_server import server as server_module
+from backend.opcua_server.address_space_cache import CachedAddressSpaceServer
+from backend.opcua_server.server import OPCUAServer
+
+
+def test_cache_shelf_is_closed_when_the_server_stops(tmp_path):
+    path = tmp_path / "aspace"
+
+    async def scenario():
+        await CachedAddressSpaceServer(cache_path=path).load_standard_address_space() # Builds the cache
+        iserver = CachedAddressSpaceServer(cache_path=path)
+        server = Server(iserver=iserver)
+        server.set_endpoint("opc.tcp://127.0.0.1:0/")
+        await server.init()
+        assert iserver.cache_hit
+        shelf = iserver._shelf
+        async with server:
+            assert await server.nodes.objects.read_browse_name() is not None
+        assert iserver._shelf is None
+        with pytest.raises(ValueError):
+            shelf["i=84"] # Closed shelves refuse access
+
+        # A server that is set up but never started is released with close()
+        unused = CachedAddressSpaceServer(cache_path=path)
+        await unused.load_standard_address_space()
+        shelf = unused._shelf
+        unused.close()
+        unused.close()
+        with pytest.raises(ValueError):
+            shelf["i=84"]
+
+    asyncio.run(scenario())
+
+
+def test_local_addresses_prefer_the_default_route_and_skip_virtual_interfaces(monkeypatch, tmp_path):
+    def addr(address):
+        return SimpleNamespace(family=socket.AF_INET, address=address)
+
+    interfaces = {
+        "docker0": [addr("172.17.0.1")],
+        "eth0": [addr("192.168.1.20")],
+        "lo": [addr("127.0.0.1")],
+        "tun0": [addr("10.8.0.2")],
+        "wlan0": [addr("10.0.0.5")],
+        "eth1": [addr("192.168.2.1")],
+    }
+    stats = {name: SimpleNamespace(isup=name != "eth1") for name in interfaces}
+    monkeypatch.setattr("psutil.net_if_addrs", lambda: interfaces)
+    monkeypatch.setattr("psutil.net_if_stats", lambda: stats)
+
+    routes = tmp_path / "route"
+    routes.write_text(
+        "Iface\tDestination\tGateway\tFlags\tRefCnt\tUse\tMetric\tMask\tMTU\tWindow\tIRTT\n"
+        "eth0\t00000000\t0101A8C0\t0003\t0\t0\t100\t00000000\t0\t0\t0\n"
+        "wlan0\t00000000\t0100000A\t0003\t0\t0\t600\t00000000\t0\t0\t0\n"
+        "docker0\t000011AC\t00000000\t0001\t0\t0\t0\t0000FFFF\t0\t0\t0\n")
+    monkeypatch.setattr(server_module, "PROC_NET_ROUTE", str(routes))
+    assert OPCUAServer._local_addresses() == ["192.168.1.20", "10.0.0.5"]
+
+    # A VPN that carries the default route is what clients reach the server through
+    routes.write_text(
+        "Iface\tDestination\tGateway\tFlags\tRefCnt\tUse\tMetric\tMask\tMTU\tWindow\tIRTT\n"
+        "tun0\t00000000\t00000000\t0001\t0\t0\t0\t00000000\t0\t0\t0\n")
+    assert OPCUAServer._local_addresses() == ["10.8.0.2", "192.168.1.20", "10.0.0.5"]
+
+    # Without a routing table (not Linux) only the physical interfaces remain
+    monkeypatch.setattr(server_module, "PROC_NET_ROUTE", str(tmp_path / "missing"))
+    assert OPCUAServer._local_addresses() == ["192.168.1.20", "10.0.0.5"]
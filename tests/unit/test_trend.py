@@ -0,0 +1,30 @@
+import math
+
+from backend.opcua_server.trend import TrendBuffer, TrendStore
+
+
+def test_ring_wraps_and_serves_last_and_ranges():
+    buf = TrendBuffer(depth=5)
+    for i in range(8):  # samples 3..7 survive
+        buf.append(float(i), i * 10.0)
+
+    ts, values = buf.last(3)
+    assert ts.tolist() == [5.0, 6.0, 7.0]
+    assert values.tolist() == [50.0, 60.0, 70.0]
+    assert buf.last(100)[0].tolist() == [3.0, 4.0, 5.0, 6.0, 7.0]
+
+    # The range spans the wrap point of the ring
+    assert buf.between(4.0, 6.5)[0].tolist() == [4.0, 5.0, 6.0]
+    assert buf.between(start=4.0, limit=2)[0].tolist() == [6.0, 7.0]
+    assert buf.between(8.0, 9.0)[0].tolist() == []
+
+
+def test_store_records_cycles_and_resizes():
+    store = TrendStore(depth=4)
+    for t in range(6):
+        store.record(float(t), ["a", "b"], [t, None if t == 5 else True])
+    assert store.get("a").last(4)[1].tolist() == [2.0, 3.0, 4.0, 5.0]
+    assert math.isnan(store.get("b").last(1)[1][0])
+
+    store.set_depth(2)
+    assert store.get("a").last(10)[0].tolist() == [4.0, 5.0]